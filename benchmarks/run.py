@@ -0,0 +1,534 @@
+#!/usr/bin/env python
+"""DrawingWindow and ImageWindow benchmarks.
+
+Every scenario runs in a separate process in an offscreen window,
+so a display is still required (e.g. ``xvfb-run``). Frames are
+rendered by calling the drawing area handler with an image surface
+context, so results do not depend on the compositor.
+
+Examples
+--------
+::
+
+    xvfb-run -a python benchmarks/run.py -o new.json
+    python benchmarks/run.py --compare old.json new.json
+"""
+
+from __future__ import division, print_function
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from math import ceil
+from time import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint:disable=wrong-import-position
+from pygtkdrawingwindow.deps import (
+    PYGTK, gtk, gdk, cairo, clock, ScrollDirection,
+    pixbuf_new_from_file_at_scale
+)
+from pygtkdrawingwindow import DrawingWindow, ImageWindow, FitType
+from pygtkdrawingwindow.record import SyntheticEvent as Event
+
+if PYGTK:
+    PixbufSimpleAnim = gdk.PixbufSimpleAnim
+    BUTTON1_MASK = gdk.BUTTON1_MASK
+else:
+    from gi.repository.GdkPixbuf import PixbufSimpleAnim
+    PixbufSimpleAnim = PixbufSimpleAnim.new
+    BUTTON1_MASK = gdk.ModifierType.BUTTON1_MASK
+
+
+SCENARIOS = []
+
+
+def scenario(func):
+    """Register a scenario.
+
+    Parameters
+    ----------
+    func : `function`
+        Scenario function: func(bench : `Bench`).
+
+    Returns
+    -------
+    `function`
+    """
+    SCENARIOS.append(func)
+    return func
+
+
+class Bench(object):
+    """Benchmark scenario context.
+
+    Attributes
+    ----------
+    window : `gtk.OffscreenWindow`
+        Window containing tested widget.
+    tmpdir : `str`
+        Temporary directory.
+    samples : `list` of `float`
+        Step durations in seconds.
+    positions : `list` of (`float`, `float`)
+        Scrollbar values after each step.
+    """
+
+    def __init__(self, tmpdir):
+        self.window = gtk.OffscreenWindow()
+        self.window.set_size_request(800, 600)
+        self.tmpdir = tmpdir
+        self.samples = []
+        self.positions = []
+
+    def add(self, widget):
+        """Show a widget.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+        """
+        self.window.add(widget)
+        self.window.show_all()
+        self.flush(widget)
+
+    def flush(self, widget):
+        """Process pending events and pending zoom and scroll.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+        """
+        while gtk.events_pending():
+            gtk.main_iteration()
+        widget.flush_pending()
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+    def frame(self, widget):
+        """Render visible area.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+        """
+        x, y, width, height = widget.get_visible_area()
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                     max(1, int(ceil(width))),
+                                     max(1, int(ceil(height))))
+        ctx = cairo.Context(surface)
+        offset_x, offset_y = widget.get_canvas_offset()
+        ctx.translate(offset_x - x, offset_y - y)
+        widget.draw_event(None, ctx)
+        surface.flush()
+
+    def step(self, widget, func, *args):
+        """Measure a step: call a function, flush events and render
+        visible area.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+        func : `function`
+        *args
+            Function arguments.
+        """
+        start = clock()
+        func(*args)
+        self.flush(widget)
+        self.frame(widget)
+        self.samples.append(clock() - start)
+        self.positions.append((widget.get_hadjustment().get_value(),
+                               widget.get_vadjustment().get_value()))
+
+    def check_scrolled(self):
+        """Check that steps scrolled the widget.
+
+        Raises
+        ------
+        AssertionError
+            If scrollbar values did not change, e.g. because the
+            image fits into the window and the scenario is a no-op.
+        """
+        if len(set(self.positions)) < 2:
+            raise AssertionError('Scrollbar values did not change')
+
+    def path(self, name):
+        """Get temporary file path.
+
+        Parameters
+        ----------
+        name : `str`
+
+        Returns
+        -------
+        `str`
+        """
+        return os.path.join(self.tmpdir, name)
+
+
+def draw_lines(widget, ctx):
+    """Draw a procedural test image.
+
+    Parameters
+    ----------
+    widget : `DrawingWindow`
+    ctx : `cairo.Context`
+    """
+    width, height = widget.get_size()
+    ctx.set_line_width(1)
+    for i in range(200):
+        ctx.set_source_rgb(i / 200, 0.5, 1 - i / 200)
+        ctx.move_to(0, i * height / 200)
+        ctx.line_to(width, height - i * height / 200)
+        ctx.stroke()
+
+def write_png(path, width, height, seed=0):
+    """Write a test image.
+
+    Parameters
+    ----------
+    path : `str`
+    width : `int`
+    height : `int`
+    seed : `int`, optional
+    """
+    surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+    ctx = cairo.Context(surface)
+    gradient = cairo.LinearGradient(0, 0, width, height)
+    gradient.add_color_stop_rgb(0, (seed % 7) / 7, 0.2, 0.8)
+    gradient.add_color_stop_rgb(1, 0.9, (seed % 5) / 5, 0.1)
+    ctx.set_source(gradient)
+    ctx.paint()
+    ctx.set_source_rgb(1, 1, 1)
+    for i in range(0, width, 64):
+        ctx.rectangle(i + seed % 64, 0, 8, height)
+    ctx.fill()
+    surface.write_to_png(path)
+
+def write_svg(path, shapes=5000):
+    """Write a test SVG image.
+
+    Parameters
+    ----------
+    path : `str`
+    shapes : `int`, optional
+    """
+    with open(path, 'w') as fp:
+        fp.write('<svg xmlns="http://www.w3.org/2000/svg" '
+                 'width="2000" height="2000">\n')
+        for i in range(shapes):
+            fp.write('<circle cx="%d" cy="%d" r="%d" fill="#%06x" '
+                     'fill-opacity="0.5"/>\n'
+                     % (i * 37 % 2000, i * 91 % 2000, 5 + i % 40,
+                        i * 2654435761 % 0xffffff))
+        fp.write('</svg>\n')
+
+
+@scenario
+def zoom_burst(bench):
+    """Wheel zoom bursts through `scroll_event`."""
+    widget = DrawingWindow()
+    widget.set_size(4000, 4000)
+    widget.connect('render', draw_lines)
+    bench.add(widget)
+    for i in range(100):
+        if i % 50 < 25:
+            direction = ScrollDirection.UP
+        else:
+            direction = ScrollDirection.DOWN
+        event = Event(direction=direction, state=0, delta_y=0.0)
+        bench.step(widget, widget.scroll_event, None, event)
+
+@scenario
+def drag_pan(bench):
+    """Drag panning through `motion_notify_event`."""
+    widget = DrawingWindow()
+    widget.set_size(4000, 4000)
+    widget.connect('render', draw_lines)
+    bench.add(widget)
+    widget.set_fit(FitType.NONE)
+    widget.set_zoom(1.0)
+    bench.flush(widget)
+    for i in range(200):
+        offset = 10 * min(i, 200 - i)
+        event = Event(x=400.0, y=300.0,
+                      x_root=1000.0 - offset, y_root=1000.0 - offset,
+                      state=BUTTON1_MASK)
+        bench.step(widget, widget.motion_notify_event, None, event)
+    bench.check_scrolled()
+
+@scenario
+def fit_resize(bench):
+    """Window resizes in fit mode."""
+    widget = ImageWindow()
+    path = bench.path('resize.png')
+    write_png(path, 3000, 2000)
+    widget.set_image(path)
+    bench.add(widget)
+    for i in range(50):
+        size = (600 + i % 10 * 40, 400 + i % 7 * 40)
+        bench.step(widget, bench.window.set_size_request, *size)
+
+@scenario
+def gif_playback(bench):
+    """Animation playback."""
+    anim = PixbufSimpleAnim(640, 480, 25)
+    for i in range(50):
+        path = bench.path('frame%d.png' % i)
+        write_png(path, 640, 480, i)
+        anim.add_frame(pixbuf_new_from_file_at_scale(path, 640, 480, True))
+    widget = ImageWindow()
+    widget.set_image(anim)
+    bench.add(widget)
+    widget.stop_animation()
+    for i in range(200):
+        bench.step(widget, widget.seek, i * 0.04)
+
+@scenario
+def svg_expose(bench):
+    """SVG image exposes while scrolling."""
+    widget = ImageWindow()
+    path = bench.path('image.svg')
+    write_svg(path)
+    widget.set_image(path)
+    widget.set_fit(FitType.NONE)
+    widget.set_zoom(1.0)
+    bench.add(widget)
+    for i in range(100):
+        bench.step(widget, widget.queue_scroll, 10.0, 5.0)
+    bench.check_scrolled()
+
+@scenario
+def large_jpeg(bench):
+    """Large JPEG `set_image`."""
+    png = bench.path('large.png')
+    path = bench.path('large.jpg')
+    write_png(png, 8000, 6000)
+    pixbuf = pixbuf_new_from_file_at_scale(png, 8000, 6000, True)
+    if PYGTK:
+        pixbuf.save(path, 'jpeg')
+    else:
+        pixbuf.savev(path, 'jpeg', [], [])
+    widget = ImageWindow()
+    bench.add(widget)
+    for _ in range(5):
+        bench.step(widget, widget.set_image, path)
+
+
+def percentile(samples, percent):
+    """Get nearest rank percentile.
+
+    Parameters
+    ----------
+    samples : `list` of `float`
+        Sorted samples.
+    percent : `float`
+
+    Returns
+    -------
+    `float`
+    """
+    index = int(ceil(percent / 100 * len(samples))) - 1
+    return samples[max(0, min(index, len(samples) - 1))]
+
+def run_scenario(name):
+    """Run a scenario in current process.
+
+    Parameters
+    ----------
+    name : `str`
+        Scenario name.
+
+    Returns
+    -------
+    `dict`
+        Scenario results.
+    """
+    func = dict((func.__name__, func) for func in SCENARIOS)[name]
+    tmpdir = tempfile.mkdtemp(prefix='pygtkdrawingwindow-bench-')
+    try:
+        bench = Bench(tmpdir)
+        if tracemalloc is not None:
+            tracemalloc.start()
+        start = clock()
+        func(bench)
+        total = clock() - start
+        if tracemalloc is not None:
+            _, alloc_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        else:
+            alloc_peak = None
+    finally:
+        shutil.rmtree(tmpdir)
+
+    samples = sorted(bench.samples)
+    ret = {
+        'steps': len(samples),
+        'total': total,
+        'alloc_peak': alloc_peak,
+        'max_rss': None
+    }
+    if samples:
+        ret.update({
+            'mean': sum(samples) / len(samples),
+            'p50': percentile(samples, 50),
+            'p95': percentile(samples, 95),
+            'p99': percentile(samples, 99),
+            'max': samples[-1]
+        })
+    if resource is not None:
+        ret['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return ret
+
+def run(names, repeat):
+    """Run scenarios in subprocesses.
+
+    Parameters
+    ----------
+    names : `list` of `str`
+        Scenario names.
+    repeat : `int`
+        Number of runs per scenario. The run with the lowest median
+        step time is kept.
+
+    Returns
+    -------
+    `dict`
+        Results.
+    """
+    results = {}
+    for name in names:
+        runs = []
+        for _ in range(repeat):
+            out = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), '--child', name]
+            )
+            runs.append(json.loads(out.decode('utf-8').splitlines()[-1]))
+        results[name] = min(runs, key=lambda res: res.get('p50', 0))
+        print('%-14s %s' % (name, format_result(results[name])),
+              file=sys.stderr)
+    return {
+        'meta': {
+            'time': time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'toolkit': 'pygtk' if PYGTK else 'gi',
+            'cairo': cairo.cairo_version_string(),
+            'repeat': repeat
+        },
+        'scenarios': results
+    }
+
+def format_result(result):
+    """Format scenario result.
+
+    Parameters
+    ----------
+    result : `dict`
+
+    Returns
+    -------
+    `str`
+    """
+    if not result['steps']:
+        return 'no steps'
+    return 'p50 %7.2f ms  p95 %7.2f ms  max %7.2f ms  rss %s KiB' % (
+        result['p50'] * 1e3, result['p95'] * 1e3, result['max'] * 1e3,
+        result['max_rss']
+    )
+
+def compare(old, new, threshold):
+    """Print scenario results difference.
+
+    Parameters
+    ----------
+    old : `dict`
+        Baseline results.
+    new : `dict`
+        New results.
+    threshold : `float`
+        Relative p50 or p95 increase considered a regression.
+
+    Returns
+    -------
+    `bool`
+        `True` if there are no regressions.
+    """
+    ok = True
+    print('%-14s %-5s %10s %10s %8s' % ('scenario', 'stat', 'old, ms',
+                                        'new, ms', 'change'))
+    for name in sorted(set(old['scenarios']) & set(new['scenarios'])):
+        for stat in ('p50', 'p95', 'max'):
+            prev = old['scenarios'][name].get(stat)
+            cur = new['scenarios'][name].get(stat)
+            if not prev or cur is None:
+                continue
+            change = cur / prev - 1
+            mark = ''
+            if stat != 'max' and change > threshold:
+                mark = ' !'
+                ok = False
+            print('%-14s %-5s %10.2f %10.2f %+7.1f%%%s' % (
+                name, stat, prev * 1e3, cur * 1e3, change * 100, mark
+            ))
+    return ok
+
+def main():
+    names = [func.__name__ for func in SCENARIOS]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('scenarios', nargs='*',
+                        help='scenarios to run (default: all): '
+                        + ', '.join(names))
+    parser.add_argument('-o', '--output', help='output JSON file')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='runs per scenario (default: %(default)s)')
+    parser.add_argument('-c', '--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two output files')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help='regression threshold (default: %(default)s)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child)))
+        return 0
+
+    if args.compare:
+        with open(args.compare[0]) as fp:
+            old = json.load(fp)
+        with open(args.compare[1]) as fp:
+            new = json.load(fp)
+        return 0 if compare(old, new, args.threshold) else 1
+
+    for name in args.scenarios:
+        if name not in names:
+            parser.error('unknown scenario: %s' % name)
+
+    results = run(args.scenarios or names, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
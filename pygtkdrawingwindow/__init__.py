@@ -1,5 +1,17 @@
 from __future__ import absolute_import
 
 from .util import FitType
+from .render import (
+    Renderer, TileRenderer, ScrollRenderer, ThreadRenderer,
+    ProcessTileRenderer
+)
+from .screen import VirtualScreen
+from .viewport import Viewport
 from .base import DrawingWindow
 from .image import ImageWindow
+from .buffer import PixelFormat, ImageBuffer
+from .stats import FrameStats
+from .record import EventRecorder, EventReplayer
+from .export import (
+    get_image_renderer, render_surface, export, export_png_bands
+)
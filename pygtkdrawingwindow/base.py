@@ -1,13 +1,20 @@
 from __future__ import division, print_function, absolute_import, with_statement
 
-from math import sin, cos, ceil
-from itertools import product
+from math import ceil
+from threading import local
+from contextlib import contextmanager
 
 from .deps import (
-    PYGTK, gtk, gdk, gobject, izip, PolicyType, ScrollDirection
+    PYGTK, gtk, gdk, gobject, izip, clock, PolicyType, ScrollDirection
 )
 
-from .util import FitType, nop, freeze, ignore_args, get_scroll_direction
+from .util import (
+    FitType, FrameCallback, nop, freeze, ignore_args, get_scroll_direction,
+    transform_rect, round_rect, pad_rect
+)
+from .render import Renderer
+from .viewport import Viewport
+from .screen import VirtualScreen
 
 
 class DrawingWindow(gtk.ScrolledWindow):
@@ -20,22 +27,29 @@ class DrawingWindow(gtk.ScrolledWindow):
 
         render(widget : `DrawingWindow`, ctx: `cairo.Context`)
             Image draw signal.
-    screen : `gtk.DrawingArea`
+        frame-stats(widget : `DrawingWindow`, stats : `FrameStats`)
+            Emitted after each drawing area expose if statistics
+            are enabled.
+        pointer-moved(widget : `DrawingWindow`, pointer_image : (`float`, `float`) or `None`)
+            Emitted at most once per frame when pointer image
+            coordinates change.
+    screen : `gtk.DrawingArea` or `VirtualScreen`
         Drawing area.
     pointer : (`float`, `float`) or None
-        Pointer coordinates on drawing area.
+        Pointer coordinates on drawing area (canvas coordinates
+        in virtual mode).
     pointer_root : (`float`, `float`) or None
         Pointer coordinates on root window.
+    pointer_image : (`float`, `float`) or None
+        Pointer image coordinates, updated once per frame.
+    _virtual : `bool`
+        `True` if drawing area is a `VirtualScreen`.
     _scrollbar_size : `int`
         Scrollbar size.
     _fit_offset : `int`
         Fit offset.
-    _size : (`int`, `int`)
-        Image size.
-    _rotate : `float`
-        Image rotation angle.
-    _scale : `float`
-        Zoom ratio.
+    _viewport : `Viewport`
+        Image size, zoom ratio, rotation angle and transformation.
     _prev_scale : `float`
         Previous zoom ratio.
     _fit : `FitType`
@@ -44,6 +58,24 @@ class DrawingWindow(gtk.ScrolledWindow):
         Fit function.
     _do_fit_funcs : `tuple` of `function`
         Fit functions by type.
+    _renderer : `Renderer`
+        Image renderer.
+    _pending_zoom : `float`
+        Zoom ratio multiplier to apply on next frame.
+    _pending_scroll : `list` of `float`
+        Scroll offset to apply on next frame.
+    _pending_update : `FrameCallback`
+        Pending zoom and scroll update.
+    _pointer_update : `FrameCallback`
+        Pending pointer image coordinates update.
+    _stats : `FrameStats` or `None`
+        Frame timing statistics.
+    _timed_handlers : `dict`
+        Timing wrappers of connected `render` signal handlers.
+    _timed_ids : `dict`
+        Connected `render` signal handlers by handler id.
+    _recorder : `EventRecorder` or `None`
+        Input event recorder.
 
     Examples
     --------
@@ -60,7 +92,13 @@ class DrawingWindow(gtk.ScrolledWindow):
     __gsignals__ = {
         'render': (gobject.SIGNAL_RUN_FIRST,
                    gobject.TYPE_NONE,
-                   (gobject.TYPE_PYOBJECT,))
+                   (gobject.TYPE_PYOBJECT,)),
+        'frame-stats': (gobject.SIGNAL_RUN_FIRST,
+                        gobject.TYPE_NONE,
+                        (gobject.TYPE_PYOBJECT,)),
+        'pointer-moved': (gobject.SIGNAL_RUN_FIRST,
+                          gobject.TYPE_NONE,
+                          (gobject.TYPE_PYOBJECT,))
     }
 
     if PYGTK:
@@ -91,23 +129,45 @@ class DrawingWindow(gtk.ScrolledWindow):
         """`ModifierType` : Pointer motion button mask.
         """
 
-    def __init__(self):
+    def __init__(self, virtual=False):
+        """Drawing widget constructor.
+
+        Parameters
+        ----------
+        virtual : `bool`, optional
+            `True` to keep drawing area the size of the widget and
+            scroll a virtual canvas instead of resizing drawing area
+            to zoomed image size (default: `False`).
+        """
         super(DrawingWindow, self).__init__()
 
         self.set_policy(self.POLICY, self.POLICY)
         self.set_shadow_type(self.SHADOW)
 
-        self.screen = gtk.DrawingArea()
-        self.add_with_viewport(self.screen)
+        self._virtual = virtual
+        if virtual:
+            self.screen = VirtualScreen()
+            self.add(self.screen)
+        else:
+            self.screen = gtk.DrawingArea()
+            self.add_with_viewport(self.screen)
 
         self._scrollbar_size = 20
         self._fit_offset = 5
         self._prev_scale = None
-        self._size = (0, 0)
-        self._scale = None
+        self._viewport = Viewport()
         self._fit = None
         self._do_fit = None
-        self._rotate = 0.0
+        self._renderer = Renderer()
+        self._render_local = local()
+        self._stats = None
+        self._timed_handlers = {}
+        self._timed_ids = {}
+        self._recorder = None
+        self._pending_zoom = 1.0
+        self._pending_scroll = [0.0, 0.0]
+        self._pending_update = FrameCallback(self, self._apply_pending)
+        self._pointer_update = FrameCallback(self, self._update_pointer)
 
         self._do_fit_funcs = (
             nop,
@@ -119,12 +179,14 @@ class DrawingWindow(gtk.ScrolledWindow):
 
         self.pointer = None
         self.pointer_root = None
+        self.pointer_image = None
 
         self.set_zoom(1.0)
         self.set_fit(FitType.FIT_OR_1TO1)
 
         self.screen.set_events(self.EVENTS)
         self.connect('size_allocate', ignore_args(self.update_fit))
+        self.connect('destroy', ignore_args(self._close_renderer))
         self.connect('scroll_event', self.scroll_event)
         self.screen.connect('size_allocate', self.size_allocate_event)
         self.screen.connect('motion_notify_event', self.motion_notify_event)
@@ -156,6 +218,326 @@ class DrawingWindow(gtk.ScrolledWindow):
             raise ValueError('Invalid fit type: %s' % repr(fit))
         self._fit = fit
 
+    def get_renderer(self):
+        """Get image renderer.
+
+        Returns
+        -------
+        `Renderer`
+        """
+        return self._renderer
+
+    def set_renderer(self, renderer):
+        """Set image renderer.
+
+        Previous renderer is closed.
+
+        Parameters
+        ----------
+        renderer : `Renderer` or `None`
+            Image renderer (default: `Renderer()`).
+        """
+        if renderer is None:
+            renderer = Renderer()
+        if renderer is not self._renderer:
+            self._renderer.close()
+        self._renderer = renderer
+        self.queue_draw()
+
+    def _close_renderer(self):
+        """Release renderer resources.
+        """
+        self._renderer.close()
+
+    def prepare_render(self, matrix):
+        """Capture widget state for rendering on a worker thread.
+
+        Called on the main thread by `ThreadRenderer` before rendering.
+        Subclasses that need widget state in their `render` handlers
+        return it here and read it with `get_render_state`.
+
+        Parameters
+        ----------
+        matrix : `cairo.Matrix`
+            Image to drawing area transformation matrix.
+
+        Returns
+        -------
+        `object` or `None`
+            Render state.
+        """
+        return None
+
+    def get_render_state(self):
+        """Get render state of current thread.
+
+        Returns
+        -------
+        `object` or `None`
+            State returned by `prepare_render` if `render` signal is
+            emitted by `emit_render` on current thread, `None` otherwise.
+        """
+        return getattr(self._render_local, 'state', None)
+
+    def emit_render(self, ctx, state=None):
+        """Emit `render` signal with a prepared render state.
+
+        Parameters
+        ----------
+        ctx : `cairo.Context`
+        state : `object` or `None`, optional
+            Render state returned by `prepare_render`.
+        """
+        self._render_local.state = state
+        try:
+            self.emit('render', ctx)
+        finally:
+            self._render_local.state = None
+
+    def get_stats(self):
+        """Get frame timing statistics.
+
+        Returns
+        -------
+        `FrameStats` or `None`
+        """
+        return self._stats
+
+    def set_stats(self, stats):
+        """Set frame timing statistics.
+
+        Parameters
+        ----------
+        stats : `FrameStats` or `None`
+            Frame timing statistics (`None` to disable).
+        """
+        self._stats = stats
+
+    def get_recorder(self):
+        """Get input event recorder.
+
+        Returns
+        -------
+        `EventRecorder` or `None`
+        """
+        return self._recorder
+
+    def set_recorder(self, recorder):
+        """Set input event recorder.
+
+        Parameters
+        ----------
+        recorder : `EventRecorder` or `None`
+            Input event recorder (`None` to disable).
+        """
+        self._recorder = recorder
+
+    @contextmanager
+    def measure(self, name):
+        """Operation timing context manager.
+
+        Uses `FrameStats.measure`. Does nothing if statistics are
+        disabled.
+
+        Parameters
+        ----------
+        name : `str`
+            Operation name.
+        """
+        stats = self._stats
+        if stats is None:
+            yield
+            return
+        with stats.measure(name):
+            yield
+
+    def _timed_handler(self, signal, handler):
+        """Wrap `render` signal handler to measure its duration.
+
+        Wrappers are cached, so that a handler connected more than once
+        has one wrapper, until the handler is disconnected.
+
+        Parameters
+        ----------
+        signal : `str`
+            Signal name.
+        handler : `function`
+            Signal handler.
+
+        Returns
+        -------
+        `function`
+        """
+        if signal != 'render':
+            return handler
+        try:
+            return self._timed_handlers[handler]
+        except KeyError:
+            pass
+        name = 'render:' + getattr(handler, '__name__', repr(handler))
+        def ret(*args):
+            if self._stats is None:
+                return handler(*args)
+            with self.measure(name):
+                return handler(*args)
+        self._timed_handlers[handler] = ret
+        return ret
+
+    def _call_by_func(self, method, handler):
+        """Call a GObject `*_by_func` method for a handler and its
+        `render` signal wrapper.
+
+        Parameters
+        ----------
+        method : `str`
+            Method name.
+        handler : `function`
+            Signal handler.
+
+        Raises
+        ------
+        TypeError
+            If handler is not connected.
+        """
+        method = getattr(super(DrawingWindow, self), method)
+        funcs = [handler]
+        if handler in self._timed_handlers:
+            funcs.append(self._timed_handlers[handler])
+        error = None
+        connected = False
+        for func in funcs:
+            try:
+                method(func)
+                connected = True
+            except TypeError as err:
+                error = err
+        if not connected:
+            raise error
+
+    def _forget_handler(self, handler_id=None, handler=None):
+        """Drop cached `render` signal wrapper of disconnected handler.
+
+        Parameters
+        ----------
+        handler_id : `int` or `None`, optional
+            Disconnected handler id.
+        handler : `function` or `None`, optional
+            Handler whose connections are all disconnected.
+        """
+        if handler_id is not None:
+            handler = self._timed_ids.pop(handler_id, None)
+            if handler is None \
+               or any(func == handler for func in self._timed_ids.values()):
+                return
+        else:
+            for key, func in list(self._timed_ids.items()):
+                if func == handler:
+                    del self._timed_ids[key]
+        self._timed_handlers.pop(handler, None)
+
+    def connect(self, signal, handler, *args):
+        """Connect a signal handler.
+
+        `render` signal handlers are timed if statistics are enabled.
+
+        Parameters
+        ----------
+        signal : `str`
+            Signal name.
+        handler : `function`
+            Signal handler.
+        *args
+            Extra handler arguments.
+
+        Returns
+        -------
+        `int`
+            Handler id.
+        """
+        func = self._timed_handler(signal, handler)
+        handler_id = super(DrawingWindow, self).connect(signal, func, *args)
+        if func is not handler:
+            self._timed_ids[handler_id] = handler
+        return handler_id
+
+    def connect_after(self, signal, handler, *args):
+        """Connect a signal handler to run after default handler.
+
+        `render` signal handlers are timed if statistics are enabled.
+
+        Parameters
+        ----------
+        signal : `str`
+            Signal name.
+        handler : `function`
+            Signal handler.
+        *args
+            Extra handler arguments.
+
+        Returns
+        -------
+        `int`
+            Handler id.
+        """
+        func = self._timed_handler(signal, handler)
+        handler_id = super(DrawingWindow, self).connect_after(signal, func, *args)
+        if func is not handler:
+            self._timed_ids[handler_id] = handler
+        return handler_id
+
+    def disconnect_by_func(self, handler):
+        """Disconnect all connections of a signal handler.
+
+        Parameters
+        ----------
+        handler : `function`
+            Signal handler.
+        """
+        self._call_by_func('disconnect_by_func', handler)
+        self._forget_handler(handler=handler)
+
+    def disconnect(self, handler_id):
+        """Disconnect a signal handler.
+
+        Parameters
+        ----------
+        handler_id : `int`
+            Handler id.
+        """
+        super(DrawingWindow, self).disconnect(handler_id)
+        self._forget_handler(handler_id)
+
+    def handler_disconnect(self, handler_id):
+        """Disconnect a signal handler.
+
+        Parameters
+        ----------
+        handler_id : `int`
+            Handler id.
+        """
+        super(DrawingWindow, self).handler_disconnect(handler_id)
+        self._forget_handler(handler_id)
+
+    def handler_block_by_func(self, handler):
+        """Block all connections of a signal handler.
+
+        Parameters
+        ----------
+        handler : `function`
+            Signal handler.
+        """
+        self._call_by_func('handler_block_by_func', handler)
+
+    def handler_unblock_by_func(self, handler):
+        """Unblock all connections of a signal handler.
+
+        Parameters
+        ----------
+        handler : `function`
+            Signal handler.
+        """
+        self._call_by_func('handler_unblock_by_func', handler)
+
     def get_zoom(self):
         """Get zoom ratio.
 
@@ -163,7 +545,7 @@ class DrawingWindow(gtk.ScrolledWindow):
         -------
         `float`
         """
-        return self._scale
+        return self._viewport.get_zoom()
 
     def set_zoom(self, ratio):
         """Set zoom ratio.
@@ -173,8 +555,8 @@ class DrawingWindow(gtk.ScrolledWindow):
         ratio : `float`
         """
         if self._prev_scale is None:
-            self._prev_scale = self._scale
-        self._scale = ratio
+            self._prev_scale = self._viewport.get_zoom()
+        self._viewport.set_zoom(ratio)
         self._update_screen_size()
 
     def get_angle(self):
@@ -185,7 +567,7 @@ class DrawingWindow(gtk.ScrolledWindow):
         `float`
             Angle in radians.
         """
-        return self._rotate
+        return self._viewport.get_angle()
 
     def set_angle(self, angle):
         """Set image rotation angle.
@@ -195,26 +577,19 @@ class DrawingWindow(gtk.ScrolledWindow):
         angle : `float`
             Angle in radians.
         """
-        width, height = self.get_size()
-        width /= 2
-        height /= 2
-        rect = list(product((-width, width), (-height, height)))
-        sin_, cos_ = sin(angle), cos(angle)
-        for i, point in enumerate(rect):
-            x, y = point
-            rect[i] = (
-                x * cos_ + y * sin_,
-                y * cos_ - x * sin_
-            )
-        width = max(x for x, _ in rect) - min(x for x, _ in rect)
-        height = max(y for _, y in rect) - min(y for _, y in rect)
-        scale = self.get_zoom()
-        self.screen.set_size_request(
-            int(ceil(width * scale)),
-            int(ceil(height * scale))
-        )
+        self._viewport.set_angle(angle)
+        self._update_screen_size()
         self.screen.queue_draw()
-        self._rotate = angle
+
+    def get_rotated_size(self):
+        """Get rotated image bounding box size.
+
+        Returns
+        -------
+        (`float`, `float`)
+            Bounding box width and height.
+        """
+        return self._viewport.get_rotated_size()
 
     def get_size(self):
         """Get image size.
@@ -224,7 +599,7 @@ class DrawingWindow(gtk.ScrolledWindow):
         (`int`, `int`)
             Image width and height.
         """
-        return self._size
+        return self._viewport.get_size()
 
     def set_size(self, width, height):
         """Set image size.
@@ -236,7 +611,8 @@ class DrawingWindow(gtk.ScrolledWindow):
         height : `int`
             Image height.
         """
-        self._size = (width, height)
+        self._viewport.set_size(width, height)
+        self._renderer.invalidate()
         self._update_screen_size()
 
     def get_window_size(self):
@@ -256,17 +632,102 @@ class DrawingWindow(gtk.ScrolledWindow):
         Returns
         -------
         (`int`, `int`)
-            Drawing area width and height.
+            Drawing area (or virtual canvas) width and height.
         """
         rect = self.screen.get_allocation()
+        if self._virtual:
+            width, height = self.screen.get_canvas_size()
+            return max(width, rect.width), max(height, rect.height)
         return rect.width, rect.height
 
+    def get_canvas_offset(self):
+        """Get drawing area scroll offset.
+
+        Returns
+        -------
+        (`int`, `int`)
+            Canvas coordinates of drawing area origin
+            (always (0, 0) if not in virtual mode).
+        """
+        if self._virtual:
+            return self.screen.get_scroll_offset()
+        return (0, 0)
+
+    def get_visible_area(self):
+        """Get visible drawing area rectangle.
+
+        Returns
+        -------
+        (`float`, `float`, `float`, `float`)
+            Visible area x, y, width and height.
+        """
+        hadj = self.get_hadjustment()
+        vadj = self.get_vadjustment()
+        return (hadj.get_value(), vadj.get_value(),
+                hadj.get_page_size(), vadj.get_page_size())
+
+    def get_offset(self):
+        """Get image offset on drawing area.
+
+        Returns
+        -------
+        (`float`, `float`)
+            Image x and y offset.
+        """
+        self._viewport.set_screen_size(*self.get_screen_size())
+        return self._viewport.get_offset()
+
+    def get_matrix(self):
+        """Get image to drawing area transformation matrix.
+
+        Returns
+        -------
+        `cairo.Matrix`
+            Matrix cached until image size, zoom ratio, rotation
+            angle or drawing area size changes (must not be modified).
+        """
+        self._viewport.set_screen_size(*self.get_screen_size())
+        return self._viewport.get_matrix()
+
+    def get_viewport(self):
+        """Get view transformation model updated to current drawing
+        area size and position.
+
+        Returns
+        -------
+        `Viewport`
+
+        Examples
+        --------
+        >>> viewport = widget.get_viewport()
+        >>> markers = viewport.image_to_widget(numpy.array(points))
+        """
+        viewport = self._viewport
+        viewport.set_screen_size(*self.get_screen_size())
+        viewport.set_canvas_offset(*self.get_canvas_offset())
+        window = self.screen.get_window()
+        if window is not None:
+            viewport.set_root_offset(*window.get_origin()[-2:])
+        return viewport
+
+    def _set_screen_size(self, width, height):
+        """Resize drawing area or virtual canvas.
+
+        Parameters
+        ----------
+        width : `int`
+        height : `int`
+        """
+        if not self._virtual:
+            self.screen.set_size_request(width, height)
+        elif self.screen.set_canvas_size(width, height):
+            self.size_allocate_event(None, None)
+
     def _update_screen_size(self):
         """Resize drawing area.
         """
-        self.screen.set_size_request(
-            *(int(sz * self.get_zoom()) for sz in self.get_size())
-        )
+        with self.measure('layout'):
+            self._set_screen_size(*self._viewport.get_content_size())
 
     def _zoom_scroll(self):
         """Update scroll after zooming.
@@ -294,6 +755,7 @@ class DrawingWindow(gtk.ScrolledWindow):
         else:
             pointer = self.pointer
             self.pointer = tuple(x * dscale for x in pointer)
+            self._pointer_update.schedule()
 
         dscale -= 1
 
@@ -303,6 +765,90 @@ class DrawingWindow(gtk.ScrolledWindow):
 
         self._prev_scale = None
 
+    def queue_zoom(self, ratio):
+        """Multiply zoom ratio on next frame.
+
+        Zoom requests made before the next frame are combined.
+
+        Parameters
+        ----------
+        ratio : `float`
+            Zoom ratio multiplier.
+        """
+        self._pending_zoom *= ratio
+        self._pending_update.schedule()
+
+    def queue_scroll(self, delta_x, delta_y):
+        """Scroll on next frame.
+
+        Scroll requests made before the next frame are combined.
+
+        Parameters
+        ----------
+        delta_x : `float`
+            Horizontal scroll offset.
+        delta_y : `float`
+            Vertical scroll offset.
+        """
+        self._pending_scroll[0] += delta_x
+        self._pending_scroll[1] += delta_y
+        self._pending_update.schedule()
+
+    def get_pointer_image(self):
+        """Get pointer image coordinates, applying pending update.
+
+        Returns
+        -------
+        (`float`, `float`) or `None`
+        """
+        self._pointer_update.flush()
+        return self.pointer_image
+
+    def _update_pointer(self):
+        """Update pointer image coordinates.
+        """
+        if self.pointer is None:
+            pointer = None
+        else:
+            self._viewport.set_screen_size(*self.get_screen_size())
+            pointer = self._viewport.get_inverse().transform_point(
+                *self.pointer
+            )
+        if pointer != self.pointer_image:
+            self.pointer_image = pointer
+            self.emit('pointer-moved', pointer)
+
+    def flush_pending(self):
+        """Apply pending scroll and zoom now instead of on next frame.
+        """
+        self._pending_update.flush()
+
+    def _apply_pending(self):
+        """Apply pending scroll and zoom.
+        """
+        scrollbars = (self.get_hscrollbar(), self.get_vscrollbar())
+        applied = [0.0, 0.0]
+        for i, (delta, scrollbar) in enumerate(izip(self._pending_scroll,
+                                                    scrollbars)):
+            if delta:
+                value = scrollbar.get_value()
+                scrollbar.set_value(value + delta)
+                applied[i] = scrollbar.get_value() - value
+        self._pending_scroll = [0.0, 0.0]
+        # Still pointer moves on canvas by the clamped scroll delta.
+        if self.pointer is not None and any(applied):
+            self.pointer = tuple(x + delta for x, delta
+                                 in izip(self.pointer, applied))
+
+        ratio = self._pending_zoom
+        self._pending_zoom = 1.0
+        if ratio != 1.0:
+            self.set_fit(FitType.NONE)
+            self.set_zoom(self.get_zoom() * ratio)
+
+        if self.pointer is not None:
+            self._pointer_update.schedule()
+
     def size_allocate_event(self, _, ev_):
         """Handle drawing area `size-allocate` event.
 
@@ -337,37 +883,38 @@ class DrawingWindow(gtk.ScrolledWindow):
         _ : `gtk.DrawingArea`
         ctx : `cairo.Context`
         """
-        size = self.get_size()
-        scale = self.get_zoom()
-        width, height = size
-        width *= 0.5
-        height *= 0.5
-        off = [max(0, (wnd_size - img_size * scale) / 2)
-               for wnd_size, img_size in izip(self.get_screen_size(), size)]
-
-        ctx.translate(*off)
-        ctx.scale(scale, scale)
-        ctx.translate(width, height)
-        ctx.rotate(self.get_angle())
-        ctx.translate(-width, -height)
-
-        self.emit('render', ctx)
+        if self._virtual:
+            ctx.translate(*(-x for x in self.get_canvas_offset()))
+        stats = self._stats
+        if stats is None:
+            self._renderer.draw(self, ctx)
+            return
+        start = clock()
+        self._renderer.draw(self, ctx)
+        stats.add_frame(start, clock() - start)
+        self.emit('frame-stats', stats)
 
-    def leave_notify_event(self, _, ev_):
+    def leave_notify_event(self, _, event):
         """Handle drawing area `leave-notify` event.
 
         Parameters
         ----------
         _ : `gtk.DrawingArea`
-        ev_ : `gtk.gdk.Event`
+        event : `gtk.gdk.Event`
 
         Returns
         -------
         `bool`
             `True` to stop event propagation.
         """
+        if self._recorder is not None:
+            self._recorder.add('leave', event)
         self.pointer = None
         self.pointer_root = None
+        self._pointer_update.cancel()
+        if self.pointer_image is not None:
+            self.pointer_image = None
+            self.emit('pointer-moved', None)
         return False
 
     def motion_notify_event(self, _, event):
@@ -383,20 +930,22 @@ class DrawingWindow(gtk.ScrolledWindow):
         `bool`
             `True` to stop event propagation.
         """
+        if self._recorder is not None:
+            self._recorder.add('motion', event)
+
         ret = False
 
-        self.pointer = (event.x, event.y)
+        offset_x, offset_y = self.get_canvas_offset()
+        self.pointer = (event.x + offset_x, event.y + offset_y)
+        self._pointer_update.schedule()
         pointer = (event.x_root, event.y_root)
 
         if self.pointer_root is None:
             self.pointer_root = pointer
 
         if event.state & self.BUTTON_MASK:
-            scrollbars = (self.get_hscrollbar(), self.get_vscrollbar())
-            scrollbars = izip(pointer, self.pointer_root, scrollbars)
-            for cur, prev, scrollbar in scrollbars:
-                value = scrollbar.get_value() + (prev - cur)
-                scrollbar.set_value(value)
+            self.queue_scroll(*(prev - cur for cur, prev
+                                in izip(pointer, self.pointer_root)))
             ret = True
 
         self.pointer_root = pointer
@@ -415,6 +964,8 @@ class DrawingWindow(gtk.ScrolledWindow):
         `bool`
             `True` to stop event propagation.
         """
+        if self._recorder is not None:
+            self._recorder.add('scroll', event)
         direction = get_scroll_direction(event)
         #if event.state & gdk.CONTROL_MASK:
         #    if direction == ScrollDirection.UP:
@@ -423,21 +974,50 @@ class DrawingWindow(gtk.ScrolledWindow):
         #        self.rotate -= 0.1
         #    return True
         if direction == ScrollDirection.UP:
-            self.zoom_in()
+            self.queue_zoom(1.1)
         elif direction == ScrollDirection.DOWN:
-            self.zoom_out()
+            self.queue_zoom(0.9)
         return True
 
     def queue_draw(self): # pylint:disable=arguments-differ
-        """Queue drawing area redraw.
+        """Invalidate rendered image and queue drawing area redraw.
         """
         #super(DrawingWindow, self).queue_draw()
+        self._renderer.invalidate()
         self.screen.queue_draw()
 
+    def queue_draw_image_area(self, x, y, width, height):
+        """Invalidate image area and queue its redraw.
+
+        Parameters
+        ----------
+        x : `float`
+            Image area x.
+        y : `float`
+            Image area y.
+        width : `float`
+            Image area width.
+        height : `float`
+            Image area height.
+        """
+        # antialiasing margin
+        margin = 1
+        self._renderer.invalidate((x, y, width, height), margin)
+        left, top, right, bottom = round_rect(pad_rect(
+            transform_rect(self.get_matrix(), x, y, width, height), margin
+        ))
+        offset_x, offset_y = self.get_canvas_offset()
+        left -= offset_x
+        right -= offset_x
+        top -= offset_y
+        bottom -= offset_y
+        self.screen.queue_draw_area(left, top, right - left, bottom - top)
+
     def update_fit(self):
         """Update zoom to fit resized widget.
         """
-        self._do_fit()
+        with self.measure('fit'):
+            self._do_fit()
 
     def zoom_in(self):
         """Zoom in.
@@ -456,7 +1036,7 @@ class DrawingWindow(gtk.ScrolledWindow):
         """
         if all(size < wnd
                for size, wnd
-               in izip(self.get_size(), self.get_window_size())):
+               in izip(self.get_rotated_size(), self.get_window_size())):
             self.set_zoom(1)
         else:
             self.zoom_fit()
@@ -466,7 +1046,7 @@ class DrawingWindow(gtk.ScrolledWindow):
     def zoom_fit(self):
         """Zoom to fit width and height.
         """
-        img_width, img_height = self.get_size()
+        img_width, img_height = self.get_rotated_size()
         if img_width == 0 or img_height == 0:
             return
         width, height = self.get_window_size()
@@ -481,7 +1061,7 @@ class DrawingWindow(gtk.ScrolledWindow):
     def zoom_fit_width(self):
         """Zoom to fit width.
         """
-        img_width, img_height = self.get_size()
+        img_width, img_height = self.get_rotated_size()
         if img_width == 0 or img_height == 0:
             return
         width, height = self.get_window_size()
@@ -505,7 +1085,7 @@ class DrawingWindow(gtk.ScrolledWindow):
     def zoom_fit_height(self):
         """Zoom to fit height.
         """
-        img_width, img_height = self.get_size()
+        img_width, img_height = self.get_rotated_size()
         if img_width == 0 or img_height == 0:
             return
 
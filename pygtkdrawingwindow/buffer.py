@@ -0,0 +1,284 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import sys
+
+from .deps import IntEnum, cairo, numpy
+
+
+# Red, green, blue and alpha byte offsets in `cairo.FORMAT_ARGB32` pixel.
+if sys.byteorder == 'little':
+    ARGB32_CHANNELS = (2, 1, 0, 3)
+else:
+    ARGB32_CHANNELS = (1, 2, 3, 0)
+
+
+class PixelFormat(IntEnum):
+    """Image buffer pixel formats.
+
+    GRAY8
+        8-bit grayscale.
+    RGB24
+        8-bit R, G, B bytes.
+    RGBA32
+        8-bit R, G, B, A bytes, not premultiplied.
+    ARGB32
+        `cairo.FORMAT_ARGB32`: native-endian 32-bit premultiplied
+        ARGB (B, G, R, A bytes on little-endian machines).
+    """
+    GRAY8 = 0
+    RGB24 = 1
+    RGBA32 = 2
+    ARGB32 = 3
+
+
+BYTES_PER_PIXEL = {
+    PixelFormat.GRAY8: 1,
+    PixelFormat.RGB24: 3,
+    PixelFormat.RGBA32: 4,
+    PixelFormat.ARGB32: 4
+}
+"""`dict` of `PixelFormat` to `int` : Bytes per pixel by format.
+"""
+
+
+class ImageBuffer(object):
+    """Image in a buffer protocol object.
+
+    Attributes
+    ----------
+    data : `object`
+        Object exposing the buffer protocol (e.g. `bytearray`,
+        `numpy.ndarray`, `memoryview`).
+    width : `int`
+        Image width.
+    height : `int`
+        Image height.
+    format : `PixelFormat`
+        Pixel format.
+    stride : `int`
+        Row size in bytes.
+
+    Examples
+    --------
+    >>> frame = bytearray(640 * 480 * 4)
+    >>> widget.set_image(ImageBuffer(frame, 640, 480, PixelFormat.ARGB32))
+    """
+
+    def __init__(self, data, width, height, fmt, stride=None):
+        """Image buffer constructor.
+
+        Parameters
+        ----------
+        data : `object`
+            Object exposing the buffer protocol.
+        width : `int`
+        height : `int`
+        fmt : `PixelFormat`
+        stride : `int` or `None`, optional
+            Row size in bytes (default: width * bytes per pixel).
+        """
+        self.data = data
+        self.width = width
+        self.height = height
+        self.format = PixelFormat(fmt)
+        if stride is None:
+            stride = width * BYTES_PER_PIXEL[self.format]
+        self.stride = stride
+
+    @classmethod
+    def from_array(cls, array, fmt=None):
+        """Create image buffer from numpy array.
+
+        Parameters
+        ----------
+        array : `numpy.ndarray`
+            `numpy.uint8` array of shape (height, width) or
+            (height, width, channels).
+        fmt : `PixelFormat` or `None`, optional
+            Pixel format (default: GRAY8, RGB24 or RGBA32
+            depending on the number of channels).
+
+        Raises
+        ------
+        ValueError
+            If array type or shape is not supported.
+
+        Returns
+        -------
+        `ImageBuffer`
+        """
+        if array.dtype != numpy.uint8:
+            raise ValueError('Unsupported array type: %s' % array.dtype)
+        if array.ndim == 2:
+            channels = 1
+        elif array.ndim == 3:
+            channels = array.shape[2]
+        else:
+            raise ValueError('Unsupported array shape: %s'
+                             % repr(array.shape))
+        if fmt is None:
+            try:
+                fmt = {1: PixelFormat.GRAY8,
+                       3: PixelFormat.RGB24,
+                       4: PixelFormat.RGBA32}[channels]
+            except KeyError:
+                raise ValueError('Unsupported array shape: %s'
+                                 % repr(array.shape))
+        elif BYTES_PER_PIXEL[fmt] != channels:
+            raise ValueError('Array shape %s does not match format %s'
+                             % (repr(array.shape), PixelFormat(fmt).name))
+        height, width = array.shape[:2]
+        if not array.flags.c_contiguous:
+            array = numpy.ascontiguousarray(array)
+        return cls(array, width, height, fmt)
+
+    def get_cairo_format(self):
+        """Get cairo surface format.
+
+        Returns
+        -------
+        `int`
+            `cairo.FORMAT_A8` for grayscale images,
+            `cairo.FORMAT_ARGB32` otherwise.
+        """
+        if self.format == PixelFormat.GRAY8:
+            return cairo.FORMAT_A8
+        return cairo.FORMAT_ARGB32
+
+    def is_surface_compatible(self):
+        """
+        Returns
+        -------
+        `bool`
+            `True` if buffer can be used as cairo surface data
+            without copying.
+        """
+        if self.format not in (PixelFormat.GRAY8, PixelFormat.ARGB32):
+            return False
+        min_stride = cairo.ImageSurface.format_stride_for_width(
+            self.get_cairo_format(), self.width
+        )
+        try:
+            view = memoryview(self.data)
+        except TypeError:
+            return False
+        size = view.itemsize
+        for dim in view.shape:
+            size *= dim
+        return not view.readonly \
+            and getattr(view, 'c_contiguous', True) \
+            and self.stride % 4 == 0 \
+            and self.stride >= min_stride \
+            and size >= self.stride * self.height
+
+    def to_surface(self):
+        """Create cairo image surface.
+
+        Buffer data is shared with the surface if its format, row
+        alignment and writability allow it, and copied otherwise.
+        Grayscale images are stored as `cairo.FORMAT_A8` surfaces.
+
+        Returns
+        -------
+        `cairo.ImageSurface`
+        """
+        fmt = self.get_cairo_format()
+        if self.is_surface_compatible():
+            return cairo.ImageSurface.create_for_data(
+                self.data, fmt, self.width, self.height, self.stride
+            )
+        stride = cairo.ImageSurface.format_stride_for_width(fmt, self.width)
+        data = bytearray(stride * self.height)
+        if numpy is not None:
+            self._convert_numpy(data, stride)
+        else:
+            self._convert(data, stride)
+        return cairo.ImageSurface.create_for_data(
+            data, fmt, self.width, self.height, stride
+        )
+
+    def _convert_numpy(self, data, stride):
+        """Convert buffer data to cairo format using numpy.
+
+        Parameters
+        ----------
+        data : `bytearray`
+            Destination buffer.
+        stride : `int`
+            Destination row size in bytes.
+        """
+        size = BYTES_PER_PIXEL[self.format]
+        width = self.width
+        src = numpy.frombuffer(self.data, numpy.uint8,
+                               self.stride * (self.height - 1)
+                               + width * size)
+        src = numpy.lib.stride_tricks.as_strided(
+            src, (self.height, width, size), (self.stride, size, 1)
+        )
+        dst = numpy.frombuffer(data, numpy.uint8).reshape(self.height, stride)
+
+        if self.format == PixelFormat.GRAY8:
+            dst[:, :width] = src[:, :, 0]
+            return
+
+        dst = dst[:, :width * 4].reshape(self.height, width, 4)
+        if self.format == PixelFormat.ARGB32:
+            dst[...] = src
+            return
+
+        red, green, blue, alpha = ARGB32_CHANNELS
+        if self.format == PixelFormat.RGB24:
+            dst[:, :, alpha] = 255
+            for i, channel in enumerate((red, green, blue)):
+                dst[:, :, channel] = src[:, :, i]
+            return
+
+        src_alpha = src[:, :, 3].astype(numpy.uint16)
+        dst[:, :, alpha] = src[:, :, 3]
+        for i, channel in enumerate((red, green, blue)):
+            dst[:, :, channel] = (src[:, :, i] * src_alpha + 127) // 255
+
+    def _convert(self, data, stride):
+        """Convert buffer data to cairo format.
+
+        Parameters
+        ----------
+        data : `bytearray`
+            Destination buffer.
+        stride : `int`
+            Destination row size in bytes.
+        """
+        size = BYTES_PER_PIXEL[self.format]
+        width = self.width
+        src = memoryview(self.data).cast('B') \
+            if hasattr(memoryview, 'cast') else memoryview(self.data)
+        red, green, blue, alpha = ARGB32_CHANNELS
+
+        for y in range(self.height):
+            offset = y * self.stride
+            row = bytearray(src[offset:offset + width * size].tobytes())
+            dst = y * stride
+
+            if self.format == PixelFormat.GRAY8:
+                data[dst:dst + width] = row
+                continue
+
+            if self.format == PixelFormat.ARGB32:
+                data[dst:dst + width * 4] = row
+                continue
+
+            line = bytearray(width * 4)
+            for i, channel in enumerate((red, green, blue)):
+                line[channel::4] = row[i::size]
+            if self.format == PixelFormat.RGB24:
+                line[alpha::4] = b'\xff' * width
+            else:
+                line[alpha::4] = row[3::4]
+                for i in range(width):
+                    a = row[i * 4 + 3]
+                    if a == 255:
+                        continue
+                    for channel in (red, green, blue):
+                        j = i * 4 + channel
+                        line[j] = (line[j] * a + 127) // 255
+            data[dst:dst + width * 4] = line
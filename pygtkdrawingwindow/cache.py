@@ -0,0 +1,514 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+from time import time
+from math import log, floor, ceil
+from bisect import bisect_right
+from collections import OrderedDict
+
+from .deps import cairo, cairo_context_new
+from .util import get_timeval, get_pixbuf_digest, pixbuf_to_surface
+
+
+def get_surface_size(surface):
+    """Get image surface memory size.
+
+    Parameters
+    ----------
+    surface : `cairo.ImageSurface`
+
+    Returns
+    -------
+    `int`
+        Size in bytes.
+    """
+    return surface.get_stride() * surface.get_height()
+
+
+class SurfaceCache(object):
+    """Least recently used image surface cache with memory limit.
+
+    Attributes
+    ----------
+    max_bytes : `int`
+        Maximum total surface size in bytes.
+    _items : `collections.OrderedDict`
+        Cached surfaces in least recently used first order.
+    _bytes : `int`
+        Total surface size in bytes.
+
+    Examples
+    --------
+    >>> cache = SurfaceCache(2 ** 20)
+    >>> cache.add('key', cairo.ImageSurface(cairo.FORMAT_ARGB32, 256, 256))
+    >>> cache.get_bytes()
+    262144
+    >>> cache.get('key') is None
+    False
+    """
+
+    def __init__(self, max_bytes):
+        """Surface cache constructor.
+
+        Parameters
+        ----------
+        max_bytes : `int`
+            Maximum total surface size in bytes.
+        """
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def keys(self):
+        """Get cache keys.
+
+        Returns
+        -------
+        `list`
+            Keys in least recently used first order.
+        """
+        return list(self._items)
+
+    def get_bytes(self):
+        """Get total surface size.
+
+        Returns
+        -------
+        `int`
+            Size in bytes.
+        """
+        return self._bytes
+
+    def get(self, key):
+        """Get cached surface and mark it as recently used.
+
+        Parameters
+        ----------
+        key : hashable
+
+        Returns
+        -------
+        `cairo.ImageSurface` or `None`
+            Cached surface or `None` if not found.
+        """
+        try:
+            surface = self._items.pop(key)
+        except KeyError:
+            return None
+        self._items[key] = surface
+        return surface
+
+    def add(self, key, surface):
+        """Add a surface to cache.
+
+        Least recently used surfaces are removed if total size
+        exceeds the limit.
+
+        Parameters
+        ----------
+        key : hashable
+        surface : `cairo.ImageSurface`
+        """
+        self.remove(key)
+        self._items[key] = surface
+        self._bytes += get_surface_size(surface)
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            _, old = self._items.popitem(last=False)
+            self._bytes -= get_surface_size(old)
+
+    def remove(self, key):
+        """Remove a surface from cache.
+
+        Parameters
+        ----------
+        key : hashable
+        """
+        try:
+            surface = self._items.pop(key)
+        except KeyError:
+            return
+        self._bytes -= get_surface_size(surface)
+
+    def clear(self):
+        """Remove all surfaces from cache.
+        """
+        self._items.clear()
+        self._bytes = 0
+
+
+class MipmapPyramid(object):
+    """Power of two downscaled image pyramid.
+
+    Levels are created on first use. Level ``n`` is the image
+    downscaled ``2 ** n`` times.
+
+    Attributes
+    ----------
+    surface : `cairo.ImageSurface`
+        Full size image.
+    max_bytes : `int`
+        Maximum total size of downscaled levels in bytes.
+    _levels : `list` of `cairo.ImageSurface`
+        Created levels starting from full size image.
+    _bytes : `int`
+        Total size of downscaled levels in bytes.
+
+    Examples
+    --------
+    >>> pyramid = MipmapPyramid(surface, 2 ** 26)
+    >>> level, scale_x, scale_y = pyramid.get_level(0.2)
+    >>> level.get_width(), scale_x
+    (250, 4.0)
+    """
+
+    def __init__(self, surface, max_bytes):
+        """Mipmap pyramid constructor.
+
+        Parameters
+        ----------
+        surface : `cairo.ImageSurface`
+            Full size image.
+        max_bytes : `int`
+            Maximum total size of downscaled levels in bytes.
+        """
+        self.surface = surface
+        self.max_bytes = max_bytes
+        self._levels = [surface]
+        self._bytes = 0
+
+    def get_bytes(self):
+        """Get total size of downscaled levels.
+
+        Returns
+        -------
+        `int`
+            Size in bytes.
+        """
+        return self._bytes
+
+    def get_level(self, zoom):
+        """Get the smallest level not smaller than zoomed image.
+
+        Parameters
+        ----------
+        zoom : `float`
+            Zoom ratio.
+
+        Returns
+        -------
+        (`cairo.ImageSurface`, `float`, `float`)
+            Level surface and its x and y scale relative to full size
+            image. If memory limit is reached, the smallest created
+            level is returned.
+        """
+        if zoom >= 0.5:
+            index = 0
+        else:
+            index = int(floor(-log(zoom, 2)))
+        while len(self._levels) <= index and self._add_level():
+            pass
+        level = self._levels[min(index, len(self._levels) - 1)]
+        return (
+            level,
+            self.surface.get_width() / level.get_width(),
+            self.surface.get_height() / level.get_height()
+        )
+
+    def _add_level(self):
+        """Create next level.
+
+        Returns
+        -------
+        `bool`
+            `False` if image can not be downscaled or memory limit
+            is reached.
+        """
+        prev = self._levels[-1]
+        width = prev.get_width()
+        height = prev.get_height()
+        if width <= 1 and height <= 1:
+            return False
+        width = int(ceil(width / 2))
+        height = int(ceil(height / 2))
+        stride = cairo.ImageSurface.format_stride_for_width(
+            prev.get_format(), width
+        )
+        if self._bytes + stride * height > self.max_bytes:
+            return False
+
+        level = cairo.ImageSurface(prev.get_format(), width, height)
+        ctx = cairo_context_new(level)
+        ctx.scale(width / prev.get_width(), height / prev.get_height())
+        ctx.set_source_surface(prev, 0, 0)
+        ctx.get_source().set_filter(cairo.FILTER_GOOD)
+        ctx.get_source().set_extend(cairo.EXTEND_PAD)
+        ctx.set_operator(cairo.OPERATOR_SOURCE)
+        ctx.paint()
+        level.flush()
+
+        self._levels.append(level)
+        self._bytes += get_surface_size(level)
+        return True
+
+
+class AnimationFrames(object):
+    """Animation frame index with decoded frames.
+
+    Frame start times and delays are stored for every frame. Decoded
+    frames are stored for every frame if they fit into memory limit,
+    or for every ``store_interval``-th frame otherwise. Frames that are
+    not stored have to be taken from an animation iterator, which can
+    only be advanced from animation start.
+
+    Attributes
+    ----------
+    animation : `gtk.gdk.PixbufAnimation`
+        Source animation.
+    surfaces : `list` of (`cairo.ImageSurface` or `None`)
+        Frames (`None` if frame is not stored).
+    delays : `list` of `int`
+        Frame delays in milliseconds.
+    times : `list` of `int`
+        Frame start times in milliseconds.
+    duration : `int`
+        Animation loop duration in milliseconds.
+    loop : `bool`
+        `False` if animation stops at the last frame.
+    loop_count : `int`
+        Number of times animation loop is played (0: forever).
+    store_interval : `int`
+        Stored frame interval (0 if no frames are stored).
+
+    Examples
+    --------
+    >>> frames = AnimationFrames.decode(animation, 2 ** 26)
+    >>> frames.locate(1500)
+    (3, 20)
+    >>> frames.store_interval
+    1
+    """
+
+    def __init__(self, animation, surfaces, delays, loop,
+                 store_interval=1, loop_count=0):
+        """Animation frames constructor.
+
+        Parameters
+        ----------
+        animation : `gtk.gdk.PixbufAnimation`
+        surfaces : `list` of (`cairo.ImageSurface` or `None`)
+        delays : `list` of `int`
+        loop : `bool`
+        store_interval : `int`, optional
+        loop_count : `int`, optional
+        """
+        self.animation = animation
+        self.surfaces = surfaces
+        self.delays = delays
+        self.loop = loop
+        self.store_interval = store_interval
+        self.loop_count = loop_count
+        self.times = []
+        self.duration = 0
+        for delay in delays:
+            self.times.append(self.duration)
+            self.duration += delay
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def get_bytes(self):
+        """Get total stored frame size.
+
+        Returns
+        -------
+        `int`
+            Size in bytes.
+        """
+        return sum(get_surface_size(surface)
+                   for surface in self.surfaces
+                   if surface is not None)
+
+    def locate(self, time_):
+        """Get frame at a time.
+
+        Times up to a microsecond before a frame start are located to
+        that frame, since times converted from seconds may be rounded
+        down.
+
+        Parameters
+        ----------
+        time_ : `float`
+            Time from animation start in milliseconds.
+
+        Returns
+        -------
+        (`int`, `float`)
+            Frame index and time until next frame in milliseconds
+            (-1 if animation is finished).
+        """
+        epsilon = 1e-3
+        time_ += epsilon
+        if self.loop and self.duration > 0 \
+           and (not self.loop_count
+                or time_ < self.duration * self.loop_count):
+            time_ %= self.duration
+        elif time_ >= self.times[-1]:
+            return len(self.times) - 1, -1
+        index = bisect_right(self.times, time_) - 1
+        return index, self.times[index] + self.delays[index] - time_ \
+            + epsilon
+
+    @classmethod
+    def decode(cls, animation, max_bytes, max_frames=65536):
+        """Index animation and decode frames in one pass.
+
+        Every frame is copied, since animation iterators may composite
+        all frames into one shared pixbuf. Loop end is detected by frame
+        content and delay: a frame equal to the first frame starts a
+        loop candidate, which is accepted after the whole candidate loop
+        repeats and wraps to the first frame again. Candidate loops
+        whose frames are all equal are never accepted, since they can
+        not be told apart from a held first frame. Loop count is found
+        by checking whether animation is still playing after a number
+        of loops.
+
+        Frames after the first loop candidate are not stored, so a
+        repeated loop does not count against memory limit. If the
+        candidate is rejected, those frames are left to the iterator.
+        If stored frames exceed memory limit, stored frame interval is
+        doubled until they fit.
+
+        Parameters
+        ----------
+        animation : `gtk.gdk.PixbufAnimation`
+        max_bytes : `int`
+            Maximum total stored frame size in bytes.
+        max_frames : `int`, optional
+            Maximum number of decoded frames (default: 65536).
+
+        Returns
+        -------
+        `AnimationFrames` or `None`
+            Animation frames or `None` if frame count limit is exceeded
+            or loop end is uncertain.
+        """
+        start = time()
+        anim_iter = animation.get_iter(get_timeval(start))
+        surfaces = []
+        delays = []
+        digests = []
+        candidates = []
+        first_change = None
+        size = 0
+        interval = 1
+        loop = True
+        elapsed = 0
+
+        while True:
+            index = len(digests)
+            if index >= max_frames:
+                return None
+
+            digest = get_pixbuf_digest(anim_iter.get_pixbuf())
+            delay = anim_iter.get_delay_time()
+            if delay < 0:
+                loop = False
+                delay = 0
+            else:
+                delay = max(delay, 1)
+
+            candidates = [period for period in candidates
+                          if digests[index - period] == digest
+                          and delays[index - period] == delay]
+            if index and first_change is None \
+               and (digests[0] != digest or delays[0] != delay):
+                first_change = index
+            if loop:
+                if first_change is not None \
+                   and any(index == 2 * period and first_change < period
+                           for period in candidates):
+                    period = index // 2
+                    del surfaces[period:]
+                    del delays[period:]
+                    break
+                if index and digests[0] == digest and delays[0] == delay:
+                    candidates.append(index)
+
+            digests.append(digest)
+            delays.append(delay)
+            if interval and index % interval == 0 \
+               and not (loop and candidates):
+                surfaces.append(pixbuf_to_surface(anim_iter.get_pixbuf()))
+                size += get_surface_size(surfaces[-1])
+                while size > max_bytes and interval:
+                    interval *= 2
+                    if interval > max_frames:
+                        interval = 0
+                    for i, surface in enumerate(surfaces):
+                        if surface is not None \
+                           and (not interval or i % interval):
+                            size -= get_surface_size(surface)
+                            surfaces[i] = None
+            else:
+                surfaces.append(None)
+
+            if not loop:
+                break
+
+            elapsed += delay
+            # Half a millisecond past frame start: iterators round
+            # elapsed time down to milliseconds.
+            if not anim_iter.advance(get_timeval(start
+                                                 + (elapsed + 0.5) / 1000)):
+                return None
+
+        loop_count = 0
+        if loop:
+            loop_count = cls.get_loop_count(animation, sum(delays))
+        return cls(animation, surfaces, delays, loop, interval, loop_count)
+
+    @staticmethod
+    def get_loop_count(animation, duration, max_loops=65536):
+        """Get number of times animation loop is played.
+
+        Animation is assumed to play at least 3 times.
+
+        Parameters
+        ----------
+        animation : `gtk.gdk.PixbufAnimation`
+        duration : `int`
+            Loop duration in milliseconds.
+        max_loops : `int`, optional
+            Maximum loop count to check (default: 65536).
+
+        Returns
+        -------
+        `int`
+            Loop count (0: forever).
+        """
+        start = time()
+
+        def is_playing(loops):
+            """Check if animation is playing after a number of loops."""
+            anim_iter = animation.get_iter(get_timeval(start))
+            anim_iter.advance(get_timeval(start
+                                          + (loops * duration + 0.5) / 1000))
+            return anim_iter.get_delay_time() >= 0
+
+        max_loops = max(3, min(max_loops, 2 ** 31 // max(duration, 1)))
+        if is_playing(max_loops):
+            return 0
+        low = 2
+        high = max_loops
+        while high - low > 1:
+            middle = (low + high) // 2
+            if is_playing(middle):
+                low = middle
+            else:
+                high = middle
+        return high
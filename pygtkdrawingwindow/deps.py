@@ -17,7 +17,7 @@ try:
     import gobject
     import gtk
     from gtk import gdk
-    from gtk.gdk import Pixbuf, PixbufAnimation
+    from gtk.gdk import Pixbuf, PixbufAnimation, PixbufLoader
 
     TimeVal = None
 
@@ -35,8 +35,8 @@ except ImportError:
         GObject as gobject
     )
     from gi.repository.Gtk import ImageType, PolicyType, IconSize
-    from gi.repository.Gdk import ScrollDirection
-    from gi.repository.GdkPixbuf import Pixbuf, PixbufAnimation
+    from gi.repository.Gdk import ScrollDirection, VisibilityState
+    from gi.repository.GdkPixbuf import Pixbuf, PixbufAnimation, PixbufLoader
 
     try:
         from gi.repository.GLib import TimeVal
@@ -108,11 +108,30 @@ class NoRsvg(object):
 if rsvg is None:
     rsvg = NoRsvg
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from multiprocessing import (
+        get_context as mp_get_context,
+        get_all_start_methods as mp_get_start_methods
+    )
+except ImportError:
+    mp_get_context = None
+    mp_get_start_methods = None
+
 try:
     from itertools import izip
 except ImportError:
     izip = zip
 
+try:
+    from time import perf_counter as clock
+except ImportError:
+    from time import time as clock
+
 try:
     STRING_TYPES = (str, unicode)
 except NameError:
@@ -123,6 +142,23 @@ if PYGTK:
     gtk_image_new_from_stock = gtk.image_new_from_stock
     cairo_set_source_pixbuf = gdk.CairoContext.set_source_pixbuf
     rsvg_handle_new_from_file = rsvg.Handle
+    pixbuf_new_from_file_at_scale = gdk.pixbuf_new_from_file_at_scale
+    pixbuf_animation_new_from_file = gdk.PixbufAnimation
+    pixbuf_get_file_info = gdk.pixbuf_get_file_info
+    Scrollable = object
+
+    def cairo_context_new(surface):
+        """Create a cairo context for a surface.
+
+        Parameters
+        ----------
+        surface : `cairo.Surface`
+
+        Returns
+        -------
+        `gtk.gdk.CairoContext`
+        """
+        return gdk.CairoContext(cairo.Context(surface))
 
     class ImageType(IntEnum): # pylint:disable=function-redefined
         """PyGTK image types.
@@ -151,6 +187,13 @@ if PYGTK:
         RIGHT = gdk.SCROLL_RIGHT
         SMOOTH = -1
 
+    class VisibilityState(IntEnum): # pylint:disable=function-redefined
+        """PyGTK window visibility states.
+        """
+        UNOBSCURED = gdk.VISIBILITY_UNOBSCURED
+        PARTIAL = gdk.VISIBILITY_PARTIAL
+        FULLY_OBSCURED = gdk.VISIBILITY_FULLY_OBSCURED
+
     class IconSize(IntEnum): # pylint:disable=function-redefined
         """PyGTK icon sizes.
         """
@@ -161,3 +204,8 @@ else:
     gtk_image_new_from_stock = gtk.Image.new_from_stock
     cairo_set_source_pixbuf = gdk.cairo_set_source_pixbuf
     rsvg_handle_new_from_file = rsvg.Handle.new_from_file
+    cairo_context_new = cairo.Context
+    pixbuf_new_from_file_at_scale = Pixbuf.new_from_file_at_scale
+    pixbuf_animation_new_from_file = PixbufAnimation.new_from_file
+    pixbuf_get_file_info = Pixbuf.get_file_info
+    Scrollable = gtk.Scrollable
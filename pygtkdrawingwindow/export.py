@@ -0,0 +1,590 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import os
+import zlib
+import struct
+from os.path import splitext
+from math import ceil
+from functools import partial
+
+from .deps import (
+    STRING_TYPES, Pixbuf, PixbufAnimation, glib, cairo, rsvg, numpy,
+    cairo_context_new, rsvg_handle_new_from_file,
+    pixbuf_animation_new_from_file
+)
+from .util import (
+    find_image_loader, load_image, get_image_size, pixbuf_to_surface,
+    paint_surface, load_pixbuf_file, load_any_image_file
+)
+from .viewport import Viewport
+from .buffer import ARGB32_CHANNELS
+from .image import ImageWindow
+
+
+def get_export_matrix(width, height, zoom=1.0, angle=0.0):
+    """Get image to exported image transformation matrix.
+
+    Image is scaled, rotated around its center and translated so that
+    its bounding box starts at origin.
+
+    Parameters
+    ----------
+    width : `float`
+        Image width.
+    height : `float`
+        Image height.
+    zoom : `float`, optional
+        Zoom ratio (default: 1.0).
+    angle : `float`, optional
+        Rotation angle in radians (default: 0.0).
+
+    Returns
+    -------
+    (`cairo.Matrix`, `int`, `int`)
+        Transformation matrix, exported image width and height.
+    """
+    viewport = Viewport(width, height, zoom, angle)
+    width, height = (size * zoom for size in viewport.get_rotated_size())
+    viewport.set_screen_size(width, height)
+    return (viewport.get_matrix(),
+            max(1, int(ceil(width - 1e-6))),
+            max(1, int(ceil(height - 1e-6))))
+
+def get_fit_zoom(width, height, max_width, max_height, angle=0.0):
+    """Get zoom ratio that fits rotated image into a rectangle.
+
+    Parameters
+    ----------
+    width : `float`
+        Image width.
+    height : `float`
+        Image height.
+    max_width : `float`
+        Rectangle width.
+    max_height : `float`
+        Rectangle height.
+    angle : `float`, optional
+        Rotation angle in radians (default: 0.0).
+
+    Returns
+    -------
+    `float`
+    """
+    _, width, height = get_export_matrix(width, height, 1.0, angle)
+    return min(max_width / width, max_height / height)
+
+def load_image_file_headless(path):
+    """Load image from file without a display.
+
+    Uses registered image loaders, except that GdkPixbuf files are
+    loaded as `gtk.gdk.PixbufAnimation` instead of `gtk.Image`.
+
+    Parameters
+    ----------
+    path : `str`
+        Image file path.
+
+    Returns
+    -------
+    `object`
+        Loaded image of any type accepted by `load_image`.
+    """
+    loader = find_image_loader(path)
+    if loader is load_pixbuf_file:
+        return pixbuf_animation_new_from_file(path)
+    if loader is load_any_image_file:
+        try:
+            return rsvg_handle_new_from_file(path)
+        except glib.GError:
+            return pixbuf_animation_new_from_file(path)
+    return loader(path)
+
+def get_image_renderer(img, image_filter=cairo.FILTER_GOOD):
+    """Get render function of an image.
+
+    Does not need a widget or a display, so it can be used in batch
+    jobs. Image files are loaded with `load_image_file_headless`, and
+    animations are rendered at their static image.
+
+    Parameters
+    ----------
+    img : `str` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle` or `cairo.ImageSurface` or `ImageBuffer` or `numpy.ndarray`
+        Image or image file path.
+    image_filter : `int`, optional
+        Cairo filter for raster images (default: `cairo.FILTER_GOOD`).
+
+    Raises
+    ------
+    TypeError
+        If image type is invalid.
+
+    Returns
+    -------
+    (`function`, (`int`, `int`))
+        Render function func(ctx : `cairo.Context`) and image size.
+
+    Examples
+    --------
+    >>> render, size = get_image_renderer('image.svg')
+    >>> export(render, 'image.pdf', size=size)
+    """
+    if isinstance(img, STRING_TYPES):
+        img = load_image_file_headless(img)
+    img = load_image(img)
+    if isinstance(img, PixbufAnimation):
+        img = img.get_static_image()
+
+    if isinstance(img, rsvg.Handle):
+        return img.render_cairo, get_image_size(img)
+
+    if isinstance(img, Pixbuf):
+        img = pixbuf_to_surface(img)
+    if not isinstance(img, cairo.ImageSurface):
+        raise TypeError('Invalid image type: ' + str(img))
+    surface = img
+
+    def render(ctx):
+        """Draw image surface."""
+        paint_surface(ctx, surface, image_filter)
+
+    return render, get_image_size(surface)
+
+def get_renderer(source, size=None):
+    """Get render function and image size of an export source.
+
+    Full resolution image of `ImageWindow` decoded at display size
+    is loaded synchronously.
+
+    Parameters
+    ----------
+    source : `DrawingWindow` or `function`
+        Widget, or render function func(ctx : `cairo.Context`)
+        drawing in image coordinates.
+    size : (`float`, `float`) or `Viewport` or `None`, optional
+        Image size (default: widget image size).
+        Required for render functions.
+
+    Raises
+    ------
+    ValueError
+        If image size of a render function is not set.
+
+    Returns
+    -------
+    (`function`, `float`, `float`)
+        Render function, image width and height.
+    """
+    if callable(source):
+        if size is None:
+            raise ValueError('Image size is required for render functions')
+        render = source
+    else:
+        if isinstance(source, ImageWindow):
+            source.load_full_image()
+        render = partial(source.emit, 'render')
+        if size is None:
+            size = source.get_size()
+    if isinstance(size, Viewport):
+        size = size.get_size()
+    width, height = size
+    return render, width, height
+
+def render_to_context(render, ctx, matrix, background=None):
+    """Render image to a cairo context.
+
+    Parameters
+    ----------
+    render : `function`
+        Render function: render(ctx : `cairo.Context`).
+    ctx : `cairo.Context`
+        Target context.
+    matrix : `cairo.Matrix`
+        Image to target transformation matrix.
+    background : (`float`, `float`, `float`) or (`float`, `float`, `float`, `float`) or `None`, optional
+        Background color (default: transparent).
+    """
+    if background is not None:
+        ctx.save()
+        if len(background) == 4:
+            ctx.set_source_rgba(*background)
+        else:
+            ctx.set_source_rgb(*background)
+        ctx.paint()
+        ctx.restore()
+    ctx.save()
+    ctx.transform(matrix)
+    render(ctx)
+    ctx.restore()
+
+def render_surface(source, zoom=1.0, angle=0.0, fit=None, background=None,
+                   size=None):
+    """Render image to an image surface.
+
+    Widgets emit `render` signal and do not have to be realized.
+    Render functions do not need a display.
+
+    Parameters
+    ----------
+    source : `DrawingWindow` or `function`
+        Widget or render function. See `get_renderer`.
+    zoom : `float`, optional
+        Zoom ratio (default: 1.0).
+    angle : `float`, optional
+        Rotation angle in radians (default: 0.0).
+    fit : (`int`, `int`) or `None`, optional
+        Maximum image size. If set, zoom ratio is ignored and image
+        is scaled to fit (default: `None`).
+    background : `tuple` or `None`, optional
+        Background color (default: transparent).
+    size : (`float`, `float`) or `Viewport` or `None`, optional
+        Image size (default: widget image size).
+        Required for render functions.
+
+    Returns
+    -------
+    `cairo.ImageSurface`
+
+    Examples
+    --------
+    >>> widget = ImageWindow()
+    >>> widget.set_image('image.svg')
+    >>> surface = render_surface(widget, fit=(256, 256))
+    >>> surface.write_to_png('preview.png')
+    >>> render, size = get_image_renderer('image.svg')
+    >>> surface = render_surface(render, fit=(256, 256), size=size)
+    """
+    render, width, height = get_renderer(source, size)
+    if fit is not None:
+        zoom = get_fit_zoom(width, height, fit[0], fit[1], angle)
+    matrix, out_width, out_height = get_export_matrix(
+        width, height, zoom, angle
+    )
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, out_width, out_height)
+    ctx = cairo_context_new(surface)
+    render_to_context(render, ctx, matrix, background)
+    surface.flush()
+    return surface
+
+def export(source, path, fmt=None, zoom=1.0, angle=0.0,
+           fit=None, background=None, size=None):
+    """Render image to a file.
+
+    Parameters
+    ----------
+    source : `DrawingWindow` or `function`
+        Widget or render function. See `get_renderer`.
+    path : `str`
+        File path.
+    fmt : `str` or `None`, optional
+        File format: 'png', 'pdf' or 'svg' (default: file extension).
+    zoom : `float`, optional
+        Zoom ratio (default: 1.0).
+    angle : `float`, optional
+        Rotation angle in radians (default: 0.0).
+    fit : (`int`, `int`) or `None`, optional
+        Maximum image size (default: `None`). See `render_surface`.
+    background : `tuple` or `None`, optional
+        Background color (default: transparent).
+    size : (`float`, `float`) or `Viewport` or `None`, optional
+        Image size (default: widget image size).
+        Required for render functions.
+
+    Raises
+    ------
+    ValueError
+        If file format is not supported.
+    """
+    if fmt is None:
+        fmt = splitext(path)[1][1:]
+    fmt = fmt.lower()
+
+    if fmt == 'png':
+        surface = render_surface(source, zoom, angle, fit, background, size)
+        surface.write_to_png(path)
+        return
+
+    if fmt == 'pdf':
+        surface_type = cairo.PDFSurface
+    elif fmt == 'svg':
+        surface_type = cairo.SVGSurface
+    else:
+        raise ValueError('Unsupported file format: %s' % repr(fmt))
+
+    render, width, height = get_renderer(source, size)
+    if fit is not None:
+        zoom = get_fit_zoom(width, height, fit[0], fit[1], angle)
+    matrix, out_width, out_height = get_export_matrix(
+        width, height, zoom, angle
+    )
+    surface = surface_type(path, out_width, out_height)
+    ctx = cairo_context_new(surface)
+    render_to_context(render, ctx, matrix, background)
+    ctx.show_page()
+    surface.finish()
+
+def surface_to_png_rows(surface, rows, alpha=True):
+    """Convert image surface rows to PNG scanlines.
+
+    Uses numpy if it is available.
+
+    Parameters
+    ----------
+    surface : `cairo.ImageSurface`
+        Surface in `cairo.FORMAT_ARGB32`.
+    rows : `int`
+        Number of rows to convert.
+    alpha : `bool`, optional
+        `False` to drop alpha channel (default: `True`).
+
+    Returns
+    -------
+    `bytes`
+        RGBA or RGB scanlines with filter type bytes.
+    """
+    width = surface.get_width()
+    stride = surface.get_stride()
+    data = surface.get_data()
+    red, green, blue, alpha_ = ARGB32_CHANNELS
+    channels = [red, green, blue]
+    if alpha:
+        channels.append(alpha_)
+
+    if numpy is not None:
+        pixels = numpy.frombuffer(data, numpy.uint8, rows * stride)
+        pixels = pixels.reshape(rows, stride)[:, :width * 4]
+        pixels = pixels.reshape(rows, width, 4)[:, :, channels]
+        if alpha:
+            pixels = pixels.astype(numpy.uint32)
+            rgb = pixels[:, :, :3]
+            a = pixels[:, :, 3:]
+            rgb[...] = numpy.where(
+                a > 0, (rgb * 255 + a // 2) // numpy.maximum(a, 1), 0
+            )
+            pixels = numpy.minimum(pixels, 255).astype(numpy.uint8)
+        pixels = pixels.reshape(rows, width * len(channels))
+        pixels = numpy.hstack((numpy.zeros((rows, 1), numpy.uint8), pixels))
+        return pixels.tobytes()
+
+    size = len(channels)
+    ret = bytearray()
+    for y in range(rows):
+        offset = y * stride
+        row = bytes(data[offset:offset + width * 4])
+        line = bytearray(width * size)
+        for i, channel in enumerate(channels):
+            line[i::size] = row[channel::4]
+        if alpha:
+            for i in range(3, len(line), 4):
+                a = line[i]
+                if 0 < a < 255:
+                    for j in range(i - 3, i):
+                        line[j] = min(255, (line[j] * 255 + a // 2) // a)
+        ret.append(0)
+        ret.extend(line)
+    return bytes(ret)
+
+
+class PngWriter(object):
+    """Streaming PNG file writer.
+
+    Scanlines are compressed and written as they are added, so the
+    whole image is never kept in memory.
+
+    Attributes
+    ----------
+    fp : `file`
+        Output file.
+    width : `int`
+        Image width.
+    height : `int`
+        Image height.
+    alpha : `bool`
+        `True` if image has alpha channel.
+    rows : `int`
+        Number of written rows.
+    _compress : `zlib.Compress`
+        Image data compressor.
+
+    Examples
+    --------
+    >>> with open('image.png', 'wb') as fp:
+    ...     writer = PngWriter(fp, 100, 100)
+    ...     writer.write_surface(surface)
+    ...     writer.close()
+    """
+
+    def __init__(self, fp, width, height, alpha=True, compress_level=6):
+        """PNG writer constructor.
+
+        Writes PNG header.
+
+        Parameters
+        ----------
+        fp : `file`
+            Output file opened in binary mode.
+        width : `int`
+        height : `int`
+        alpha : `bool`, optional
+            `False` to write RGB image (default: `True`).
+        compress_level : `int`, optional
+            zlib compression level (default: 6).
+        """
+        self.fp = fp
+        self.width = width
+        self.height = height
+        self.alpha = alpha
+        self.rows = 0
+        self._compress = zlib.compressobj(compress_level)
+        fp.write(b'\x89PNG\r\n\x1a\n')
+        self._write_chunk(b'IHDR', struct.pack(
+            '>IIBBBBB', width, height, 8, 6 if alpha else 2, 0, 0, 0
+        ))
+
+    def _write_chunk(self, type_, data):
+        """Write PNG chunk.
+
+        Parameters
+        ----------
+        type_ : `bytes`
+            Chunk type.
+        data : `bytes`
+            Chunk data.
+        """
+        self.fp.write(struct.pack('>I', len(data)))
+        self.fp.write(type_)
+        self.fp.write(data)
+        crc = zlib.crc32(data, zlib.crc32(type_)) & 0xffffffff
+        self.fp.write(struct.pack('>I', crc))
+
+    def write_rows(self, data, rows):
+        """Write scanlines.
+
+        Parameters
+        ----------
+        data : `bytes`
+            Scanlines with filter type bytes.
+        rows : `int`
+            Number of scanlines.
+
+        Raises
+        ------
+        ValueError
+            If image height is exceeded.
+        """
+        if self.rows + rows > self.height:
+            raise ValueError('Image height exceeded')
+        self.rows += rows
+        data = self._compress.compress(data)
+        if data:
+            self._write_chunk(b'IDAT', data)
+
+    def write_surface(self, surface, rows=None):
+        """Write image surface rows.
+
+        Parameters
+        ----------
+        surface : `cairo.ImageSurface`
+            Surface in `cairo.FORMAT_ARGB32` with image width.
+        rows : `int`, optional
+            Number of rows to write (default: surface height).
+        """
+        if rows is None:
+            rows = surface.get_height()
+        self.write_rows(surface_to_png_rows(surface, rows, self.alpha), rows)
+
+    def close(self):
+        """Finish writing image.
+
+        Raises
+        ------
+        ValueError
+            If not all rows are written.
+        """
+        if self.rows != self.height:
+            raise ValueError('Expected %d rows, got %d'
+                             % (self.height, self.rows))
+        self._write_chunk(b'IDAT', self._compress.flush())
+        self._write_chunk(b'IEND', b'')
+
+
+def export_png_bands(source, path, zoom=1.0, angle=0.0, background=None,
+                     band_height=256, progress=None, compress_level=6,
+                     size=None):
+    """Render image to a PNG file band by band.
+
+    Only one band of the image is kept in memory, so images larger
+    than available memory can be exported. Can be called from a
+    worker thread with a render function that does not use GTK.
+
+    Parameters
+    ----------
+    source : `DrawingWindow` or `function`
+        Widget or render function. See `get_renderer`.
+    path : `str`
+        File path.
+    zoom : `float`, optional
+        Zoom ratio (default: 1.0).
+    angle : `float`, optional
+        Rotation angle in radians (default: 0.0).
+    background : `tuple` or `None`, optional
+        Background color (default: transparent). If it is opaque, RGB
+        image is written.
+    band_height : `int`, optional
+        Band height (default: 256).
+    progress : `function` or `None`, optional
+        Function to call after each band:
+        progress(rows : `int`, height : `int`) -> `bool`.
+        Exporting is cancelled if it returns `False`.
+    compress_level : `int`, optional
+        zlib compression level (default: 6).
+    size : (`float`, `float`) or `Viewport` or `None`, optional
+        Image size (default: widget image size).
+        Required for render functions.
+
+    Returns
+    -------
+    `bool`
+        `False` if exporting is cancelled and the file is removed.
+
+    Examples
+    --------
+    >>> def progress(rows, height):
+    ...     print('%d%%' % (100 * rows // height))
+    ...     return not cancelled
+    ...
+    >>> export_png_bands(widget, 'image.png', progress=progress)
+    """
+    render, width, height = get_renderer(source, size)
+    matrix, out_width, out_height = get_export_matrix(
+        width, height, zoom, angle
+    )
+    alpha = background is None or len(background) == 4
+    band_height = max(1, min(band_height, out_height))
+    band = cairo.ImageSurface(cairo.FORMAT_ARGB32, out_width, band_height)
+
+    created = False
+    done = False
+    try:
+        with open(path, 'wb') as fp:
+            created = True
+            writer = PngWriter(fp, out_width, out_height,
+                               alpha, compress_level)
+            for top in range(0, out_height, band_height):
+                ctx = cairo_context_new(band)
+                ctx.set_operator(cairo.OPERATOR_CLEAR)
+                ctx.paint()
+                ctx.set_operator(cairo.OPERATOR_OVER)
+                ctx.translate(0, -top)
+                render_to_context(render, ctx, matrix, background)
+                band.flush()
+                rows = min(band_height, out_height - top)
+                writer.write_surface(band, rows)
+                if progress is not None \
+                   and progress(writer.rows, out_height) is False:
+                    return False
+            writer.close()
+        done = True
+    finally:
+        if created and not done:
+            os.remove(path)
+    return True
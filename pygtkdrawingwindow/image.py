@@ -1,18 +1,27 @@
 from __future__ import division, print_function, absolute_import, with_statement
 
 from time import time
+from math import floor, ceil
 
 from .deps import (
-    PYGTK, gtk, gdk, gobject, cairo, rsvg,
-    Pixbuf, PixbufAnimation, IconSize,
-    cairo_set_source_pixbuf,
-    gtk_image_new_from_stock
+    PYGTK, STRING_TYPES, gtk, gdk, gobject, cairo, rsvg,
+    Pixbuf, PixbufAnimation, IconSize, VisibilityState,
+    cairo_context_new, gtk_image_new_from_stock,
+    pixbuf_new_from_file_at_scale
 )
 from .util import (
-    FitType, log, ignore_args,
-    load_image, get_image_size, get_timeval
+    FitType, FrameCallback, log, ignore_args, is_widget_visible,
+    load_image, get_image_size, get_timeval, find_image_loader,
+    load_pixbuf_file, get_pixbuf_file_info, get_matrix_scale,
+    get_quarter_turns, rotate_surface, paint_surface,
+    pixbuf_to_surface, update_surface
 )
 from .base import DrawingWindow
+from .cache import SurfaceCache, MipmapPyramid, AnimationFrames
+from .loader import ImageLoader
+
+
+VECTOR_SURFACES = (cairo.PDFSurface, cairo.PSSurface, cairo.SVGSurface)
 
 
 class ImageWindow(DrawingWindow):
@@ -24,40 +33,132 @@ class ImageWindow(DrawingWindow):
         Cairo filter for image scaling.
     new_image_fit : `FitType`
         Fit type to set on image change.
+    mipmap_max_bytes : `int`
+        Maximum size of downscaled static image copies used when zoomed
+        out, in bytes. 0 disables downscaled copies.
+    animation_max_bytes : `int`
+        Maximum size of decoded animation frames in bytes. If all frames
+        do not fit, only every n-th frame is stored and other frames are
+        taken from GdkPixbuf animation iterator, which is restarted from
+        animation start when seeking backwards. 0 disables frame
+        indexing.
+    decode_at_view_size : `bool`
+        `True` to decode raster image files at the size they will be
+        displayed at with `new_image_fit`, and decode full resolution
+        image when zoomed in past that size.
+    svg_max_bytes : `int`
+        Maximum size of rasterized SVG image tiles in bytes.
+        0 disables rasterization.
     _image : `None` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle`
         Background image.
+    _surface : `cairo.ImageSurface` or `None`
+        Cached background image (or current animation frame) surface.
+    _mipmaps : `MipmapPyramid` or `None`
+        Downscaled background image copies.
+    _rotated : `tuple` or `None`
+        Source surface, quarter turns, rotated surface and rotated to
+        source surface transformation matrix.
+    _loader : `ImageLoader` or `None`
+        Asynchronous image loader.
+    _full_image_path : `str` or `None`
+        Path to full resolution image if background image is
+        decoded at reduced size.
     _animation : `gtk.gdk.PixbufAnimationIter`
         Animation iterator.
+    _iter_base : `float`
+        Animation iterator start time.
+    _iter_time : `float`
+        Animation iterator current time.
+    _frames : `AnimationFrames` or `None`
+        Decoded animation frames.
+    _frames_image : `gtk.gdk.PixbufAnimation` or `None`
+        Animation `_frames` were decoded from.
+    _frame_index : `int`
+        Current frame index in `_frames`.
     _animation_time : `float` or `None`
-        Animation start/stop time.
+        Animation start time if animation is started,
+        animation position otherwise.
+    _playback_rate : `float`
+        Animation playback rate.
     _animation_timeout : `int` or `None`
         Animation timeout id.
-    _prev_delay : `int`
-        Previous frame delay in milliseconds.
+    _animation_frame : `FrameCallback`
+        Animation frame update.
+    _animation_running : `bool`
+        `True` if animation is started.
+    _animation_paused : `bool`
+        `True` if animation is paused until drawing area is visible.
+    _obscured : `bool`
+        `True` if drawing area is reported fully obscured.
+    _svg_tiles : `SurfaceCache`
+        Rasterized SVG image tiles. Keys are (zoom, column, row) tuples.
+    _svg_zoom : `float` or `None`
+        Zoom ratio SVG image is rasterized at.
+    _svg_timeout : `int` or `None`
+        SVG image rasterization timeout id.
     """
     MIN_ANIMATION_DELAY = 10
     """`int` : Minimum animation frame delay in milliseconds.
     """
+    SVG_TILE_SIZE = 256
+    """`int` : Rasterized SVG image tile width and height.
+    """
+    SVG_RASTER_DELAY = 200
+    """`int` : Delay before rasterizing SVG image at new zoom ratio
+    in milliseconds.
+    """
 
     if PYGTK:
-        EVENTS = DrawingWindow.EVENTS | gdk.STRUCTURE_MASK
+        EVENTS = DrawingWindow.EVENTS \
+                 | gdk.STRUCTURE_MASK \
+                 | gdk.VISIBILITY_NOTIFY_MASK
     else:
-        EVENTS = DrawingWindow.EVENTS | gdk.EventMask.STRUCTURE_MASK
+        EVENTS = DrawingWindow.EVENTS \
+                 | gdk.EventMask.STRUCTURE_MASK \
+                 | gdk.EventMask.VISIBILITY_NOTIFY_MASK
         """`EventMask` : Drawing area event mask.
         """
 
-    def __init__(self):
+    def __init__(self, virtual=False):
         """Drawing widget constructor.
+
+        Parameters
+        ----------
+        virtual : `bool`, optional
+            Use virtual canvas (default: `False`).
+            See `DrawingWindow`.
         """
-        super(ImageWindow, self).__init__()
+        super(ImageWindow, self).__init__(virtual)
 
         self._image = None
+        self._surface = None
+        self._mipmaps = None
+        self._rotated = None
+        self._loader = None
+        self._full_image_path = None
         self._animation_timeout = None
         self._animation_time = None
         self._animation = None
-        self._prev_delay = -1
+        self._iter_base = 0.0
+        self._iter_time = 0.0
+        self._playback_rate = 1.0
+        self._frames = None
+        self._frames_image = None
+        self._frame_index = 0
+        self._animation_frame = FrameCallback(self.screen,
+                                              self._animation_tick)
+        self._animation_running = False
+        self._animation_paused = False
+        self._obscured = False
+        self._svg_tiles = SurfaceCache(64 * 2 ** 20)
+        self._svg_zoom = None
+        self._svg_timeout = None
 
         self.image_filter = cairo.FILTER_NEAREST
+        self.mipmap_max_bytes = 64 * 2 ** 20
+        self.animation_max_bytes = 64 * 2 ** 20
+        self.decode_at_view_size = False
+        self.svg_max_bytes = 64 * 2 ** 20
         self.new_image_fit = FitType.FIT_OR_1TO1
 
         start = ignore_args(self.start_animation)
@@ -65,13 +166,17 @@ class ImageWindow(DrawingWindow):
         self.screen.connect('map_event', log('map')(start))
         self.screen.connect('unmap_event', log('unmap')(stop))
         self.screen.connect('destroy', log('destroy')(stop))
+        self.screen.connect('destroy', ignore_args(self.cancel_loading))
+        self.screen.connect('destroy', ignore_args(self._clear_svg_tiles))
+        self.screen.connect('visibility_notify_event',
+                            self.visibility_notify_event)
 
     def get_image(self):
         """Get background image.
 
         Returns
         -------
-        `None` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle`
+        `None` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle` or `cairo.ImageSurface`
             Background image.
         """
         return self._image
@@ -81,14 +186,236 @@ class ImageWindow(DrawingWindow):
 
         Parameters
         ----------
-        img : `None` or `str` or `gtk.Image` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle`
+        img : `None` or `str` or `gtk.Image` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle` or `cairo.ImageSurface` or `ImageBuffer` or `numpy.ndarray`
+            Background image. Image surfaces, and image buffers and
+            arrays in `cairo.FORMAT_ARGB32` compatible layout, are
+            displayed without copying pixel data (see
+            `queue_image_update`).
+        """
+        self.cancel_loading()
+        if self.decode_at_view_size \
+           and isinstance(img, STRING_TYPES) \
+           and self._load_scaled_image(img):
+            return
+        self._set_image(load_image(img, self))
+
+    def set_image_async(self, path, callback=None):
+        """Load background image asynchronously.
+
+        Partially loaded image is displayed while loading.
+        Loading is cancelled if another image is set before it is
+        finished. Images that are not loaded by GdkPixbuf
+        (e.g. SVG) are loaded synchronously.
+
+        Parameters
+        ----------
+        path : `str`
+            Image file path.
+        callback : `function`, optional
+            Function to call when loading is finished:
+            callback(widget : `ImageWindow`,
+                     image : `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle` or `None`,
+                     error : `Exception` or `None`)
+
+        Raises
+        ------
+        IOError
+            If image file can not be opened.
+        """
+        self.cancel_loading()
+
+        if find_image_loader(path) is not load_pixbuf_file:
+            self.set_image(path)
+            if callback is not None:
+                callback(self, self.get_image(), None)
+            return
+
+        def done(loader, error):
+            """Finish loading."""
+            self._loader = None
+            img = loader.get_image()
+            if error is None and img is not self.get_image():
+                self.stop_animation()
+                self._image = img
+                self.reset_animation()
+                self.queue_draw()
+                self.start_animation()
+            elif img is self.get_image():
+                self._mipmaps = None
+                self.queue_draw()
+            if callback is not None:
+                callback(self, img, error)
+
+        loader = ImageLoader(
+            path,
+            self._image_prepared,
+            self._image_updated,
+            done
+        )
+        loader.start()
+        self._loader = loader
+
+    def _get_new_image_zoom(self, width, height):
+        """Get approximate zoom ratio of a new image after fitting.
+
+        Parameters
+        ----------
+        width : `int`
+            Image width.
+        height : `int`
+            Image height.
+
+        Returns
+        -------
+        `float`
+        """
+        fit = self.new_image_fit
+        if fit == FitType.LAST:
+            fit = self.get_fit()
+        wnd_width, wnd_height = self.get_window_size()
+        if wnd_width <= 1 or wnd_height <= 1 or width <= 0 or height <= 0:
+            return 1.0
+        ratio_x = wnd_width / width
+        ratio_y = wnd_height / height
+        if fit in (FitType.FIT, FitType.FIT_OR_1TO1):
+            return min(ratio_x, ratio_y)
+        if fit == FitType.WIDTH:
+            return ratio_x
+        if fit == FitType.HEIGHT:
+            return ratio_y
+        return 1.0
+
+    def _load_scaled_image(self, path):
+        """Set background image decoded at display size.
+
+        Parameters
+        ----------
+        path : `str`
+            Image file path.
+
+        Returns
+        -------
+        `bool`
+            `False` if image should be decoded at full resolution.
+        """
+        if find_image_loader(path) is not load_pixbuf_file:
+            return False
+        info = get_pixbuf_file_info(path)
+        if info is None or info[0] in ('gif', 'ani'):
+            return False
+
+        _, width, height = info
+        zoom = self._get_new_image_zoom(width, height)
+        if zoom >= 1.0:
+            return False
+
+        pixbuf = pixbuf_new_from_file_at_scale(
+            path,
+            max(1, int(ceil(width * zoom))),
+            max(1, int(ceil(height * zoom))),
+            False
+        )
+        self._set_image(pixbuf, (width, height))
+        self._full_image_path = path
+        return True
+
+    def _load_full_image(self):
+        """Start loading full resolution background image.
+
+        Reduced size image is kept if image file can not be opened.
+        """
+        if self._full_image_path is None or self._loader is not None:
+            return
+
+        def done(loader, error):
+            """Replace reduced size image."""
+            self._loader = None
+            if error is not None:
+                return
+            self._full_image_path = None
+            self._image = loader.get_pixbuf()
+            self._surface = None
+            self._mipmaps = None
+            self.queue_draw()
+
+        loader = ImageLoader(self._full_image_path, done=done)
+        try:
+            loader.start()
+        except IOError:
+            self._full_image_path = None
+            return
+        self._loader = loader
+
+    def load_full_image(self):
+        """Load full resolution background image synchronously.
+
+        Replaces background image decoded at display size
+        (see `decode_at_view_size`), e.g. before exporting.
+        """
+        path = self._full_image_path
+        if path is None:
+            return
+        self.cancel_loading()
+        self._full_image_path = None
+        self._image = pixbuf_new_from_file_at_scale(path, -1, -1, True)
+        self._surface = None
+        self._mipmaps = None
+        self._rotated = None
+        self.queue_draw()
+
+    def cancel_loading(self):
+        """Cancel asynchronous image loading.
+        """
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader = None
+
+    def _image_prepared(self, loader):
+        """Display partially loaded image.
+
+        Parameters
+        ----------
+        loader : `ImageLoader`
+        """
+        self._set_image(loader.get_pixbuf())
+
+    def _image_updated(self, loader, x, y, width, height):
+        """Update partially loaded image area.
+
+        Parameters
+        ----------
+        loader : `ImageLoader`
+        x : `int`
+        y : `int`
+        width : `int`
+        height : `int`
+        """
+        pixbuf = loader.get_pixbuf()
+        if pixbuf is not self.get_image():
+            return
+        if self._surface is not None:
+            update_surface(self._surface, pixbuf, x, y, width, height)
+        self.queue_draw_image_area(x, y, width, height)
+
+    def _set_image(self, img, size=None):
+        """Set loaded background image.
+
+        Parameters
+        ----------
+        img : `None` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle` or `cairo.ImageSurface`
             Background image.
+        size : (`int`, `int`), optional
+            Displayed image size (default: image size).
         """
         self.stop_animation()
 
-        img = load_image(img, self)
-        width, height = get_image_size(img)
+        if size is None:
+            size = get_image_size(img)
+        width, height = size
         self._image = img
+        self._full_image_path = None
+        self._rotated = None
+        self._clear_svg_tiles()
         self.set_size(width, height)
         self.reset_animation()
         self.set_angle(0.0)
@@ -99,39 +426,480 @@ class ImageWindow(DrawingWindow):
         self.queue_draw()
         self.start_animation()
 
+    def get_image_surface(self):
+        """Get background image surface.
+
+        The surface is created on first use and cached until the image
+        or the current animation frame changes.
+
+        Returns
+        -------
+        `cairo.ImageSurface` or `None`
+            Image surface or `None` if background image is not a pixbuf
+            or an image surface.
+        """
+        if self._surface is None and self._frames is not None:
+            self._surface = self._frames.surfaces[self._frame_index]
+        if self._surface is None:
+            img = self.get_image()
+            if isinstance(img, cairo.ImageSurface):
+                self._surface = img
+            if isinstance(img, PixbufAnimation):
+                img = self._animation.get_pixbuf()
+            if isinstance(img, Pixbuf):
+                self._surface = pixbuf_to_surface(img)
+        return self._surface
+
+    def queue_image_update(self, x=None, y=None, width=None, height=None):
+        """Redraw background image after its pixel data was modified
+        in place.
+
+        Parameters
+        ----------
+        x : `int` or `None`, optional
+            Updated area x (default: whole image).
+        y : `int` or `None`, optional
+        width : `int` or `None`, optional
+        height : `int` or `None`, optional
+
+        Examples
+        --------
+        >>> frame = numpy.zeros((480, 640, 4), numpy.uint8)
+        >>> widget.set_image(ImageBuffer(frame, 640, 480, PixelFormat.ARGB32))
+        >>> camera.read_into(frame)
+        >>> widget.queue_image_update()
+        """
+        surface = self.get_image_surface()
+        if surface is None:
+            return
+        if x is None:
+            surface.mark_dirty()
+        else:
+            surface.mark_dirty_rectangle(x, y, width, height)
+        self._mipmaps = None
+        self._rotated = None
+        if x is None:
+            self.queue_draw()
+        else:
+            self.queue_draw_image_area(x, y, width, height)
+
+    def _clear_svg_tiles(self):
+        """Remove rasterized SVG image tiles.
+        """
+        if self._svg_timeout is not None:
+            gobject.source_remove(self._svg_timeout)
+            self._svg_timeout = None
+        self._svg_tiles.clear()
+        self._svg_zoom = None
+
+    def _rasterize_svg_timeout(self):
+        """Rasterize SVG image at current zoom ratio.
+
+        Returns
+        -------
+        `bool`
+            `False`
+        """
+        self._svg_timeout = None
+        self._svg_zoom = None
+        self.queue_draw()
+        return False
+
+    def _render_svg_tiles(self, img, zoom, tiles):
+        """Rasterize SVG image tiles.
+
+        The document is rendered once into a surface spanning all
+        tiles, clipped to them, and the surface is split into tiles.
+
+        Parameters
+        ----------
+        img : `rsvg.Handle`
+        zoom : `float`
+            Zoom ratio.
+        tiles : `list` of (`int`, `int`)
+            Tile columns and rows.
+
+        Returns
+        -------
+        `list` of `cairo.ImageSurface`
+            Tiles in the same order.
+        """
+        size = self.SVG_TILE_SIZE
+        left = min(column for column, _ in tiles)
+        top = min(row for _, row in tiles)
+        right = max(column for column, _ in tiles) + 1
+        bottom = max(row for _, row in tiles) + 1
+        area = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                  (right - left) * size,
+                                  (bottom - top) * size)
+        ctx = cairo_context_new(area)
+        ctx.translate(-left * size, -top * size)
+        for column, row in tiles:
+            ctx.rectangle(column * size, row * size, size, size)
+        ctx.clip()
+        ctx.scale(zoom, zoom)
+        img.render_cairo(ctx)
+        area.flush()
+
+        ret = []
+        for column, row in tiles:
+            tile = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
+            ctx = cairo_context_new(tile)
+            ctx.set_operator(cairo.OPERATOR_SOURCE)
+            ctx.set_source_surface(area, (left - column) * size,
+                                   (top - row) * size)
+            ctx.paint()
+            tile.flush()
+            ret.append(tile)
+        return ret
+
+    def _render_svg(self, ctx, img):
+        """Draw SVG image from rasterized tiles.
+
+        Tiles are rasterized at current zoom ratio and reused while
+        scrolling. Missing tiles of an expose are rasterized together
+        in one pass. After zoom ratio changes, tiles rasterized at
+        previous zoom ratio are drawn scaled until zoom ratio does not
+        change for `SVG_RASTER_DELAY` milliseconds. Areas that are not
+        rasterized at previous zoom ratio are rendered directly in one
+        pass, as are images drawn at a zoom ratio other than widget
+        zoom ratio (e.g. exported). Unscaled tiles are aligned to
+        device pixels.
+
+        Parameters
+        ----------
+        ctx : `cairo.Context`
+            Context in image coordinates.
+        img : `rsvg.Handle`
+        """
+        zoom = get_matrix_scale(ctx.get_matrix())
+        if abs(zoom - self.get_zoom()) > 1e-6 * zoom:
+            img.render_cairo(ctx)
+            return
+        if self._svg_zoom is None:
+            self._svg_zoom = zoom
+        elif self._svg_zoom != zoom:
+            if self._svg_timeout is not None:
+                gobject.source_remove(self._svg_timeout)
+            self._svg_timeout = gobject.timeout_add(
+                self.SVG_RASTER_DELAY, self._rasterize_svg_timeout
+            )
+        stale = self._svg_zoom != zoom
+        zoom = self._svg_zoom
+
+        size = self.SVG_TILE_SIZE
+        width, height = self.get_size()
+        left, top, right, bottom = ctx.clip_extents()
+        left = max(left, 0.0)
+        top = max(top, 0.0)
+        right = min(right, width)
+        bottom = min(bottom, height)
+        if left >= right or top >= bottom:
+            return
+        columns = range(int(floor(left * zoom / size)),
+                        int(ceil(right * zoom / size)))
+        rows = range(int(floor(top * zoom / size)),
+                     int(ceil(bottom * zoom / size)))
+
+        self._svg_tiles.max_bytes = self.svg_max_bytes
+        ctx.save()
+        ctx.scale(1 / zoom, 1 / zoom)
+        matrix = ctx.get_matrix()
+        if get_quarter_turns(matrix) is not None \
+           and abs(get_matrix_scale(matrix) - 1.0) < 1e-6:
+            # Align tile edges to device pixels to avoid seams.
+            xx, yx, xy, yy, x0, y0 = matrix
+            ctx.set_matrix(cairo.Matrix(xx, yx, xy, yy,
+                                        round(x0), round(y0)))
+        tiles = [((column, row), self._svg_tiles.get((zoom, column, row)))
+                 for row in rows for column in columns]
+        empty = [pos for pos, tile in tiles if tile is None]
+        if empty and not stale:
+            rendered = dict(zip(empty,
+                                self._render_svg_tiles(img, zoom, empty)))
+            for (column, row), tile in rendered.items():
+                self._svg_tiles.add((zoom, column, row), tile)
+            tiles = [(pos, rendered.get(pos, tile)) for pos, tile in tiles]
+        missing = []
+        for (column, row), tile in tiles:
+            x = column * size
+            y = row * size
+            if tile is None:
+                missing.append((x, y))
+                continue
+            ctx.set_source_surface(tile, x, y)
+            ctx.get_source().set_extend(cairo.EXTEND_PAD)
+            ctx.rectangle(x, y, size, size)
+            ctx.fill()
+        if missing:
+            for x, y in missing:
+                ctx.rectangle(x, y, size, size)
+            ctx.clip()
+            ctx.scale(zoom, zoom)
+            img.render_cairo(ctx)
+        ctx.restore()
+
+    def get_rotated_surface(self, surface, turns):
+        """Get background image surface rotated by right angle.
+
+        The last rotated surface is cached.
+
+        Parameters
+        ----------
+        surface : `cairo.ImageSurface`
+            Background image surface or its mipmap level.
+        turns : `int`
+            Number of clockwise quarter turns.
+
+        Returns
+        -------
+        (`cairo.ImageSurface`, `cairo.Matrix`)
+            Rotated surface and rotated to source surface
+            transformation matrix.
+        """
+        rotated = self._rotated
+        if rotated is None or rotated[0] is not surface \
+           or rotated[1] != turns:
+            rotated = (surface, turns) + rotate_surface(surface, turns)
+            self._rotated = rotated
+        return rotated[2:]
+
+    def get_mipmaps(self):
+        """Get downscaled background image copies.
+
+        Returns
+        -------
+        `MipmapPyramid` or `None`
+            Mipmap pyramid or `None` if background image is animated,
+            is not a pixbuf, is being loaded progressively or mipmaps
+            are disabled.
+            Mipmaps are built once loading is finished.
+        """
+        loader = self._loader
+        if self.mipmap_max_bytes <= 0 or self.has_animation() \
+           or (loader is not None and loader.is_running()
+               and loader.get_pixbuf() is self.get_image()):
+            self._mipmaps = None
+            return None
+        surface = self.get_image_surface()
+        if surface is None:
+            self._mipmaps = None
+        elif self._mipmaps is None \
+             or self._mipmaps.surface is not surface:
+            self._mipmaps = MipmapPyramid(surface, self.mipmap_max_bytes)
+        else:
+            self._mipmaps.max_bytes = self.mipmap_max_bytes
+        return self._mipmaps
+
     def start_animation(self):
         """Start animation.
         """
         if not self.has_animation():
             return
         self.stop_animation()
-        self._prev_delay = -1
-        start_time = time()
-        if self._animation_time is not None:
-            start = get_timeval(start_time - self._animation_time)
-            self._animation = self.get_image().get_iter(start)
-        self._animation_time = start_time
-        self._animation_timeout = gobject.idle_add(self.animation_step)
+        position = self._animation_time
+        self._animation_time = time() - position / self._playback_rate
+        self._animation_running = True
+        self._animation_paused = False
+        self._animation_frame.schedule()
 
     def stop_animation(self):
         """Stop animation.
         """
         if not self.get_animation():
             return
-        gobject.source_remove(self._animation_timeout)
-        self._prev_delay = -1
-        self._animation_time = time() - self._animation_time
-        self._animation_timeout = None
+        if self._animation_timeout is not None:
+            gobject.source_remove(self._animation_timeout)
+            self._animation_timeout = None
+        self._animation_frame.cancel()
+        self._animation_time = self.get_animation_position()
+        self._animation_running = False
+        self._animation_paused = False
 
     def reset_animation(self):
         """Restart animation.
         """
+        img = self.get_image()
         if self.has_animation():
-            self._animation = self.get_image().get_iter()
-            self._animation_time = time()
+            if self._frames_image is not img:
+                self._frames_image = img
+                self._frames = None
+                if self.animation_max_bytes > 0:
+                    self._frames = AnimationFrames.decode(
+                        img, self.animation_max_bytes
+                    )
+            self._iter_base = time()
+            self._iter_time = self._iter_base
+            self._animation = img.get_iter(get_timeval(self._iter_base))
+            self._frame_index = 0
+            if self.get_animation():
+                self._animation_time = time()
+            else:
+                self._animation_time = 0.0
         else:
             self._animation = None
+            self._frames = None
+            self._frames_image = None
             self._animation_time = None
+        self._surface = None
+        self._mipmaps = None
+
+    def get_animation_position(self):
+        """Get animation time.
+
+        Returns
+        -------
+        `float` or `None`
+            Time from animation start in seconds or `None` if
+            background image is not animated.
+        """
+        if not self.has_animation():
+            return None
+        if self._animation_running:
+            return (time() - self._animation_time) * self._playback_rate
+        return self._animation_time
+
+    def get_playback_rate(self):
+        """Get animation playback rate.
+
+        Returns
+        -------
+        `float`
+        """
+        return self._playback_rate
+
+    def set_playback_rate(self, rate):
+        """Set animation playback rate.
+
+        Parameters
+        ----------
+        rate : `float`
+            Playback rate (1.0 is normal speed).
+
+        Raises
+        ------
+        ValueError
+            If playback rate is not positive.
+        """
+        if rate <= 0:
+            raise ValueError('Invalid playback rate: %s' % repr(rate))
+        position = self.get_animation_position()
+        self._playback_rate = rate
+        if self._animation_running:
+            self._animation_time = time() - position / rate
+            self._restart_animation_timer()
+
+    def get_frame_count(self):
+        """Get animation frame count.
+
+        Returns
+        -------
+        `int` or `None`
+            Frame count or `None` if animation is not indexed.
+        """
+        if self._frames is None:
+            return None
+        return len(self._frames)
+
+    def seek(self, position):
+        """Show animation frame at a time.
+
+        Stored animation frames are shown without decoding. Other
+        frames are decoded by GdkPixbuf animation iterator, so seeking
+        to them takes up to the time of decoding all preceding frames.
+
+        Parameters
+        ----------
+        position : `float`
+            Time from animation start in seconds.
+        """
+        if not self.has_animation():
+            return
+        position = max(0.0, position)
+        if self._animation_running:
+            self._animation_time = time() - position / self._playback_rate
+            self._restart_animation_timer()
+        else:
+            self._animation_time = position
+            self._show_animation_frame(position)
+
+    def seek_frame(self, index):
+        """Show animation frame by index.
+
+        Parameters
+        ----------
+        index : `int`
+            Frame index.
+
+        Raises
+        ------
+        ValueError
+            If animation is not indexed.
+        """
+        if not self.has_animation():
+            return
+        if self._frames is None:
+            raise ValueError('Animation frame index is not available')
+        self.seek(self._frames.times[index % len(self._frames)] / 1000)
+
+    def _restart_animation_timer(self):
+        """Show current animation frame and reschedule next frame.
+        """
+        if self._animation_timeout is not None:
+            gobject.source_remove(self._animation_timeout)
+            self._animation_timeout = None
+        self._animation_frame.schedule()
+
+    def _advance_iter(self, position):
+        """Advance animation iterator.
+
+        Parameters
+        ----------
+        position : `float`
+            Time from animation start in seconds.
+
+        Returns
+        -------
+        `bool`
+            `True` if iterator frame changed.
+        """
+        target = self._iter_base + position
+        if target < self._iter_time:
+            self._animation = self.get_image().get_iter(
+                get_timeval(self._iter_base)
+            )
+        self._iter_time = target
+        return self._animation.advance(get_timeval(target))
+
+    def _show_animation_frame(self, position):
+        """Show animation frame at a time.
+
+        Parameters
+        ----------
+        position : `float`
+            Time from animation start in seconds.
+
+        Returns
+        -------
+        `float`
+            Animation time until next frame in milliseconds
+            (-1 if animation is finished).
+        """
+        frames = self._frames
+        if frames is None:
+            if self._advance_iter(position):
+                self._surface = None
+                self.queue_draw()
+            return self._animation.get_delay_time()
+
+        index, delay = frames.locate(position * 1000)
+        if frames.surfaces[index] is None:
+            self._advance_iter(position)
+        if index != self._frame_index:
+            self._frame_index = index
+            self._surface = None
+            self.queue_draw()
+        return delay
 
     def has_animation(self):
         """
@@ -149,7 +917,7 @@ class ImageWindow(DrawingWindow):
         `bool`
             `True` if animation is started.
         """
-        return self._animation_timeout is not None
+        return self._animation_running
 
     def set_animation(self, enable):
         """Set animation state.
@@ -164,60 +932,188 @@ class ImageWindow(DrawingWindow):
         else:
             self.stop_animation()
 
+    def is_animation_visible(self):
+        """
+        Returns
+        -------
+        `bool`
+            `False` if drawing area is unmapped, scrolled out of sight
+            or reported fully obscured. GTK 3 does not deliver
+            `visibility-notify` events under a compositing window
+            manager or on Wayland, so obscured drawing areas are
+            treated as visible there.
+        """
+        return not self._obscured and is_widget_visible(self.screen)
+
     def animation_step(self):
         """Animation timeout.
+
+        Requests a frame clock tick to show next frame, or pauses
+        animation until the next expose if drawing area is not visible.
+
+        Returns
+        -------
+        `bool`
+            `False` to remove timeout.
         """
-        if self._animation is None or self.get_window() is None:
-            self._animation_timeout = None
+        self._animation_timeout = None
+        if not self._animation_running:
+            return False
+        if not self.is_animation_visible():
+            self._animation_paused = True
             return False
+        self._animation_frame.schedule()
+        return False
+
+    def _resume_animation(self):
+        """Resume animation paused by `animation_step`.
+        """
+        if self._animation_paused:
+            self._animation_paused = False
+            self._animation_frame.schedule()
+
+    def _animation_tick(self):
+        """Show animation frame for current time and schedule next frame.
+
+        Frames whose time has passed are skipped.
+        """
+        if not self._animation_running or self._animation is None:
+            return
 
-        self._animation.advance()
-        self.screen.queue_draw()
+        position = self.get_animation_position()
+        with self.measure('animation'):
+            delay = self._show_animation_frame(position)
 
-        delay = self._animation.get_delay_time()
         if delay < 0:
-            self._animation_timeout = None
-            return False
-        delay = max(self.MIN_ANIMATION_DELAY, delay)
-        #print(delay, self._prev_delay)
-        if abs(delay - self._prev_delay) < 10:
-            return True
+            self._animation_time = position
+            self._animation_running = False
+            return
 
-        self._prev_delay = delay
         self._animation_timeout = gobject.timeout_add(
-            delay,
+            max(self.MIN_ANIMATION_DELAY,
+                int(ceil(delay / self._playback_rate))),
             self.animation_step
         )
+
+    def visibility_notify_event(self, _, event):
+        """Handle drawing area `visibility-notify` event.
+
+        Only delivered by X11 without compositing; see
+        `is_animation_visible`.
+
+        Parameters
+        ----------
+        _ : `gtk.DrawingArea`
+        event : `gtk.gdk.Event`
+
+        Returns
+        -------
+        `bool`
+            `True` to stop event propagation.
+        """
+        self._obscured = event.state == VisibilityState.FULLY_OBSCURED
+        if not self._obscured:
+            self._resume_animation()
         return False
 
+    def draw_event(self, widget, ctx):
+        """Handle drawing area `draw` event.
+
+        Resumes paused animation before drawing, since renderers may
+        repaint from cache without emitting `render`.
+
+        Parameters
+        ----------
+        widget : `gtk.DrawingArea`
+        ctx : `cairo.Context`
+        """
+        self._resume_animation()
+        super(ImageWindow, self).draw_event(widget, ctx)
+
+    def prepare_render(self, matrix):
+        """Capture background image state for rendering.
+
+        Starts loading full resolution image if needed, and selects image surface, mipmap level and
+        pre-rotated surface for a transformation. Must be called on
+        the main thread.
+
+        Parameters
+        ----------
+        matrix : `cairo.Matrix`
+            Image to device transformation matrix.
+
+        Returns
+        -------
+        (`object`, `cairo.ImageSurface` or `None`, `cairo.Matrix` or `None`, `int`)
+            Background image, surface to draw, surface to image
+            transformation matrix and image filter.
+        """
+        img = self.get_image()
+        if img is None \
+           or not isinstance(img, (Pixbuf, PixbufAnimation,
+                                   cairo.ImageSurface)):
+            return (img, None, None, self.image_filter)
+
+        surface = self.get_image_surface()
+        width, height = self.get_size()
+        scale_x = width / surface.get_width()
+        scale_y = height / surface.get_height()
+        zoom = get_matrix_scale(matrix) * max(scale_x, scale_y)
+        if zoom > 1.0:
+            self._load_full_image()
+        transform = cairo.Matrix(scale_x, 0, 0, scale_y, 0, 0)
+        mipmaps = self.get_mipmaps()
+        if mipmaps is not None:
+            surface, scale_x, scale_y = mipmaps.get_level(zoom)
+            transform.scale(scale_x, scale_y)
+        turns = get_quarter_turns(transform.multiply(matrix))
+        if not turns or self.has_animation() \
+           or (self._loader is not None and self._loader.is_running()):
+            self._rotated = None
+        else:
+            surface, rotation = self.get_rotated_surface(surface, turns)
+            transform = rotation.multiply(transform)
+        return (img, surface, transform, self.image_filter)
+
     def do_render(self, ctx):
         """Handle `render` signal.
 
+        Uses render state captured by `ThreadRenderer` if the signal
+        is emitted on its worker thread. SVG images are not rasterized
+        into tiles in that case.
+
         Parameters
         ----------
         ctx : `cairo.Context`
         """
-        img = self.get_image()
+        state = self.get_render_state()
+        threaded = state is not None
+        if not threaded:
+            state = self.prepare_render(ctx.get_matrix())
+        img, surface, transform, filter_ = state
 
         if img is None:
             return
 
         if isinstance(img, rsvg.Handle):
-            img.render_cairo(ctx)
+            if self.svg_max_bytes > 0 and not threaded \
+               and not isinstance(ctx.get_target(), VECTOR_SURFACES):
+                self._render_svg(ctx, img)
+            else:
+                img.render_cairo(ctx)
             return
 
-        if isinstance(img, PixbufAnimation):
-            img = self._animation.get_pixbuf()
-
-        if isinstance(img, Pixbuf):
-            cairo_set_source_pixbuf(ctx, img, 0, 0)
-            ctx.get_source().set_filter(self.image_filter)
-            ctx.paint()
+        if surface is not None:
+            ctx.save()
+            ctx.transform(transform)
+            paint_surface(ctx, surface, filter_)
+            ctx.restore()
             return
 
+        if threaded:
+            return
         err = gtk_image_new_from_stock(gtk.STOCK_MISSING_IMAGE, IconSize.DIALOG)
         self.set_image(err)
         #raise ValueError('Invalid image: ' + str(img))
 
-
 gobject.type_register(ImageWindow)
@@ -0,0 +1,187 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+from .deps import gobject, glib, PixbufLoader
+
+
+class ImageLoader(object):
+    """Asynchronous image file loader.
+
+    Reads image file in chunks from an idle callback and feeds them to
+    a `gtk.gdk.PixbufLoader`, so the main loop is not blocked.
+
+    Attributes
+    ----------
+    CHUNK_SIZE : `int`
+        Number of bytes to read per idle callback.
+    path : `str`
+        Image file path.
+    loader : `gtk.gdk.PixbufLoader`
+        Pixbuf loader.
+    prepared : `function` or `None`
+        Function to call when image size and pixbuf are known:
+        prepared(loader : `ImageLoader`)
+    updated : `function` or `None`
+        Function to call when pixbuf area is decoded:
+        updated(loader : `ImageLoader`, x, y, width, height)
+    done : `function` or `None`
+        Function to call when loading is finished:
+        done(loader : `ImageLoader`, error : `glib.GError` or `None`)
+    _file : `file` or `None`
+        Image file.
+    _source : `int` or `None`
+        Idle source id.
+
+    Examples
+    --------
+    >>> def done(loader, error):
+    ...     if error is None:
+    ...         print(loader.get_image())
+    ...
+    >>> ImageLoader('image.png', done=done).start()
+    """
+    CHUNK_SIZE = 2 ** 16
+
+    def __init__(self, path, prepared=None, updated=None, done=None):
+        """Image loader constructor.
+
+        Parameters
+        ----------
+        path : `str`
+            Image file path.
+        prepared : `function`, optional
+        updated : `function`, optional
+        done : `function`, optional
+        """
+        self.path = path
+        self.prepared = prepared
+        self.updated = updated
+        self.done = done
+        self.loader = PixbufLoader()
+        self.loader.connect('area_prepared', self.area_prepared_event)
+        self.loader.connect('area_updated', self.area_updated_event)
+        self._file = None
+        self._source = None
+
+    def is_running(self):
+        """
+        Returns
+        -------
+        `bool`
+            `True` if loading is started and not finished.
+        """
+        return self._source is not None
+
+    def get_pixbuf(self):
+        """Get partially or fully loaded image.
+
+        Returns
+        -------
+        `gtk.gdk.Pixbuf` or `None`
+        """
+        return self.loader.get_pixbuf()
+
+    def get_image(self):
+        """Get loaded image.
+
+        Returns
+        -------
+        `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `None`
+            Loaded image or `None` if image is not prepared.
+        """
+        img = self.loader.get_animation()
+        if img is None or img.is_static_image():
+            return self.get_pixbuf()
+        return img
+
+    def start(self):
+        """Start loading.
+
+        Raises
+        ------
+        IOError
+            If image file can not be opened.
+        """
+        self._file = open(self.path, 'rb')
+        self._source = gobject.idle_add(self.step)
+
+    def cancel(self):
+        """Cancel loading.
+        """
+        if self._source is None:
+            return
+        gobject.source_remove(self._source)
+        self._source = None
+        self._close()
+
+    def step(self):
+        """Read and decode next chunk.
+
+        Returns
+        -------
+        `bool`
+            `False` if loading is finished.
+        """
+        try:
+            data = self._file.read(self.CHUNK_SIZE)
+            if data:
+                self.loader.write(data)
+                return True
+        except (IOError, glib.GError) as err:
+            self._finish(err)
+            return False
+        self._finish(None)
+        return False
+
+    def _close(self):
+        """Close image file and pixbuf loader.
+
+        Returns
+        -------
+        `glib.GError` or `None`
+            Pixbuf loader error.
+        """
+        self._file.close()
+        try:
+            self.loader.close()
+        except glib.GError as err:
+            return err
+        return None
+
+    def _finish(self, error):
+        """Finish loading.
+
+        Parameters
+        ----------
+        error : `Exception` or `None`
+            Loading error.
+        """
+        self._source = None
+        err = self._close()
+        if error is None:
+            error = err
+        if self.done is not None:
+            self.done(self, error)
+
+    def area_prepared_event(self, _):
+        """Handle pixbuf loader `area-prepared` event.
+
+        Parameters
+        ----------
+        _ : `gtk.gdk.PixbufLoader`
+        """
+        if self.prepared is not None:
+            self.prepared(self)
+
+    def area_updated_event(self, _, x, y, width, height):
+        """Handle pixbuf loader `area-updated` event.
+
+        Parameters
+        ----------
+        _ : `gtk.gdk.PixbufLoader`
+        x : `int`
+        y : `int`
+        width : `int`
+        height : `int`
+        """
+        if self.updated is not None:
+            self.updated(self, x, y, width, height)
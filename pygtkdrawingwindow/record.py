@@ -0,0 +1,398 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import gzip
+import json
+from time import time
+
+from .deps import gtk, gobject, clock
+
+
+EVENT_FIELDS = {
+    'scroll': ('direction', 'state', 'x', 'y', 'delta_x', 'delta_y'),
+    'motion': ('x', 'y', 'x_root', 'y_root', 'state'),
+    'leave': ('x', 'y'),
+    'size': ('width', 'height')
+}
+"""`dict` of `str` to `tuple` of `str` : Recorded event fields by type.
+"""
+
+
+def open_record_file(path, mode):
+    """Open event record file.
+
+    Files with '.gz' extension are compressed.
+
+    Parameters
+    ----------
+    path : `str`
+    mode : `str`
+        'r' or 'w'.
+
+    Returns
+    -------
+    `file`
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 'b')
+    return open(path, mode + 'b')
+
+
+class SyntheticEvent(object):
+    """Synthetic GDK event.
+
+    Examples
+    --------
+    >>> event = SyntheticEvent(direction=ScrollDirection.UP, state=0)
+    >>> widget.scroll_event(None, event)
+    True
+    """
+
+    def __init__(self, **kwargs):
+        """Synthetic event constructor.
+
+        Parameters
+        ----------
+        **kwargs
+            Event attributes.
+        """
+        self.__dict__.update(kwargs)
+
+
+class EventRecorder(object):
+    """Drawing widget input event recorder.
+
+    Records `scroll-event`, `motion-notify-event`,
+    `leave-notify-event` and widget `size-allocate` with time offsets
+    in milliseconds.
+
+    Attributes
+    ----------
+    widget : `DrawingWindow` or `None`
+        Recorded widget.
+    events : `list` of `list`
+        Recorded events: [time, type, field values...].
+    _start : `float`
+        Recording start time.
+    _handler : `int` or `None`
+        Widget `size-allocate` handler id.
+
+    Examples
+    --------
+    >>> recorder = EventRecorder()
+    >>> recorder.start(widget)
+    >>> # ...
+    >>> recorder.stop()
+    >>> recorder.save('session.jsonl.gz')
+    """
+
+    def __init__(self):
+        """Event recorder constructor.
+        """
+        self.widget = None
+        self.events = []
+        self._start = 0.0
+        self._handler = None
+
+    def start(self, widget):
+        """Start recording.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+            Widget to record.
+        """
+        self.stop()
+        self.widget = widget
+        self.events = []
+        self._start = clock()
+        self._handler = widget.connect('size_allocate',
+                                       self.size_allocate_event)
+        widget.set_recorder(self)
+        rect = widget.get_allocation()
+        self.add('size', width=rect.width, height=rect.height)
+
+    def stop(self):
+        """Stop recording.
+        """
+        if self.widget is None:
+            return
+        self.widget.disconnect(self._handler)
+        self.widget.set_recorder(None)
+        self.widget = None
+        self._handler = None
+
+    def add(self, type_, event=None, **kwargs):
+        """Record an event.
+
+        Parameters
+        ----------
+        type_ : `str`
+            Event type (see `EVENT_FIELDS`).
+        event : `gtk.gdk.Event` or `None`, optional
+            Event to get field values from.
+        **kwargs
+            Field values.
+        """
+        record = [int(round((clock() - self._start) * 1000)), type_]
+        for field in EVENT_FIELDS[type_]:
+            if field in kwargs:
+                value = kwargs[field]
+            else:
+                value = getattr(event, field, 0)
+            if isinstance(value, float):
+                value = round(value, 2)
+            else:
+                value = int(value)
+            record.append(value)
+        self.events.append(record)
+
+    def size_allocate_event(self, _, rect):
+        """Handle widget `size-allocate` event.
+
+        Parameters
+        ----------
+        _ : `DrawingWindow`
+        rect : `gtk.gdk.Rectangle`
+        """
+        if self.events and self.events[-1][1] == 'size' \
+           and self.events[-1][2:] == [rect.width, rect.height]:
+            return
+        self.add('size', width=rect.width, height=rect.height)
+
+    def save(self, path):
+        """Save recorded events.
+
+        File contains a JSON header line and a JSON array line
+        per event.
+
+        Parameters
+        ----------
+        path : `str`
+            File path.
+        """
+        with open_record_file(path, 'w') as fp:
+            header = {'version': 1, 'time': time(), 'fields': EVENT_FIELDS}
+            fp.write((json.dumps(header) + '\n').encode('utf-8'))
+            for event in self.events:
+                line = json.dumps(event, separators=(',', ':')) + '\n'
+                fp.write(line.encode('utf-8'))
+
+
+class EventReplayer(object):
+    """Drawing widget input event replayer.
+
+    Scroll, motion and leave events are passed to widget event
+    handlers. Recorded widget size is applied by resizing the toplevel
+    window by the difference between recorded and current widget
+    size. Offscreen windows, which are sized by their size request,
+    and widgets that are not in a window are resized with
+    `set_size_request`, and their original size request is restored
+    when replay is finished or stopped.
+
+    Attributes
+    ----------
+    widget : `DrawingWindow`
+        Widget to replay events to.
+    events : `list` of `list`
+        Events to replay.
+    speed : `float` or `None`
+        Replay speed multiplier (`None`: as fast as possible).
+    done : `function` or `None`
+        Function to call when replay is finished:
+        done(replayer : `EventReplayer`)
+    index : `int`
+        Next event index.
+    _source : `int` or `None`
+        Timeout or idle source id.
+    _start : `float`
+        Replay start time.
+    _size_request : (`gtk.Widget`, (`int`, `int`)) or `None`
+        Resized widget and its original size request.
+
+    Examples
+    --------
+    >>> replayer = EventReplayer.load(widget, 'session.jsonl.gz')
+    >>> widget.set_stats(FrameStats(trace=True))
+    >>> replayer.play(speed=None, done=lambda r: gtk.main_quit())
+    """
+
+    def __init__(self, widget, events):
+        """Event replayer constructor.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+        events : `list` of `list`
+        """
+        self.widget = widget
+        self.events = events
+        self.speed = 1.0
+        self.done = None
+        self.index = 0
+        self._source = None
+        self._start = 0.0
+        self._size_request = None
+
+    @classmethod
+    def load(cls, widget, path):
+        """Load recorded events.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+        path : `str`
+            File path.
+
+        Raises
+        ------
+        ValueError
+            If file version is not supported.
+
+        Returns
+        -------
+        `EventReplayer`
+        """
+        with open_record_file(path, 'r') as fp:
+            lines = fp.read().decode('utf-8').splitlines()
+        header = json.loads(lines[0])
+        if header.get('version') != 1:
+            raise ValueError('Unsupported event record version: %s'
+                             % repr(header.get('version')))
+        return cls(widget, [json.loads(line) for line in lines[1:] if line])
+
+    def is_running(self):
+        """
+        Returns
+        -------
+        `bool`
+            `True` if replay is started and not finished.
+        """
+        return self._source is not None
+
+    def dispatch(self, record):
+        """Pass an event to widget.
+
+        Parameters
+        ----------
+        record : `list`
+            Recorded event.
+        """
+        type_ = record[1]
+        fields = dict(zip(EVENT_FIELDS[type_], record[2:]))
+        widget = self.widget
+        if type_ == 'size':
+            self.resize(fields['width'], fields['height'])
+            return
+        event = SyntheticEvent(**fields)
+        if type_ == 'scroll':
+            widget.scroll_event(widget, event)
+        elif type_ == 'motion':
+            widget.motion_notify_event(widget.screen, event)
+        elif type_ == 'leave':
+            widget.leave_notify_event(widget.screen, event)
+
+    def resize(self, width, height):
+        """Resize widget.
+
+        Parameters
+        ----------
+        width : `int`
+        height : `int`
+        """
+        widget = self.widget
+        window = widget.get_toplevel()
+        if isinstance(window, gtk.Window):
+            rect = widget.get_allocation()
+            wnd_width, wnd_height = window.get_size()
+            width = max(1, wnd_width + width - rect.width)
+            height = max(1, wnd_height + height - rect.height)
+            if not isinstance(window, gtk.OffscreenWindow):
+                window.resize(width, height)
+                return
+            widget = window
+        if self._size_request is None:
+            self._size_request = (widget, tuple(widget.get_size_request()))
+        widget.set_size_request(width, height)
+
+    def restore_size(self):
+        """Restore original size request of resized widget.
+        """
+        if self._size_request is not None:
+            widget, request = self._size_request
+            widget.set_size_request(*request)
+            self._size_request = None
+
+    def replay(self):
+        """Replay all events synchronously, applying pending zoom and
+        scroll after each event and size allocation after each resize.
+        """
+        for record in self.events[self.index:]:
+            self.dispatch(record)
+            if record[1] == 'size':
+                while gtk.events_pending():
+                    gtk.main_iteration()
+            self.widget.flush_pending()
+        self.index = len(self.events)
+        self.restore_size()
+
+    def play(self, speed=1.0, done=None):
+        """Start replaying events from the main loop.
+
+        Parameters
+        ----------
+        speed : `float` or `None`, optional
+            Replay speed multiplier (default: 1.0).
+            `None` to replay as fast as possible.
+        done : `function` or `None`, optional
+            Function to call when replay is finished.
+        """
+        self.stop()
+        self.speed = speed
+        self.done = done
+        self.index = 0
+        self._start = clock()
+        self._schedule()
+
+    def stop(self):
+        """Stop replaying events.
+        """
+        if self._source is not None:
+            gobject.source_remove(self._source)
+            self._source = None
+        self.restore_size()
+
+    def _schedule(self):
+        """Schedule next event.
+        """
+        if self.index >= len(self.events):
+            self._source = None
+            self.restore_size()
+            if self.done is not None:
+                self.done(self)
+            return
+        if self.speed is None:
+            self._source = gobject.idle_add(self._step)
+            return
+        delay = self.events[self.index][0] / self.speed \
+                - (clock() - self._start) * 1000
+        self._source = gobject.timeout_add(max(0, int(delay)), self._step)
+
+    def _step(self):
+        """Replay events that are due and schedule next event.
+
+        Returns
+        -------
+        `bool`
+            `False`
+        """
+        while self.index < len(self.events):
+            record = self.events[self.index]
+            if self.speed is not None \
+               and record[0] / self.speed > (clock() - self._start) * 1000:
+                break
+            self.index += 1
+            self.dispatch(record)
+            if self.speed is None:
+                break
+        self._schedule()
+        return False
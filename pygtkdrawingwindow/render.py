@@ -0,0 +1,712 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+from math import floor, ceil
+from traceback import print_exc
+from threading import Thread, Condition
+from multiprocessing import Pool
+
+from .deps import (
+    gobject, cairo, cairo_context_new, mp_get_context, mp_get_start_methods
+)
+from .util import (
+    transform_rect, round_rect, pad_rect, intersect_rect, subtract_rect
+)
+from .cache import SurfaceCache
+
+
+def _render_tile_data(job):
+    """Render a tile in a worker process.
+
+    Parameters
+    ----------
+    job : `tuple`
+        Render function, its arguments, image transformation,
+        tile size, column and row.
+
+    Returns
+    -------
+    (`bytes`, `int`)
+        Tile data in `cairo.FORMAT_ARGB32` and its stride.
+    """
+    func, args, transform, size, column, row = job
+    tile = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
+    ctx = cairo.Context(tile)
+    ctx.translate(-column * size, -row * size)
+    ctx.transform(cairo.Matrix(*transform))
+    func(ctx, *args)
+    tile.flush()
+    return bytes(tile.get_data()), tile.get_stride()
+
+
+class Renderer(object):
+    """Direct renderer.
+
+    Emits `render` signal for every exposed area of the drawing area.
+    """
+
+    def draw(self, widget, ctx):
+        """Draw image.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+            Widget to draw.
+        ctx : `cairo.Context`
+            Drawing area context clipped to exposed area.
+        """
+        ctx.transform(widget.get_matrix())
+        widget.emit('render', ctx)
+
+    def invalidate(self, rect=None, margin=0):
+        """Invalidate rendered image.
+
+        Parameters
+        ----------
+        rect : (`float`, `float`, `float`, `float`) or `None`, optional
+            Image area x, y, width and height (default: whole image).
+        margin : `float`, optional
+            Drawing area margin around transformed image area,
+            e.g. for antialiasing (default: 0).
+        """
+        pass
+
+    def close(self):
+        """Release renderer resources.
+
+        Called when widget is destroyed or renderer is replaced.
+        """
+        pass
+
+
+class TileRenderer(Renderer):
+    """Tile caching renderer.
+
+    Drawing area is split into fixed size tiles. Each tile is rendered
+    once per image transformation and reused on subsequent exposes
+    until invalidated.
+
+    Attributes
+    ----------
+    tile_size : `int`
+        Tile width and height.
+    cache : `SurfaceCache`
+        Tile cache. Keys are (transformation, column, row) tuples.
+
+    Examples
+    --------
+    >>> widget = DrawingWindow()
+    >>> widget.set_renderer(TileRenderer(256, 64 * 2 ** 20))
+    >>> widget.connect('render', render)
+    >>> widget.queue_draw_image_area(0, 0, 16, 16)
+    """
+
+    def __init__(self, tile_size=256, max_bytes=64 * 2 ** 20):
+        """Tile renderer constructor.
+
+        Parameters
+        ----------
+        tile_size : `int`, optional
+            Tile width and height (default: 256).
+        max_bytes : `int`, optional
+            Maximum tile cache size in bytes (default: 64 MiB).
+        """
+        self.tile_size = tile_size
+        self.cache = SurfaceCache(max_bytes)
+
+    def get_tiles(self, rect):
+        """Get tiles intersecting an area.
+
+        Parameters
+        ----------
+        rect : (`float`, `float`, `float`, `float`)
+            Area left, top, right and bottom coordinates.
+
+        Returns
+        -------
+        `list` of (`int`, `int`)
+            Tile columns and rows.
+        """
+        size = self.tile_size
+        left, top, right, bottom = rect
+        columns = range(int(floor(left / size)), int(ceil(right / size)))
+        rows = range(int(floor(top / size)), int(ceil(bottom / size)))
+        return [(column, row) for row in rows for column in columns]
+
+    def render_tile(self, widget, matrix, column, row):
+        """Render a tile.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+            Widget to render.
+        matrix : `cairo.Matrix`
+            Image to drawing area transformation matrix.
+        column : `int`
+            Tile column.
+        row : `int`
+            Tile row.
+
+        Returns
+        -------
+        `cairo.ImageSurface`
+            Rendered tile.
+        """
+        size = self.tile_size
+        tile = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
+        ctx = cairo_context_new(tile)
+        ctx.translate(-column * size, -row * size)
+        ctx.transform(matrix)
+        widget.emit('render', ctx)
+        tile.flush()
+        return tile
+
+    def draw(self, widget, ctx):
+        matrix = widget.get_matrix()
+        transform = tuple(matrix)
+        size = self.tile_size
+        for column, row in self.get_tiles(ctx.clip_extents()):
+            key = (transform, column, row)
+            tile = self.cache.get(key)
+            if tile is None:
+                tile = self.render_tile(widget, matrix, column, row)
+                self.cache.add(key, tile)
+            x = column * size
+            y = row * size
+            ctx.set_source_surface(tile, x, y)
+            ctx.rectangle(x, y, size, size)
+            ctx.fill()
+
+    def invalidate(self, rect=None, margin=0):
+        if rect is None:
+            self.cache.clear()
+            return
+        tiles = {}
+        for key in self.cache.keys():
+            transform, column, row = key
+            if transform not in tiles:
+                area = pad_rect(
+                    transform_rect(cairo.Matrix(*transform), *rect), margin
+                )
+                tiles[transform] = set(self.get_tiles(area))
+            if (column, row) in tiles[transform]:
+                self.cache.remove(key)
+
+
+class ScrollRenderer(Renderer):
+    """Scroll-by-copy renderer.
+
+    Keeps the previous frame of the visible area. When the visible area
+    moves without changing image transformation, the previous frame is
+    shifted by the scroll delta and `render` signal is emitted only for
+    newly exposed strips.
+
+    Attributes
+    ----------
+    _frame : `cairo.ImageSurface` or `None`
+        Previous frame.
+    _back : `cairo.ImageSurface` or `None`
+        Frame buffer to reuse.
+    _rect : (`int`, `int`, `int`, `int`) or `None`
+        Previous frame left, top, right and bottom coordinates.
+    _transform : `tuple` of `float` or `None`
+        Previous frame image transformation.
+    _dirty : `list` of (`int`, `int`, `int`, `int`)
+        Invalidated areas of previous frame.
+
+    Examples
+    --------
+    >>> widget = DrawingWindow()
+    >>> widget.set_renderer(ScrollRenderer())
+    """
+
+    def __init__(self):
+        """Scroll renderer constructor.
+        """
+        self._frame = None
+        self._back = None
+        self._rect = None
+        self._transform = None
+        self._dirty = []
+
+    def draw(self, widget, ctx):
+        x, y, width, height = widget.get_visible_area()
+        rect = round_rect((x, y, x + width, y + height))
+        left, top, right, bottom = rect
+        width = right - left
+        height = bottom - top
+        if width <= 0 or height <= 0:
+            super(ScrollRenderer, self).draw(widget, ctx)
+            return
+
+        matrix = widget.get_matrix()
+        transform = tuple(matrix)
+
+        frame = self._back
+        if frame is None \
+           or frame.get_width() != width \
+           or frame.get_height() != height:
+            frame = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        frame_ctx = cairo_context_new(frame)
+        frame_ctx.set_operator(cairo.OPERATOR_SOURCE)
+
+        if self._frame is not None and self._transform == transform:
+            frame_ctx.set_source_surface(
+                self._frame,
+                self._rect[0] - left,
+                self._rect[1] - top
+            )
+            frame_ctx.paint()
+            dirty = subtract_rect(rect, self._rect)
+            for area in self._dirty:
+                area = intersect_rect(rect, area)
+                if area is not None:
+                    dirty.append(area)
+        else:
+            dirty = [rect]
+
+        frame_ctx.translate(-left, -top)
+        for area in dirty:
+            frame_ctx.save()
+            frame_ctx.rectangle(area[0], area[1],
+                                area[2] - area[0], area[3] - area[1])
+            frame_ctx.clip()
+            frame_ctx.set_operator(cairo.OPERATOR_CLEAR)
+            frame_ctx.paint()
+            frame_ctx.set_operator(cairo.OPERATOR_OVER)
+            frame_ctx.transform(matrix)
+            widget.emit('render', frame_ctx)
+            frame_ctx.restore()
+        frame.flush()
+
+        self._back = self._frame
+        self._frame = frame
+        self._rect = rect
+        self._transform = transform
+        self._dirty = []
+
+        ctx.set_source_surface(frame, left, top)
+        ctx.paint()
+
+    def invalidate(self, rect=None, margin=0):
+        if rect is None:
+            self._frame = None
+            self._dirty = []
+        elif self._frame is not None:
+            matrix = cairo.Matrix(*self._transform)
+            self._dirty.append(round_rect(
+                pad_rect(transform_rect(matrix, *rect), margin)
+            ))
+
+
+class ThreadRenderer(Renderer):
+    """Background thread renderer.
+
+    Visible area is rendered into an image surface on a worker thread,
+    so `render` handlers do not block the main loop. The last rendered
+    frame is drawn, transformed to current image transformation, until
+    a new frame is ready. When image transformation or visible area
+    changes, pending frame is discarded. Invalidated areas of the last
+    frame are re-rendered into its copy while the frame is current.
+    The worker thread is stopped by `close`.
+
+    Widget state is captured on the main thread with
+    `DrawingWindow.prepare_render`, and `render` signal is emitted on
+    the worker thread with `DrawingWindow.emit_render`. `render`
+    handlers must not call GTK functions or modify widget state;
+    they can read the captured state with
+    `DrawingWindow.get_render_state`. Exceptions raised by `render`
+    handlers are printed and the frame is discarded.
+
+    Attributes
+    ----------
+    _cond : `threading.Condition`
+        Job queue condition.
+    _thread : `threading.Thread` or `None`
+        Worker thread.
+    _job : `tuple` or `None`
+        Next job generation, widget, matrix, area, render state and
+        base frame.
+    _generation : `int`
+        Last job generation.
+    _pending : `tuple` or `None`
+        Last job image transformation and area.
+    _frame : `cairo.ImageSurface` or `None`
+        Last rendered frame.
+    _key : `tuple` or `None`
+        Last rendered frame image transformation and area.
+    _dirty : `list` of (`int`, `int`, `int`, `int`) or `None`
+        Invalidated areas of last rendered frame, or `None` if the
+        whole frame is invalidated.
+    _closed : `bool`
+        `True` if renderer is closed.
+
+    Examples
+    --------
+    >>> widget = DrawingWindow()
+    >>> widget.set_renderer(ThreadRenderer())
+    """
+
+    def __init__(self):
+        """Thread renderer constructor.
+        """
+        gobject.threads_init()
+        self._cond = Condition()
+        self._thread = None
+        self._job = None
+        self._generation = 0
+        self._pending = None
+        self._frame = None
+        self._key = None
+        self._dirty = None
+        self._closed = False
+
+    def draw(self, widget, ctx):
+        x, y, width, height = widget.get_visible_area()
+        rect = round_rect((x, y, x + width, y + height))
+        if rect[2] <= rect[0] or rect[3] <= rect[1]:
+            return
+
+        matrix = widget.get_matrix()
+        key = (tuple(matrix), rect)
+
+        if self._frame is not None:
+            transform, frame_rect = self._key
+            ctx.save()
+            if transform != key[0]:
+                relative = cairo.Matrix(*transform)
+                relative.invert()
+                ctx.transform(relative.multiply(matrix))
+            ctx.set_source_surface(self._frame, frame_rect[0], frame_rect[1])
+            ctx.paint()
+            ctx.restore()
+
+        if self._pending == key:
+            return
+        if self._key != key or self._dirty is None:
+            base = None
+        else:
+            dirty = [area for area in (intersect_rect(rect, area)
+                                       for area in self._dirty)
+                     if area is not None]
+            if not dirty:
+                self._dirty = []
+                return
+            base = (self._frame, dirty)
+        self.submit(widget, matrix, rect, widget.prepare_render(matrix),
+                    base)
+
+    def invalidate(self, rect=None, margin=0):
+        if rect is None or self._frame is None or self._dirty is None:
+            self._dirty = None
+        else:
+            matrix = cairo.Matrix(*self._key[0])
+            self._dirty.append(round_rect(
+                pad_rect(transform_rect(matrix, *rect), margin)
+            ))
+        self._pending = None
+
+    def close(self):
+        """Stop worker thread.
+
+        Waits for the current job to finish.
+        """
+        with self._cond:
+            self._closed = True
+            self._job = None
+            self._pending = None
+            self._cond.notify()
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            thread.join()
+        self._frame = None
+
+    def submit(self, widget, matrix, rect, state=None, base=None):
+        """Replace pending job.
+
+        Does nothing if renderer is closed.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+            Widget to render.
+        matrix : `cairo.Matrix`
+            Image to drawing area transformation matrix.
+        rect : (`int`, `int`, `int`, `int`)
+            Area left, top, right and bottom coordinates.
+        state : `object` or `None`, optional
+            Render state returned by `DrawingWindow.prepare_render`.
+        base : (`cairo.ImageSurface`, `list`) or `None`, optional
+            Frame of the same area and its areas to re-render
+            (default: render whole area).
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._generation += 1
+            self._pending = (tuple(matrix), rect)
+            self._job = (self._generation, widget, matrix, rect, state,
+                         base)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def render(self, widget, matrix, rect, state=None, base=None):
+        """Render an area.
+
+        Parameters
+        ----------
+        widget : `DrawingWindow`
+            Widget to render.
+        matrix : `cairo.Matrix`
+            Image to drawing area transformation matrix.
+        rect : (`int`, `int`, `int`, `int`)
+            Area left, top, right and bottom coordinates.
+        state : `object` or `None`, optional
+            Render state returned by `DrawingWindow.prepare_render`.
+        base : (`cairo.ImageSurface`, `list`) or `None`, optional
+            Frame of the same area and left, top, right and bottom
+            coordinates of its areas to re-render (default: render
+            whole area). Base frame is copied, not modified.
+
+        Returns
+        -------
+        `cairo.ImageSurface`
+            Rendered area.
+        """
+        left, top, right, bottom = rect
+        frame = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                   right - left, bottom - top)
+        ctx = cairo_context_new(frame)
+        if base is not None:
+            base_frame, areas = base
+            ctx.set_source_surface(base_frame, 0, 0)
+            ctx.set_operator(cairo.OPERATOR_SOURCE)
+            ctx.paint()
+            ctx.translate(-left, -top)
+            for area in areas:
+                ctx.rectangle(area[0], area[1],
+                              area[2] - area[0], area[3] - area[1])
+            ctx.clip()
+            ctx.set_operator(cairo.OPERATOR_CLEAR)
+            ctx.paint()
+            ctx.set_operator(cairo.OPERATOR_OVER)
+        else:
+            ctx.translate(-left, -top)
+        ctx.transform(matrix)
+        widget.emit_render(ctx, state)
+        frame.flush()
+        return frame
+
+    def is_cancelled(self, generation):
+        """
+        Parameters
+        ----------
+        generation : `int`
+            Job generation.
+
+        Returns
+        -------
+        `bool`
+            `True` if job is replaced by a newer one.
+        """
+        return generation != self._generation
+
+    def _run(self):
+        """Worker thread main loop.
+
+        Exits when renderer is closed. Job references are dropped
+        after each job, so an idle worker does not keep the widget
+        and its surfaces alive.
+        """
+        while True:
+            with self._cond:
+                while self._job is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                generation, widget, matrix, rect, state, base = self._job
+                self._job = None
+            try:
+                frame = self.render(widget, matrix, rect, state, base)
+            except Exception: # pylint:disable=broad-except
+                print_exc()
+                frame = None
+            if not self.is_cancelled(generation):
+                gobject.idle_add(self._finish, generation, widget,
+                                 frame, (tuple(matrix), rect))
+            widget = state = base = frame = None
+
+    def _finish(self, generation, widget, frame, key):
+        """Show rendered frame.
+
+        Parameters
+        ----------
+        generation : `int`
+            Job generation.
+        widget : `DrawingWindow`
+        frame : `cairo.ImageSurface` or `None`
+            Rendered frame or `None` if rendering failed.
+        key : `tuple`
+            Rendered frame image transformation and area.
+
+        Returns
+        -------
+        `bool`
+            `False`
+        """
+        if self._closed or self.is_cancelled(generation) \
+           or self._pending is None:
+            return False
+        if frame is None:
+            self._pending = None
+            return False
+        self._frame = frame
+        self._key = key
+        self._pending = None
+        self._dirty = []
+        widget.screen.queue_draw()
+        return False
+
+
+class ProcessTileRenderer(TileRenderer):
+    """Process pool tile caching renderer.
+
+    Tiles missing from cache are rendered in parallel in a process
+    pool. `render` signal handlers can not be sent to other processes,
+    so tiles are rendered by a picklable function instead, and
+    `render` signal is not emitted.
+
+    Worker processes are started with 'forkserver' or 'spawn' method
+    where available instead of forking the GTK process, so render
+    function must be importable and the main module must be guarded
+    with ``if __name__ == '__main__'``. The pool is closed when widget
+    is destroyed.
+
+    Attributes
+    ----------
+    func : `function`
+        Picklable render function: func(ctx : `cairo.Context`, *args).
+        Context is in image coordinates.
+    args : `tuple`
+        Picklable render function arguments.
+    processes : `int` or `None`
+        Number of worker processes (`None`: number of CPUs).
+    start_method : `str` or `None`
+        Process start method (`None`: 'forkserver' if available,
+        'spawn' otherwise; ignored in Python 2).
+    _pool : `multiprocessing.Pool` or `None`
+        Process pool.
+
+    Examples
+    --------
+    >>> def render(ctx, color):
+    ...     ctx.set_source_rgb(*color)
+    ...     ctx.rectangle(0, 0, 1000, 1000)
+    ...     ctx.fill()
+    ...
+    >>> widget = DrawingWindow()
+    >>> widget.set_renderer(ProcessTileRenderer(render, ((1, 0, 0),)))
+    """
+
+    def __init__(self, func, args=(), processes=None,
+                 tile_size=256, max_bytes=64 * 2 ** 20, start_method=None):
+        """Process tile renderer constructor.
+
+        Parameters
+        ----------
+        func : `function`
+            Render function.
+        args : `tuple`, optional
+            Render function arguments (default: ()).
+        processes : `int`, optional
+            Number of worker processes (default: number of CPUs).
+        tile_size : `int`, optional
+            Tile width and height (default: 256).
+        max_bytes : `int`, optional
+            Maximum tile cache size in bytes (default: 64 MiB).
+        start_method : `str` or `None`, optional
+            Process start method (default: 'forkserver' or 'spawn').
+        """
+        super(ProcessTileRenderer, self).__init__(tile_size, max_bytes)
+        self.func = func
+        self.args = tuple(args)
+        self.processes = processes
+        self.start_method = start_method
+        self._pool = None
+
+    def create_pool(self):
+        """Create process pool.
+
+        Returns
+        -------
+        `multiprocessing.Pool`
+        """
+        if mp_get_context is None:
+            return Pool(self.processes)
+        method = self.start_method
+        if method is None:
+            if 'forkserver' in mp_get_start_methods():
+                method = 'forkserver'
+            else:
+                method = 'spawn'
+        return mp_get_context(method).Pool(self.processes)
+
+    def close(self):
+        """Terminate worker processes.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def render_tiles(self, matrix, tiles):
+        """Render tiles in process pool.
+
+        Parameters
+        ----------
+        matrix : `cairo.Matrix`
+            Image to drawing area transformation matrix.
+        tiles : `list` of (`int`, `int`)
+            Tile columns and rows.
+
+        Returns
+        -------
+        `list` of `cairo.ImageSurface`
+            Rendered tiles.
+        """
+        if self._pool is None:
+            self._pool = self.create_pool()
+        size = self.tile_size
+        transform = tuple(matrix)
+        jobs = [(self.func, self.args, transform, size, column, row)
+                for column, row in tiles]
+        return [
+            cairo.ImageSurface.create_for_data(
+                bytearray(data), cairo.FORMAT_ARGB32, size, size, stride
+            )
+            for data, stride in self._pool.map(_render_tile_data, jobs, 1)
+        ]
+
+    def draw(self, widget, ctx):
+        matrix = widget.get_matrix()
+        transform = tuple(matrix)
+        tiles = self.get_tiles(ctx.clip_extents())
+        missing = [tile for tile in tiles
+                   if (transform,) + tile not in self.cache]
+        if missing:
+            for tile, surface in zip(missing,
+                                     self.render_tiles(matrix, missing)):
+                self.cache.add((transform,) + tile, surface)
+        size = self.tile_size
+        for column, row in tiles:
+            tile = self.cache.get((transform, column, row))
+            if tile is None:
+                tile = self.render_tiles(matrix, [(column, row)])[0]
+            x = column * size
+            y = row * size
+            ctx.set_source_surface(tile, x, y)
+            ctx.rectangle(x, y, size, size)
+            ctx.fill()
@@ -0,0 +1,197 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+from .deps import PYGTK, gtk, gobject, izip, Scrollable
+
+
+class VirtualScreen(gtk.DrawingArea, Scrollable):
+    """Scrollable drawing area with virtual size.
+
+    Drawing area window stays the size of its allocation. Scroll
+    adjustments are configured from the virtual canvas size, and
+    scrolling moves window contents and exposes only new areas.
+
+    Attributes
+    ----------
+    _adjustments : `list` of (`gtk.Adjustment` or `None`)
+        Horizontal and vertical scroll adjustments.
+    _handlers : `list` of (`int` or `None`)
+        Adjustment `value-changed` handler ids.
+    _canvas_size : (`int`, `int`)
+        Virtual canvas size.
+    _offset : (`int`, `int`)
+        Scroll offset.
+    """
+
+    _adjustments = (None, None)
+
+    if PYGTK:
+        __gsignals__ = {
+            'set-scroll-adjustments': (gobject.SIGNAL_RUN_LAST,
+                                       gobject.TYPE_NONE,
+                                       (gtk.Adjustment, gtk.Adjustment))
+        }
+    else:
+        def _get_hadjustment(self):
+            return self._adjustments[0]
+
+        def _set_hadjustment(self, adj):
+            self._set_adjustment(0, adj)
+
+        def _get_vadjustment(self):
+            return self._adjustments[1]
+
+        def _set_vadjustment(self, adj):
+            self._set_adjustment(1, adj)
+
+        hadjustment = gobject.Property(_get_hadjustment, _set_hadjustment,
+                                       type=gtk.Adjustment)
+        """`gtk.Adjustment` : Horizontal scroll adjustment.
+        """
+        vadjustment = gobject.Property(_get_vadjustment, _set_vadjustment,
+                                       type=gtk.Adjustment)
+        """`gtk.Adjustment` : Vertical scroll adjustment.
+        """
+        hscroll_policy = gobject.Property(
+            type=gtk.ScrollablePolicy,
+            default=gtk.ScrollablePolicy.MINIMUM
+        )
+        """`gtk.ScrollablePolicy` : Horizontal scroll policy.
+        """
+        vscroll_policy = gobject.Property(
+            type=gtk.ScrollablePolicy,
+            default=gtk.ScrollablePolicy.MINIMUM
+        )
+        """`gtk.ScrollablePolicy` : Vertical scroll policy.
+        """
+
+    def __init__(self):
+        super(VirtualScreen, self).__init__()
+        self._handlers = [None, None]
+        self._canvas_size = (0, 0)
+        self._offset = (0, 0)
+        self.connect('size_allocate', self.size_allocate_event)
+
+    def do_set_scroll_adjustments(self, hadj, vadj):
+        """Handle PyGTK `set-scroll-adjustments` signal.
+
+        Parameters
+        ----------
+        hadj : `gtk.Adjustment` or `None`
+        vadj : `gtk.Adjustment` or `None`
+        """
+        self._set_adjustment(0, hadj)
+        self._set_adjustment(1, vadj)
+
+    def get_canvas_size(self):
+        """Get virtual canvas size.
+
+        Returns
+        -------
+        (`int`, `int`)
+            Canvas width and height.
+        """
+        return self._canvas_size
+
+    def set_canvas_size(self, width, height):
+        """Set virtual canvas size.
+
+        Parameters
+        ----------
+        width : `int`
+            Canvas width.
+        height : `int`
+            Canvas height.
+
+        Returns
+        -------
+        `bool`
+            `True` if canvas size changed.
+        """
+        if self._canvas_size == (width, height):
+            return False
+        self._canvas_size = (width, height)
+        self._configure()
+        self.queue_draw()
+        return True
+
+    def get_scroll_offset(self):
+        """Get scroll offset.
+
+        Returns
+        -------
+        (`int`, `int`)
+            Canvas coordinates of drawing area origin.
+        """
+        return self._offset
+
+    def _set_adjustment(self, index, adj):
+        """Set scroll adjustment.
+
+        Parameters
+        ----------
+        index : `int`
+            0 for horizontal adjustment, 1 for vertical.
+        adj : `gtk.Adjustment` or `None`
+        """
+        adjustments = list(self._adjustments)
+        old = adjustments[index]
+        if old is adj:
+            return
+        if old is not None:
+            old.disconnect(self._handlers[index])
+            self._handlers[index] = None
+        adjustments[index] = adj
+        self._adjustments = adjustments
+        if adj is not None:
+            self._handlers[index] = adj.connect('value_changed',
+                                                self.value_changed_event)
+        self._configure()
+
+    def _configure(self):
+        """Configure scroll adjustments.
+        """
+        rect = self.get_allocation()
+        pages = (rect.width, rect.height)
+        for adj, size, page in izip(self._adjustments,
+                                    self._canvas_size, pages):
+            if adj is None:
+                continue
+            upper = max(size, page)
+            value = max(0, min(adj.get_value(), upper - page))
+            adj.configure(value, 0, upper, page * 0.1, page * 0.9, page)
+        self.value_changed_event(None)
+
+    def size_allocate_event(self, _, ev_):
+        """Handle `size-allocate` event.
+
+        Parameters
+        ----------
+        _ : `VirtualScreen`
+        ev_ : `gtk.gdk.Rectangle`
+        """
+        self._configure()
+
+    def value_changed_event(self, _):
+        """Handle adjustment `value-changed` event.
+
+        Parameters
+        ----------
+        _ : `gtk.Adjustment` or `None`
+        """
+        offset = tuple(
+            0 if adj is None else int(round(adj.get_value()))
+            for adj in self._adjustments
+        )
+        if offset == self._offset:
+            return
+        delta = [prev - cur for prev, cur in izip(self._offset, offset)]
+        self._offset = offset
+        window = self.get_window()
+        if window is not None:
+            window.scroll(*delta)
+
+
+if PYGTK:
+    VirtualScreen.set_set_scroll_adjustments_signal('set-scroll-adjustments')
+
+gobject.type_register(VirtualScreen)
@@ -0,0 +1,206 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import os
+import json
+from math import ceil
+from threading import current_thread
+from collections import deque
+from contextlib import contextmanager
+
+from .deps import clock
+
+
+class FrameStats(object):
+    """Rolling frame timing statistics.
+
+    Keeps the last `size` durations of every measured operation and
+    the last `size` frame end times. Optionally records Chrome trace
+    events (chrome://tracing, Perfetto).
+
+    Attributes
+    ----------
+    size : `int`
+        Number of samples to keep per operation.
+    samples : `dict` of `str` to `collections.deque`
+        Durations in seconds by operation name.
+    frames : `collections.deque`
+        Frame end times.
+    events : `list` of `dict` or `None`
+        Trace events or `None` if tracing is disabled.
+    max_events : `int`
+        Maximum number of trace events.
+    _start : `float`
+        Trace start time.
+
+    Examples
+    --------
+    >>> stats = FrameStats(trace=True)
+    >>> widget.set_stats(stats)
+    >>> widget.connect('frame-stats', lambda w, s: print(s.get_fps()))
+    >>> stats.get_summary()['frame']['p95']
+    0.0031
+    >>> stats.write_trace('trace.json')
+    """
+
+    def __init__(self, size=120, trace=False, max_events=2 ** 20):
+        """Frame statistics constructor.
+
+        Parameters
+        ----------
+        size : `int`, optional
+            Number of samples to keep per operation (default: 120).
+        trace : `bool`, optional
+            `True` to record trace events (default: `False`).
+        max_events : `int`, optional
+            Maximum number of trace events (default: 1048576).
+        """
+        self.size = size
+        self.samples = {}
+        self.frames = deque(maxlen=size)
+        self.events = [] if trace else None
+        self.max_events = max_events
+        self._start = clock()
+
+    def clear(self):
+        """Remove all samples and trace events.
+        """
+        self.samples.clear()
+        self.frames.clear()
+        if self.events is not None:
+            self.events = []
+        self._start = clock()
+
+    def add(self, name, start, duration):
+        """Add a sample.
+
+        Parameters
+        ----------
+        name : `str`
+            Operation name.
+        start : `float`
+            Operation start time (`deps.clock`).
+        duration : `float`
+            Operation duration in seconds.
+        """
+        try:
+            samples = self.samples[name]
+        except KeyError:
+            samples = deque(maxlen=self.size)
+            self.samples[name] = samples
+        samples.append(duration)
+        if self.events is not None and len(self.events) < self.max_events:
+            self.events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': (start - self._start) * 1e6,
+                'dur': duration * 1e6,
+                'pid': os.getpid(),
+                'tid': current_thread().ident
+            })
+
+    def add_frame(self, start, duration):
+        """Add a frame sample.
+
+        Parameters
+        ----------
+        start : `float`
+            Frame start time (`deps.clock`).
+        duration : `float`
+            Frame duration in seconds.
+        """
+        self.add('frame', start, duration)
+        self.frames.append(start + duration)
+
+    @contextmanager
+    def measure(self, name):
+        """Operation timing context manager.
+
+        Parameters
+        ----------
+        name : `str`
+            Operation name.
+        """
+        start = clock()
+        try:
+            yield
+        finally:
+            self.add(name, start, clock() - start)
+
+    def get_fps(self):
+        """Get frame rate.
+
+        Returns
+        -------
+        `float`
+            Frames per second over the last `size` frames.
+        """
+        if len(self.frames) < 2:
+            return 0.0
+        elapsed = self.frames[-1] - self.frames[0]
+        if elapsed <= 0:
+            return 0.0
+        return (len(self.frames) - 1) / elapsed
+
+    def get_percentile(self, name, percent):
+        """Get operation duration percentile.
+
+        Parameters
+        ----------
+        name : `str`
+            Operation name.
+        percent : `float`
+            Percentile (0-100).
+
+        Returns
+        -------
+        `float` or `None`
+            Duration in seconds (nearest rank) or `None` if there are
+            no samples.
+        """
+        samples = sorted(self.samples.get(name, ()))
+        if not samples:
+            return None
+        index = int(ceil(percent / 100 * len(samples))) - 1
+        return samples[max(0, min(index, len(samples) - 1))]
+
+    def get_summary(self):
+        """Get statistics of all operations.
+
+        Returns
+        -------
+        `dict`
+            'fps' and operation names to `dict` with 'count', 'mean',
+            'p50', 'p95', 'p99' and 'max' durations in seconds.
+        """
+        ret = {'fps': self.get_fps()}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ret[name] = {
+                'count': len(samples),
+                'mean': sum(samples) / len(samples),
+                'p50': self.get_percentile(name, 50),
+                'p95': self.get_percentile(name, 95),
+                'p99': self.get_percentile(name, 99),
+                'max': max(samples)
+            }
+        return ret
+
+    def write_trace(self, path):
+        """Write Chrome trace JSON file.
+
+        Parameters
+        ----------
+        path : `str`
+            File path.
+
+        Raises
+        ------
+        ValueError
+            If tracing is disabled.
+        """
+        if self.events is None:
+            raise ValueError('Tracing is disabled')
+        with open(path, 'w') as fp:
+            json.dump({'traceEvents': self.events,
+                       'displayTimeUnit': 'ms'}, fp)
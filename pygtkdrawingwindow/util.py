@@ -1,14 +1,21 @@
 from __future__ import division, print_function, absolute_import, with_statement
 
+from hashlib import md5
+from os.path import splitext
+from math import floor, ceil, sqrt
 from functools import wraps
 from contextlib import contextmanager
 
 from .deps import (
-    STRING_TYPES, IntEnum, ImageType, ScrollDirection, TimeVal,
-    Pixbuf, PixbufAnimation, gtk, glib, rsvg,
+    PYGTK, STRING_TYPES, NoRsvg, IntEnum, ImageType, ScrollDirection, TimeVal,
+    Pixbuf, PixbufAnimation, gtk, glib, gobject, rsvg, cairo, numpy,
     rsvg_handle_new_from_file,
-    gtk_image_new_from_file
+    gtk_image_new_from_file,
+    pixbuf_get_file_info,
+    cairo_set_source_pixbuf,
+    cairo_context_new
 )
+from .buffer import ImageBuffer
 
 
 class FitType(IntEnum):
@@ -34,6 +41,7 @@ def nop(*_, **kw_):
     """
     pass
 
+
 def log(msg):
     """Log function calls.
 
@@ -65,6 +73,7 @@ def log(msg):
         return ret
     return decorator
 
+
 def ignore_args(func):
     """Create a function that ignores its arguments.
 
@@ -91,6 +100,98 @@ def ignore_args(func):
         return func()
     return ret
 
+
+class FrameCallback(object):
+    """Function call coalesced to one per frame.
+
+    Uses widget frame clock if available, idle callback otherwise.
+
+    Attributes
+    ----------
+    widget : `gtk.Widget`
+        Widget to get frame clock from.
+    func : `function`
+        Function to call.
+    _id : `int` or `None`
+        Tick callback or idle source id.
+    _tick : `bool`
+        `True` if `_id` is a tick callback id.
+
+    Examples
+    --------
+    >>> callback = FrameCallback(widget, widget.queue_draw)
+    >>> callback.schedule()
+    >>> callback.schedule()
+    >>> callback.is_pending()
+    True
+    """
+
+    def __init__(self, widget, func):
+        """Frame callback constructor.
+
+        Parameters
+        ----------
+        widget : `gtk.Widget`
+            Widget to get frame clock from.
+        func : `function`
+            Function to call.
+        """
+        self.widget = widget
+        self.func = func
+        self._id = None
+        self._tick = not PYGTK and hasattr(widget, 'add_tick_callback')
+
+    def is_pending(self):
+        """
+        Returns
+        -------
+        `bool`
+            `True` if function call is scheduled.
+        """
+        return self._id is not None
+
+    def schedule(self):
+        """Schedule function call if it is not scheduled.
+        """
+        if self._id is not None:
+            return
+        if self._tick:
+            self._id = self.widget.add_tick_callback(ignore_args(self._call))
+        else:
+            self._id = gobject.idle_add(self._call)
+
+    def cancel(self):
+        """Cancel scheduled function call.
+        """
+        if self._id is None:
+            return
+        if self._tick:
+            self.widget.remove_tick_callback(self._id)
+        else:
+            gobject.source_remove(self._id)
+        self._id = None
+
+    def flush(self):
+        """Call scheduled function now.
+        """
+        if self._id is None:
+            return
+        self.cancel()
+        self.func()
+
+    def _call(self):
+        """Call function.
+
+        Returns
+        -------
+        `bool`
+            `False` to remove callback.
+        """
+        self._id = None
+        self.func()
+        return False
+
+
 @contextmanager
 def freeze(widget):
     """Widget update freezing context manager.
@@ -109,6 +210,39 @@ def freeze(widget):
         if window is not None:
             window.thaw_updates()
 
+
+def is_widget_visible(widget):
+    """Check if any part of a widget is inside its ancestors' allocations.
+
+    Parameters
+    ----------
+    widget : `gtk.Widget`
+
+    Returns
+    -------
+    `bool`
+        `False` if widget is not mapped, has empty allocation or is
+        scrolled out of sight.
+    """
+    if not widget.get_mapped():
+        return False
+    rect = widget.get_allocation()
+    visible = (0, 0, rect.width, rect.height)
+    parent = widget.get_parent()
+    while parent is not None and visible is not None:
+        coords = widget.translate_coordinates(parent, 0, 0)
+        if coords is None or (len(coords) > 2 and not coords[0]):
+            return False
+        x, y = coords[-2:]
+        rect = parent.get_allocation()
+        visible = intersect_rect(
+            visible,
+            (-x, -y, rect.width - x, rect.height - y)
+        )
+        parent = parent.get_parent()
+    return visible is not None
+
+
 def get_scroll_direction(event):
     """Get scroll event direction.
 
@@ -128,6 +262,142 @@ def get_scroll_direction(event):
             return ScrollDirection.DOWN
     return event.direction
 
+
+def transform_rect(matrix, x, y, width, height):
+    """Get bounding box of a transformed rectangle.
+
+    Parameters
+    ----------
+    matrix : `cairo.Matrix`
+        Transformation matrix.
+    x : `float`
+    y : `float`
+    width : `float`
+    height : `float`
+
+    Returns
+    -------
+    (`float`, `float`, `float`, `float`)
+        Bounding box left, top, right and bottom coordinates.
+    """
+    points = [matrix.transform_point(px, py)
+              for px in (x, x + width)
+              for py in (y, y + height)]
+    xs = [px for px, _ in points]
+    ys = [py for _, py in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def get_matrix_scale(matrix):
+    """Get transformation scale factor.
+
+    Parameters
+    ----------
+    matrix : `cairo.Matrix`
+        Transformation matrix.
+
+    Returns
+    -------
+    `float`
+        Square root of area scale factor.
+    """
+    xx, yx, xy, yy, _, _ = matrix
+    return sqrt(abs(xx * yy - xy * yx))
+
+
+def round_rect(rect):
+    """Round bounding box coordinates outwards.
+
+    Parameters
+    ----------
+    rect : (`float`, `float`, `float`, `float`)
+        Left, top, right and bottom coordinates.
+
+    Returns
+    -------
+    (`int`, `int`, `int`, `int`)
+        Left, top, right and bottom coordinates.
+    """
+    left, top, right, bottom = rect
+    return (int(floor(left)), int(floor(top)),
+            int(ceil(right)), int(ceil(bottom)))
+
+
+def pad_rect(rect, margin):
+    """Expand bounding box by a margin.
+
+    Parameters
+    ----------
+    rect : (`float`, `float`, `float`, `float`)
+        Left, top, right and bottom coordinates.
+    margin : `float`
+
+    Returns
+    -------
+    (`float`, `float`, `float`, `float`)
+        Left, top, right and bottom coordinates.
+    """
+    left, top, right, bottom = rect
+    return (left - margin, top - margin, right + margin, bottom + margin)
+
+
+def intersect_rect(rect, other):
+    """Intersect rectangles.
+
+    Parameters
+    ----------
+    rect : (`int`, `int`, `int`, `int`)
+        Left, top, right and bottom coordinates.
+    other : (`int`, `int`, `int`, `int`)
+        Left, top, right and bottom coordinates.
+
+    Returns
+    -------
+    (`int`, `int`, `int`, `int`) or `None`
+        Intersection or `None` if it is empty.
+    """
+    left = max(rect[0], other[0])
+    top = max(rect[1], other[1])
+    right = min(rect[2], other[2])
+    bottom = min(rect[3], other[3])
+    if left >= right or top >= bottom:
+        return None
+    return left, top, right, bottom
+
+
+def subtract_rect(rect, other):
+    """Subtract a rectangle from another one.
+
+    Parameters
+    ----------
+    rect : (`int`, `int`, `int`, `int`)
+        Left, top, right and bottom coordinates.
+    other : (`int`, `int`, `int`, `int`)
+        Left, top, right and bottom coordinates.
+
+    Returns
+    -------
+    `list` of (`int`, `int`, `int`, `int`)
+        Up to 4 non-overlapping rectangles covering the difference.
+
+    Examples
+    --------
+    >>> subtract_rect((0, 0, 10, 10), (0, 2, 10, 12))
+    [(0, 0, 10, 2)]
+    """
+    other = intersect_rect(rect, other)
+    if other is None:
+        return [rect]
+    left, top, right, bottom = rect
+    ret = [
+        (left, top, right, other[1]),
+        (left, other[3], right, bottom),
+        (left, other[1], other[0], other[3]),
+        (other[2], other[1], right, other[3])
+    ]
+    return [r for r in ret if r[0] < r[2] and r[1] < r[3]]
+
+
 def get_timeval(time_):
     """Get time value.
 
@@ -147,6 +417,7 @@ def get_timeval(time_):
     ret.add(int(time_ * 1e6))
     return ret
 
+
 def get_pixbuf_size(pixbuf):
     """Get GTK pixbuf size.
 
@@ -161,6 +432,169 @@ def get_pixbuf_size(pixbuf):
     """
     return pixbuf.get_width(), pixbuf.get_height()
 
+
+def get_pixbuf_digest(pixbuf):
+    """Get GTK pixbuf content digest.
+
+    Parameters
+    ----------
+    pixbuf : `gtk.gdk.Pixbuf`
+
+    Returns
+    -------
+    `bytes`
+        Digest of pixbuf size and pixel data.
+    """
+    digest = md5(('%d %d %d ' % (pixbuf.get_width(), pixbuf.get_height(),
+                                 pixbuf.get_rowstride())).encode('ascii'))
+    digest.update(pixbuf.get_pixels())
+    return digest.digest()
+
+
+def pixbuf_to_surface(pixbuf):
+    """Convert GTK pixbuf to cairo surface.
+
+    Parameters
+    ----------
+    pixbuf : `gtk.gdk.Pixbuf`
+
+    Returns
+    -------
+    `cairo.ImageSurface`
+        Image surface with premultiplied alpha.
+    """
+    if pixbuf.get_has_alpha():
+        fmt = cairo.FORMAT_ARGB32
+    else:
+        fmt = cairo.FORMAT_RGB24
+    surface = cairo.ImageSurface(fmt, *get_pixbuf_size(pixbuf))
+    ctx = cairo_context_new(surface)
+    cairo_set_source_pixbuf(ctx, pixbuf, 0, 0)
+    ctx.set_operator(cairo.OPERATOR_SOURCE)
+    ctx.paint()
+    surface.flush()
+    return surface
+
+
+def update_surface(surface, pixbuf, x, y, width, height):
+    """Copy GTK pixbuf area to cairo surface.
+
+    Parameters
+    ----------
+    surface : `cairo.ImageSurface`
+        Surface created by `pixbuf_to_surface`.
+    pixbuf : `gtk.gdk.Pixbuf`
+    x : `int`
+    y : `int`
+    width : `int`
+    height : `int`
+    """
+    ctx = cairo_context_new(surface)
+    ctx.rectangle(x, y, width, height)
+    ctx.clip()
+    cairo_set_source_pixbuf(ctx, pixbuf, 0, 0)
+    ctx.set_operator(cairo.OPERATOR_SOURCE)
+    ctx.paint()
+    surface.flush()
+
+
+def paint_surface(ctx, surface, image_filter=cairo.FILTER_GOOD):
+    """Paint image surface at origin.
+
+    `cairo.FORMAT_A8` surfaces are painted as white on black.
+
+    Parameters
+    ----------
+    ctx : `cairo.Context`
+    surface : `cairo.ImageSurface`
+    image_filter : `int`, optional
+        Cairo filter (default: `cairo.FILTER_GOOD`).
+    """
+    if surface.get_format() == cairo.FORMAT_A8:
+        pattern = cairo.SurfacePattern(surface)
+        pattern.set_filter(image_filter)
+        ctx.rectangle(0, 0, surface.get_width(), surface.get_height())
+        ctx.set_source_rgb(0, 0, 0)
+        ctx.fill()
+        ctx.set_source_rgb(1, 1, 1)
+        ctx.mask(pattern)
+    else:
+        ctx.set_source_surface(surface, 0, 0)
+        ctx.get_source().set_filter(image_filter)
+        ctx.paint()
+
+
+def get_quarter_turns(matrix):
+    """Get right angle rotation of a transformation.
+
+    Parameters
+    ----------
+    matrix : `cairo.Matrix`
+        Transformation matrix.
+
+    Returns
+    -------
+    `int` or `None`
+        Number of clockwise quarter turns (0-3) or `None` if
+        transformation is not a right angle rotation with
+        positive scale.
+    """
+    xx, yx, xy, yy, _, _ = matrix
+    eps = 1e-9 * max(abs(xx), abs(yx), abs(xy), abs(yy))
+    if abs(xy) <= eps and abs(yx) <= eps:
+        if xx > 0 and yy > 0:
+            return 0
+        if xx < 0 and yy < 0:
+            return 2
+    elif abs(xx) <= eps and abs(yy) <= eps:
+        if yx > 0 and xy < 0:
+            return 1
+        if yx < 0 and xy > 0:
+            return 3
+    return None
+
+
+def rotate_surface(surface, turns):
+    """Rotate image surface by right angle.
+
+    Parameters
+    ----------
+    surface : `cairo.ImageSurface`
+    turns : `int`
+        Number of clockwise quarter turns.
+
+    Returns
+    -------
+    (`cairo.ImageSurface`, `cairo.Matrix`)
+        Rotated surface and rotated to source surface
+        transformation matrix.
+    """
+    width = surface.get_width()
+    height = surface.get_height()
+    turns %= 4
+    if turns == 1:
+        matrix = cairo.Matrix(0, -1, 1, 0, 0, height)
+    elif turns == 2:
+        matrix = cairo.Matrix(-1, 0, 0, -1, width, height)
+    elif turns == 3:
+        matrix = cairo.Matrix(0, 1, -1, 0, width, 0)
+    else:
+        matrix = cairo.Matrix()
+    if turns % 2:
+        width, height = height, width
+    rotated = cairo.ImageSurface(surface.get_format(), width, height)
+    inverse = cairo.Matrix(*matrix)
+    inverse.invert()
+    ctx = cairo_context_new(rotated)
+    ctx.transform(inverse)
+    ctx.set_source_surface(surface, 0, 0)
+    ctx.get_source().set_filter(cairo.FILTER_NEAREST)
+    ctx.set_operator(cairo.OPERATOR_SOURCE)
+    ctx.paint()
+    rotated.flush()
+    return rotated, matrix
+
+
 def get_gtk_image_size(img):
     """Get GTK size.
 
@@ -209,12 +643,13 @@ def get_gtk_image_size(img):
 
     raise ValueError('Unknown image type: ' + str(dtype))
 
+
 def get_image_size(img):
     """Get image size.
 
     Parameters
     ----------
-    img: `None` or `rsvg.Handle` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `gtk.Image`
+    img: `None` or `rsvg.Handle` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `gtk.Image` or `cairo.ImageSurface`
 
     Raises
     ------
@@ -238,10 +673,97 @@ def get_image_size(img):
     if isinstance(img, gtk.Image):
         return get_gtk_image_size(img)
 
+    if isinstance(img, cairo.ImageSurface):
+        return (img.get_width(), img.get_height())
+
     raise TypeError('Invalid image type: ' + str(img))
 
-def load_image_file(path):
-    """Load image from file.
+
+MAGIC_SIZE = 32
+"""`int` : Number of file header bytes to read for format detection.
+"""
+
+IMAGE_LOADERS = []
+"""`list` of (`function`, `tuple` of `str`, `tuple` of (`int`, `bytes`))
+: Registered image file loaders, extensions and magic bytes.
+"""
+
+
+def register_image_loader(func, extensions=(), magic=(), first=False):
+    """Register image file loader.
+
+    Parameters
+    ----------
+    func : `function`
+        Loader function: func(path : `str`) -> image.
+        Loaded image can be of any type accepted by `load_image`.
+    extensions : `iterable` of `str`, optional
+        File name extensions, e.g. ``('.npy',)``.
+    magic : `iterable` of (`bytes` or (`int`, `bytes`)), optional
+        File header prefixes or (offset, bytes) pairs.
+    first : `bool`, optional
+        `True` to check the loader before registered loaders
+        (default: `False`).
+
+    Examples
+    --------
+    >>> def load_npy(path):
+    ...     return numpy.load(path)
+    ...
+    >>> register_image_loader(load_npy, ('.npy',), (b'\\x93NUMPY',), True)
+    """
+    magic = tuple(
+        (0, value) if isinstance(value, bytes) else tuple(value)
+        for value in magic
+    )
+    extensions = tuple(ext.lower() for ext in extensions)
+    loader = (func, extensions, magic)
+    if first:
+        IMAGE_LOADERS.insert(0, loader)
+    else:
+        IMAGE_LOADERS.append(loader)
+
+
+def get_pixbuf_file_info(path):
+    """Get GdkPixbuf image file format and size without loading it.
+
+    Parameters
+    ----------
+    path : `str`
+        Image file path.
+
+    Returns
+    -------
+    (`str`, `int`, `int`) or `None`
+        Format name, image width and height or `None` if format
+        is not supported.
+    """
+    fmt, width, height = pixbuf_get_file_info(path)
+    if fmt is None:
+        return None
+    if PYGTK:
+        return fmt['name'], width, height
+    return fmt.get_name(), width, height
+
+
+def load_pixbuf_file(path):
+    """Load image from file with GdkPixbuf.
+
+    Parameters
+    ----------
+    path : `str`
+        Image file path.
+
+    Returns
+    -------
+    `gtk.Image`
+        Loaded image.
+    """
+    return gtk_image_new_from_file(path)
+
+
+def load_any_image_file(path):
+    """Load image from file of unknown format.
 
     Parameters
     ----------
@@ -258,6 +780,56 @@ def load_image_file(path):
     except glib.GError:
         return gtk_image_new_from_file(path)
 
+
+def find_image_loader(path):
+    """Find image file loader by file header and extension.
+
+    Parameters
+    ----------
+    path : `str`
+        Image file path.
+
+    Returns
+    -------
+    `function`
+        Loader function or `load_any_image_file` if file format
+        is unknown.
+    """
+    try:
+        with open(path, 'rb') as fp:
+            header = fp.read(MAGIC_SIZE)
+    except IOError:
+        header = b''
+
+    for func, _, magic in IMAGE_LOADERS:
+        for offset, value in magic:
+            if header[offset:offset + len(value)] == value:
+                return func
+
+    ext = splitext(path)[1].lower()
+    for func, extensions, _ in IMAGE_LOADERS:
+        if ext in extensions:
+            return func
+
+    return load_any_image_file
+
+
+def load_image_file(path):
+    """Load image from file.
+
+    Parameters
+    ----------
+    path : `str`
+        Image file path.
+
+    Returns
+    -------
+    `rsvg.Handle` or `gtk.Image` or `object`
+        Loaded image.
+    """
+    return find_image_loader(path)(path)
+
+
 def load_gtk_image(img, widget=None):
     """Load GTK image.
 
@@ -302,24 +874,31 @@ def load_gtk_image(img, widget=None):
 
     raise ValueError('Unknown image type: ' + str(dtype))
 
+
 def load_image(img, widget=None):
     """Load an image.
 
     Parameters
     ----------
-    img : `str` or `gtk.Image` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle`
+    img : `str` or `gtk.Image` or `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle` or `cairo.ImageSurface` or `ImageBuffer` or `numpy.ndarray`
         Image to load.
     widget : `gtk.Widget`, optional
         Widget for icon rendering (default: gtk.Label()).
 
     Returns
     -------
-    `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle` or `None`
+    `gtk.gdk.Pixbuf` or `gtk.gdk.PixbufAnimation` or `rsvg.Handle` or `cairo.ImageSurface` or `None`
         Loaded image or `None` if image is empty.
     """
     if isinstance(img, STRING_TYPES):
         img = load_image_file(img)
 
+    if numpy is not None and isinstance(img, numpy.ndarray):
+        img = ImageBuffer.from_array(img)
+
+    if isinstance(img, ImageBuffer):
+        img = img.to_surface()
+
     if isinstance(img, gtk.Image):
         img = load_gtk_image(img, widget)
 
@@ -327,3 +906,21 @@ def load_image(img, widget=None):
         img = img.get_static_image()
 
     return img
+
+
+if rsvg is not NoRsvg:
+    register_image_loader(
+        rsvg_handle_new_from_file,
+        ('.svg', '.svgz'),
+        (b'<svg', b'<?xml')
+    )
+
+register_image_loader(
+    load_pixbuf_file,
+    ('.png', '.jpg', '.jpeg', '.jpe', '.gif', '.bmp', '.ico', '.cur',
+     '.tif', '.tiff', '.webp', '.pnm', '.pbm', '.pgm', '.ppm',
+     '.xpm', '.xbm', '.tga', '.icns', '.ani'),
+    (b'\x89PNG\r\n\x1a\n', b'\xff\xd8\xff', b'GIF87a', b'GIF89a',
+     b'BM', b'II*\x00', b'MM\x00*', b'\x00\x00\x01\x00', b'\x00\x00\x02\x00',
+     (8, b'WEBP'), (4, b'icns'), b'/* XPM */')
+)
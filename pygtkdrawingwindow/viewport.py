@@ -0,0 +1,415 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+from math import sin, cos
+
+from .deps import cairo, numpy, izip
+
+
+class Viewport(object):
+    """Image view transformation model.
+
+    Owns image size, zoom ratio, rotation angle, drawing area size and
+    offsets, and caches image to canvas transformation matrix and its
+    inverse until one of them changes. Does not depend on GTK.
+
+    Coordinate spaces:
+
+    image
+        Image pixels.
+    canvas
+        Zoomed and rotated image centered on drawing area
+        (or virtual canvas).
+    widget
+        Drawing area window: canvas minus canvas offset.
+    root
+        Root window: widget plus root offset.
+
+    Attributes
+    ----------
+    _size : (`float`, `float`)
+        Image size.
+    _zoom : `float`
+        Zoom ratio.
+    _angle : `float`
+        Rotation angle in radians.
+    _screen_size : (`int`, `int`)
+        Drawing area (or virtual canvas) size.
+    _canvas_offset : (`float`, `float`)
+        Canvas coordinates of drawing area origin.
+    _root_offset : (`float`, `float`)
+        Root window coordinates of drawing area origin.
+    _rotated_size : (`float`, `float`) or `None`
+        Cached rotated image bounding box size.
+    _matrix : `cairo.Matrix` or `None`
+        Cached image to canvas transformation matrix.
+    _inverse : `cairo.Matrix` or `None`
+        Cached canvas to image transformation matrix.
+
+    Examples
+    --------
+    >>> viewport = Viewport(200, 100, zoom=2.0)
+    >>> viewport.set_screen_size(800, 600)
+    >>> viewport.image_to_canvas([(0, 0), (200, 100)])
+    [(200.0, 200.0), (600.0, 400.0)]
+    >>> viewport.canvas_to_image(numpy.array([[400.0, 300.0]]))
+    array([[100.,  50.]])
+    """
+
+    def __init__(self, width=0, height=0, zoom=1.0, angle=0.0):
+        """Viewport constructor.
+
+        Parameters
+        ----------
+        width : `float`, optional
+            Image width (default: 0).
+        height : `float`, optional
+            Image height (default: 0).
+        zoom : `float`, optional
+            Zoom ratio (default: 1.0).
+        angle : `float`, optional
+            Rotation angle in radians (default: 0.0).
+        """
+        self._size = (width, height)
+        self._zoom = zoom
+        self._angle = angle
+        self._screen_size = (0, 0)
+        self._canvas_offset = (0, 0)
+        self._root_offset = (0, 0)
+        self._rotated_size = None
+        self._matrix = None
+        self._inverse = None
+
+    def _invalidate(self):
+        """Invalidate cached transformation.
+        """
+        self._matrix = None
+        self._inverse = None
+
+    def get_size(self):
+        """Get image size.
+
+        Returns
+        -------
+        (`float`, `float`)
+        """
+        return self._size
+
+    def set_size(self, width, height):
+        """Set image size.
+
+        Parameters
+        ----------
+        width : `float`
+        height : `float`
+        """
+        if self._size != (width, height):
+            self._size = (width, height)
+            self._rotated_size = None
+            self._invalidate()
+
+    def get_zoom(self):
+        """Get zoom ratio.
+
+        Returns
+        -------
+        `float`
+        """
+        return self._zoom
+
+    def set_zoom(self, zoom):
+        """Set zoom ratio.
+
+        Parameters
+        ----------
+        zoom : `float`
+        """
+        if self._zoom != zoom:
+            self._zoom = zoom
+            self._invalidate()
+
+    def get_angle(self):
+        """Get rotation angle.
+
+        Returns
+        -------
+        `float`
+            Angle in radians.
+        """
+        return self._angle
+
+    def set_angle(self, angle):
+        """Set rotation angle.
+
+        Parameters
+        ----------
+        angle : `float`
+            Angle in radians.
+        """
+        if self._angle != angle:
+            self._angle = angle
+            self._rotated_size = None
+            self._invalidate()
+
+    def get_screen_size(self):
+        """Get drawing area size.
+
+        Returns
+        -------
+        (`int`, `int`)
+            Drawing area (or virtual canvas) width and height.
+        """
+        return self._screen_size
+
+    def set_screen_size(self, width, height):
+        """Set drawing area size.
+
+        Parameters
+        ----------
+        width : `int`
+        height : `int`
+        """
+        if self._screen_size != (width, height):
+            self._screen_size = (width, height)
+            self._invalidate()
+
+    def get_canvas_offset(self):
+        """Get canvas coordinates of drawing area origin.
+
+        Returns
+        -------
+        (`float`, `float`)
+        """
+        return self._canvas_offset
+
+    def set_canvas_offset(self, x, y):
+        """Set canvas coordinates of drawing area origin.
+
+        Parameters
+        ----------
+        x : `float`
+        y : `float`
+        """
+        self._canvas_offset = (x, y)
+
+    def get_root_offset(self):
+        """Get root window coordinates of drawing area origin.
+
+        Returns
+        -------
+        (`float`, `float`)
+        """
+        return self._root_offset
+
+    def set_root_offset(self, x, y):
+        """Set root window coordinates of drawing area origin.
+
+        Parameters
+        ----------
+        x : `float`
+        y : `float`
+        """
+        self._root_offset = (x, y)
+
+    def get_rotated_size(self):
+        """Get rotated image bounding box size.
+
+        Returns
+        -------
+        (`float`, `float`)
+            Bounding box width and height.
+        """
+        if self._rotated_size is None:
+            width, height = self._size
+            sin_ = abs(sin(self._angle))
+            cos_ = abs(cos(self._angle))
+            self._rotated_size = (width * cos_ + height * sin_,
+                                  width * sin_ + height * cos_)
+        return self._rotated_size
+
+    def get_content_size(self):
+        """Get zoomed and rotated image size.
+
+        Returns
+        -------
+        (`int`, `int`)
+            Drawing area size required to show the whole image.
+        """
+        return tuple(int(round(size * self._zoom, 6))
+                     for size in self.get_rotated_size())
+
+    def get_offset(self):
+        """Get image offset on canvas.
+
+        Returns
+        -------
+        (`float`, `float`)
+            Image x and y offset.
+        """
+        scale = self._zoom
+        return tuple(
+            max(0, (wnd_size - box_size * scale) / 2)
+            + (box_size - img_size) * scale / 2
+            for wnd_size, box_size, img_size in izip(self._screen_size,
+                                                     self.get_rotated_size(),
+                                                     self._size)
+        )
+
+    def get_matrix(self):
+        """Get image to canvas transformation matrix.
+
+        Returns
+        -------
+        `cairo.Matrix`
+            Cached matrix (must not be modified).
+        """
+        if self._matrix is None:
+            width, height = self._size
+            width *= 0.5
+            height *= 0.5
+            scale = self._zoom
+            matrix = cairo.Matrix()
+            matrix.translate(*self.get_offset())
+            matrix.scale(scale, scale)
+            matrix.translate(width, height)
+            matrix.rotate(self._angle)
+            matrix.translate(-width, -height)
+            self._matrix = matrix
+        return self._matrix
+
+    def get_inverse(self):
+        """Get canvas to image transformation matrix.
+
+        Returns
+        -------
+        `cairo.Matrix`
+            Cached matrix (must not be modified).
+        """
+        if self._inverse is None:
+            inverse = cairo.Matrix(*self.get_matrix())
+            inverse.invert()
+            self._inverse = inverse
+        return self._inverse
+
+    def image_to_canvas(self, points):
+        """Convert image coordinates to canvas coordinates.
+
+        Parameters
+        ----------
+        points : `numpy.ndarray` or `list` of (`float`, `float`)
+            Points (shape (..., 2) if array).
+
+        Returns
+        -------
+        `numpy.ndarray` or `list` of (`float`, `float`)
+        """
+        return transform_points(self.get_matrix(), points)
+
+    def canvas_to_image(self, points):
+        """Convert canvas coordinates to image coordinates.
+
+        Parameters
+        ----------
+        points : `numpy.ndarray` or `list` of (`float`, `float`)
+
+        Returns
+        -------
+        `numpy.ndarray` or `list` of (`float`, `float`)
+        """
+        return transform_points(self.get_inverse(), points)
+
+    def image_to_widget(self, points):
+        """Convert image coordinates to drawing area coordinates.
+
+        Parameters
+        ----------
+        points : `numpy.ndarray` or `list` of (`float`, `float`)
+
+        Returns
+        -------
+        `numpy.ndarray` or `list` of (`float`, `float`)
+        """
+        return transform_points(self.get_matrix(), points,
+                                [-x for x in self._canvas_offset])
+
+    def widget_to_image(self, points):
+        """Convert drawing area coordinates to image coordinates.
+
+        Parameters
+        ----------
+        points : `numpy.ndarray` or `list` of (`float`, `float`)
+
+        Returns
+        -------
+        `numpy.ndarray` or `list` of (`float`, `float`)
+        """
+        return transform_points(self.get_inverse(), points,
+                                pre=self._canvas_offset)
+
+    def image_to_root(self, points):
+        """Convert image coordinates to root window coordinates.
+
+        Parameters
+        ----------
+        points : `numpy.ndarray` or `list` of (`float`, `float`)
+
+        Returns
+        -------
+        `numpy.ndarray` or `list` of (`float`, `float`)
+        """
+        return transform_points(
+            self.get_matrix(), points,
+            [root - canvas for root, canvas
+             in izip(self._root_offset, self._canvas_offset)]
+        )
+
+    def root_to_image(self, points):
+        """Convert root window coordinates to image coordinates.
+
+        Parameters
+        ----------
+        points : `numpy.ndarray` or `list` of (`float`, `float`)
+
+        Returns
+        -------
+        `numpy.ndarray` or `list` of (`float`, `float`)
+        """
+        return transform_points(
+            self.get_inverse(), points,
+            pre=[canvas - root for root, canvas
+                 in izip(self._root_offset, self._canvas_offset)]
+        )
+
+
+def transform_points(matrix, points, post=(0, 0), pre=(0, 0)):
+    """Transform points.
+
+    Uses numpy for arrays.
+
+    Parameters
+    ----------
+    matrix : `cairo.Matrix`
+        Transformation matrix.
+    points : `numpy.ndarray` or `list` of (`float`, `float`)
+        Points (shape (..., 2) if array).
+    post : (`float`, `float`), optional
+        Offset to add after transformation (default: (0, 0)).
+    pre : (`float`, `float`), optional
+        Offset to add before transformation (default: (0, 0)).
+
+    Returns
+    -------
+    `numpy.ndarray` or `list` of (`float`, `float`)
+        Transformed points (float array if input is an array).
+    """
+    xx, yx, xy, yy, x0, y0 = matrix
+    pre_x, pre_y = pre
+    x0 += xx * pre_x + xy * pre_y + post[0]
+    y0 += yx * pre_x + yy * pre_y + post[1]
+
+    if numpy is not None and isinstance(points, numpy.ndarray):
+        points = numpy.asarray(points, numpy.float64)
+        linear = numpy.array([[xx, yx], [xy, yy]])
+        return numpy.dot(points, linear) + numpy.array([x0, y0])
+
+    return [(xx * x + xy * y + x0, yx * x + yy * y + y0)
+            for x, y in points]
@@ -40,6 +40,7 @@ setup(
     test_suite='setup.tests',
     install_requires=['enum34'],
     extras_require={
+        'numpy': ['numpy'],
         'dev': [
             'sphinx',
             'sphinx_rtd_theme',
@@ -0,0 +1,169 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import unittest
+
+from pygtkdrawingwindow.buffer import (
+    ARGB32_CHANNELS, BYTES_PER_PIXEL, ImageBuffer, PixelFormat
+)
+from pygtkdrawingwindow.deps import cairo, numpy
+
+
+WIDTH = 5
+HEIGHT = 3
+PADDING = 3
+
+
+def make_buffer(fmt, padding=PADDING):
+    """Create test image buffer with padded rows.
+
+    Parameters
+    ----------
+    fmt : `PixelFormat`
+    padding : `int`, optional
+        Bytes after each row (default: 3).
+
+    Returns
+    -------
+    `ImageBuffer`
+        Read-only buffer with every byte value different from its
+        neighbours and alpha values including 0 and 255.
+    """
+    size = BYTES_PER_PIXEL[fmt]
+    stride = WIDTH * size + padding
+    data = bytearray(stride * HEIGHT)
+    for y in range(HEIGHT):
+        for i in range(WIDTH * size):
+            data[y * stride + i] = (y * 67 + i * 29 + 11) % 256
+        data[y * stride + WIDTH * size:(y + 1) * stride] = \
+            b'\xaa' * padding
+    if fmt in (PixelFormat.RGBA32, PixelFormat.ARGB32):
+        alpha = 3 if fmt == PixelFormat.RGBA32 else ARGB32_CHANNELS[3]
+        for y in range(HEIGHT):
+            data[y * stride + alpha] = 0
+            data[y * stride + 4 + alpha] = 255
+    return ImageBuffer(bytes(data), WIDTH, HEIGHT, fmt, stride)
+
+
+def get_stride(buf):
+    """Get cairo stride of an image buffer.
+
+    Parameters
+    ----------
+    buf : `ImageBuffer`
+
+    Returns
+    -------
+    `int`
+    """
+    return cairo.ImageSurface.format_stride_for_width(
+        buf.get_cairo_format(), buf.width
+    )
+
+
+def convert(buf, use_numpy=False):
+    """Convert image buffer to cairo surface data.
+
+    Parameters
+    ----------
+    buf : `ImageBuffer`
+    use_numpy : `bool`, optional
+        `True` to use numpy conversion (default: `False`).
+
+    Returns
+    -------
+    `bytearray`
+    """
+    stride = get_stride(buf)
+    data = bytearray(stride * buf.height)
+    if use_numpy:
+        buf._convert_numpy(data, stride)
+    else:
+        buf._convert(data, stride)
+    return data
+
+
+class ConvertTest(unittest.TestCase):
+
+    def get_pixel(self, data, buf, x, y):
+        offset = y * get_stride(buf) + x * 4
+        return tuple(data[offset + i] for i in ARGB32_CHANNELS)
+
+    def test_not_compatible(self):
+        for fmt in PixelFormat:
+            self.assertFalse(make_buffer(fmt).is_surface_compatible())
+
+    def test_gray8(self):
+        buf = make_buffer(PixelFormat.GRAY8)
+        data = convert(buf)
+        stride = get_stride(buf)
+        for y in range(HEIGHT):
+            self.assertEqual(
+                data[y * stride:y * stride + WIDTH],
+                buf.data[y * buf.stride:y * buf.stride + WIDTH]
+            )
+
+    def test_rgb24(self):
+        buf = make_buffer(PixelFormat.RGB24)
+        data = convert(buf)
+        for y in range(HEIGHT):
+            for x in range(WIDTH):
+                offset = y * buf.stride + x * 3
+                self.assertEqual(
+                    self.get_pixel(data, buf, x, y),
+                    tuple(bytearray(buf.data[offset:offset + 3])) + (255,)
+                )
+
+    def test_rgba32(self):
+        buf = make_buffer(PixelFormat.RGBA32)
+        data = convert(buf)
+        for y in range(HEIGHT):
+            for x in range(WIDTH):
+                offset = y * buf.stride + x * 4
+                r, g, b, a = bytearray(buf.data[offset:offset + 4])
+                self.assertEqual(
+                    self.get_pixel(data, buf, x, y),
+                    tuple((c * a + 127) // 255 for c in (r, g, b)) + (a,)
+                )
+            self.assertEqual(self.get_pixel(data, buf, 0, y)[3], 0)
+            self.assertEqual(self.get_pixel(data, buf, 0, y)[:3], (0, 0, 0))
+            self.assertEqual(
+                self.get_pixel(data, buf, 1, y)[:3],
+                tuple(bytearray(buf.data[y * buf.stride + 4:
+                                         y * buf.stride + 7]))
+            )
+
+    def test_argb32(self):
+        buf = make_buffer(PixelFormat.ARGB32)
+        data = convert(buf)
+        stride = get_stride(buf)
+        for y in range(HEIGHT):
+            self.assertEqual(
+                data[y * stride:y * stride + WIDTH * 4],
+                buf.data[y * buf.stride:y * buf.stride + WIDTH * 4]
+            )
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy(self):
+        for fmt in PixelFormat:
+            for padding in (0, PADDING):
+                buf = make_buffer(fmt, padding)
+                self.assertEqual(convert(buf, True), convert(buf),
+                                 '%s, padding %d' % (fmt.name, padding))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy_array(self):
+        for fmt in PixelFormat:
+            buf = make_buffer(fmt, 0)
+            size = BYTES_PER_PIXEL[fmt]
+            array = numpy.frombuffer(buf.data, numpy.uint8)
+            array = array.reshape(HEIGHT, WIDTH, size)
+            if size == 1:
+                array = array[:, :, 0]
+            array_buf = ImageBuffer.from_array(array, fmt)
+            self.assertEqual(array_buf.stride, buf.stride)
+            self.assertEqual(convert(array_buf, True), convert(buf))
+            self.assertEqual(convert(array_buf), convert(buf))
+
+
+if __name__ == '__main__':
+    unittest.main()
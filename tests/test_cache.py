@@ -0,0 +1,299 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import os
+import shutil
+import tempfile
+import unittest
+from time import time
+
+from pygtkdrawingwindow.deps import (
+    PYGTK, gdk, cairo, TimeVal, pixbuf_new_from_file_at_scale
+)
+from pygtkdrawingwindow.cache import (
+    SurfaceCache, MipmapPyramid, AnimationFrames, get_surface_size
+)
+
+if PYGTK:
+    PixbufSimpleAnim = gdk.PixbufSimpleAnim
+else:
+    from gi.repository.GdkPixbuf import PixbufSimpleAnim
+    PixbufSimpleAnim = PixbufSimpleAnim.new
+
+
+def get_time(timeval):
+    """Convert `util.get_timeval` result to seconds.
+
+    Parameters
+    ----------
+    timeval : `gi.repository.GLib.TimeVal` or `float`
+
+    Returns
+    -------
+    `float`
+    """
+    if TimeVal is None:
+        return timeval
+    return timeval.tv_sec + timeval.tv_usec / 1e6
+
+
+class FakeAnimationIter(object):
+    """Animation iterator of `FakeAnimation`."""
+
+    def __init__(self, animation, start):
+        self.animation = animation
+        self.start = get_time(start)
+        self.elapsed = 0.0
+
+    def advance(self, timeval):
+        self.elapsed = get_time(timeval) - self.start
+        return True
+
+    def get_delay_time(self):
+        animation = self.animation
+        if self.elapsed * 1000 >= animation.duration * animation.loops:
+            return -1
+        return animation.duration
+
+
+class FakeAnimation(object):
+    """Single frame animation played a number of times."""
+
+    def __init__(self, duration, loops):
+        self.duration = duration
+        self.loops = loops
+
+    def get_iter(self, start):
+        return FakeAnimationIter(self, start)
+
+
+def get_surface(width, height):
+    return cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+
+
+class SurfaceCacheTest(unittest.TestCase):
+
+    def test_add(self):
+        surface = get_surface(16, 16)
+        cache = SurfaceCache(4096)
+        cache.add('a', surface)
+        self.assertIn('a', cache)
+        self.assertIs(cache.get('a'), surface)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get_bytes(), 1024)
+        cache.add('a', get_surface(16, 8))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get_bytes(), 512)
+        cache.remove('a')
+        cache.remove('a')
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.get_bytes(), 0)
+
+    def test_evict(self):
+        cache = SurfaceCache(3 * 1024)
+        for key in 'abc':
+            cache.add(key, get_surface(16, 16))
+        self.assertIsNotNone(cache.get('a'))
+        cache.add('d', get_surface(16, 16))
+        self.assertEqual(cache.keys(), ['c', 'a', 'd'])
+        self.assertEqual(cache.get_bytes(), 3 * 1024)
+        cache.add('e', get_surface(16, 32))
+        self.assertEqual(cache.keys(), ['d', 'e'])
+        self.assertEqual(cache.get_bytes(), 3 * 1024)
+
+    def test_evict_large(self):
+        cache = SurfaceCache(1024)
+        cache.add('a', get_surface(16, 16))
+        cache.add('b', get_surface(64, 64))
+        self.assertEqual(cache.keys(), ['b'])
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.get_bytes(), 0)
+
+
+class MipmapPyramidTest(unittest.TestCase):
+
+    def test_get_level(self):
+        surface = get_surface(1000, 500)
+        pyramid = MipmapPyramid(surface, 2 ** 26)
+        level, scale_x, scale_y = pyramid.get_level(1.0)
+        self.assertIs(level, surface)
+        self.assertEqual((scale_x, scale_y), (1.0, 1.0))
+        self.assertIs(pyramid.get_level(0.5)[0], surface)
+        self.assertEqual(pyramid.get_bytes(), 0)
+
+        level, scale_x, scale_y = pyramid.get_level(0.2)
+        self.assertEqual((level.get_width(), level.get_height()), (250, 125))
+        self.assertEqual((scale_x, scale_y), (4.0, 4.0))
+        self.assertEqual(pyramid.get_bytes(),
+                         500 * 250 * 4 + 250 * 125 * 4)
+        self.assertIs(pyramid.get_level(0.25)[0], level)
+
+        level, scale_x, scale_y = pyramid.get_level(1e-6)
+        self.assertEqual((level.get_width(), level.get_height()), (1, 1))
+        self.assertEqual((scale_x, scale_y), (1000.0, 500.0))
+
+    def test_max_bytes(self):
+        surface = get_surface(1000, 500)
+        pyramid = MipmapPyramid(surface, 500 * 250 * 4)
+        level, scale_x, _ = pyramid.get_level(0.1)
+        self.assertEqual(level.get_width(), 500)
+        self.assertEqual(scale_x, 2.0)
+        self.assertEqual(pyramid.get_bytes(), get_surface_size(level))
+
+
+class AnimationFramesTest(unittest.TestCase):
+
+    def get_frames(self, loop=True, loop_count=0):
+        return AnimationFrames(None, [None] * 3, [100, 50, 200], loop,
+                               loop_count=loop_count)
+
+    def assertLocate(self, frames, time_, index, delay):
+        located, remaining = frames.locate(time_)
+        self.assertEqual(located, index)
+        self.assertAlmostEqual(remaining, delay)
+
+    def test_times(self):
+        frames = self.get_frames()
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(frames.times, [0, 100, 150])
+        self.assertEqual(frames.duration, 350)
+
+    def test_locate(self):
+        frames = self.get_frames()
+        self.assertLocate(frames, 0, 0, 100)
+        self.assertLocate(frames, 99.5, 0, 0.5)
+        self.assertLocate(frames, 100, 1, 50)
+        self.assertLocate(frames, 320, 2, 30)
+        self.assertLocate(frames, 350, 0, 100)
+        self.assertLocate(frames, 350 * 1000 + 120, 1, 30)
+
+    def test_no_loop(self):
+        frames = self.get_frames(loop=False)
+        self.assertLocate(frames, 120, 1, 30)
+        self.assertLocate(frames, 150, 2, -1)
+        self.assertLocate(frames, 1000, 2, -1)
+
+    def test_loop_count(self):
+        frames = self.get_frames(loop_count=2)
+        self.assertLocate(frames, 470, 1, 30)
+        self.assertLocate(frames, 699, 2, 1)
+        self.assertLocate(frames, 700, 2, -1)
+        self.assertLocate(frames, 10000, 2, -1)
+
+    def test_locate_seconds(self):
+        times = sorted(set(range(0, 6000, 70)) | set([2010, 4020]))
+        delays = [end - start for start, end in zip(times, times[1:])]
+        delays.append(70)
+        frames = AnimationFrames(None, [None] * len(delays), delays, True)
+        self.assertEqual(frames.times, times)
+        for index, start in enumerate(frames.times):
+            self.assertEqual(frames.locate(start / 1000 * 1000)[0], index)
+            self.assertEqual(
+                frames.locate((start + frames.duration) / 1000 * 1000)[0],
+                index
+            )
+
+    def test_get_loop_count(self):
+        for loops in (3, 4, 7, 100):
+            self.assertEqual(AnimationFrames.get_loop_count(
+                FakeAnimation(40, loops), 40
+            ), loops)
+        self.assertEqual(AnimationFrames.get_loop_count(
+            FakeAnimation(40, 2 ** 20), 40, max_loops=1000
+        ), 0)
+
+
+class DecodeTest(unittest.TestCase):
+
+    SIZE = 16
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.pixbufs = {}
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def get_pixbuf(self, color):
+        """Get solid color pixbuf.
+
+        Parameters
+        ----------
+        color : `int`
+            Red and green value.
+
+        Returns
+        -------
+        `gtk.gdk.Pixbuf`
+        """
+        if color not in self.pixbufs:
+            surface = get_surface(self.SIZE, self.SIZE)
+            ctx = cairo.Context(surface)
+            ctx.set_source_rgb(color / 255, color / 255, 0.5)
+            ctx.paint()
+            path = os.path.join(self.dir, '%d.png' % color)
+            surface.write_to_png(path)
+            self.pixbufs[color] = pixbuf_new_from_file_at_scale(
+                path, self.SIZE, self.SIZE, True
+            )
+        return self.pixbufs[color]
+
+    def get_animation(self, colors, loop=True):
+        animation = PixbufSimpleAnim(self.SIZE, self.SIZE, 25)
+        for color in colors:
+            animation.add_frame(self.get_pixbuf(color))
+        animation.set_loop(loop)
+        return animation
+
+    def test_loop(self):
+        frames = AnimationFrames.decode(self.get_animation([0, 100, 200]),
+                                        2 ** 20)
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(frames.delays, [40, 40, 40])
+        self.assertTrue(frames.loop)
+        self.assertEqual(frames.loop_count, 0)
+        self.assertEqual(frames.store_interval, 1)
+        self.assertTrue(all(frames.surfaces))
+
+    def test_held_first_frame(self):
+        frames = AnimationFrames.decode(
+            self.get_animation([0, 0, 0, 100, 200]), 2 ** 20
+        )
+        self.assertEqual(len(frames), 5)
+        self.assertEqual(frames.duration, 200)
+
+    def test_uniform(self):
+        self.assertIsNone(AnimationFrames.decode(
+            self.get_animation([0, 0]), 2 ** 20, max_frames=100
+        ))
+
+    def test_no_loop(self):
+        frames = AnimationFrames.decode(
+            self.get_animation([0, 100, 0], False), 2 ** 20
+        )
+        self.assertFalse(frames.loop)
+        self.assertEqual(frames.delays, [40, 40, 40, 0])
+        self.assertEqual(frames.locate(100)[0], 2)
+        self.assertEqual(frames.locate(1000), (3, -1))
+
+    def test_one_loop_fits(self):
+        size = get_surface_size(get_surface(self.SIZE, self.SIZE))
+        frames = AnimationFrames.decode(
+            self.get_animation([0, 100, 200]), 3 * size
+        )
+        self.assertEqual(frames.store_interval, 1)
+        self.assertEqual(frames.get_bytes(), 3 * size)
+
+    def test_max_bytes(self):
+        size = get_surface_size(get_surface(self.SIZE, self.SIZE))
+        frames = AnimationFrames.decode(
+            self.get_animation([0, 50, 100, 150, 200]), 3 * size
+        )
+        self.assertEqual(len(frames), 5)
+        self.assertEqual(frames.store_interval, 2)
+        self.assertEqual([surface is not None for surface in frames.surfaces],
+                         [True, False, True, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
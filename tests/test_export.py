@@ -0,0 +1,193 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import os
+import io
+import zlib
+import struct
+import shutil
+import tempfile
+import unittest
+
+from pygtkdrawingwindow.export import PngWriter, export_png_bands
+
+
+WIDTH = 7
+HEIGHT = 10
+BAND_HEIGHT = 3
+
+
+def get_pixel(x, y):
+    """Get test image pixel.
+
+    Parameters
+    ----------
+    x : `int`
+    y : `int`
+
+    Returns
+    -------
+    (`int`, `int`, `int`, `int`)
+        Red, green, blue and alpha. Two leftmost columns are
+        transparent.
+    """
+    if x < 2:
+        return (0, 0, 0, 0)
+    return (y * 25, x * 36, 255 - y * 20, 255)
+
+
+def render(ctx):
+    """Render test image.
+
+    Parameters
+    ----------
+    ctx : `cairo.Context`
+    """
+    for y in range(HEIGHT):
+        for x in range(2, WIDTH):
+            red, green, blue, _ = get_pixel(x, y)
+            ctx.set_source_rgb(red / 255, green / 255, blue / 255)
+            ctx.rectangle(x, y, 1, 1)
+            ctx.fill()
+
+
+def read_png(data):
+    """Decode PNG written by `PngWriter`.
+
+    Parameters
+    ----------
+    data : `bytes`
+        PNG file contents.
+
+    Returns
+    -------
+    (`int`, `int`, `int`, `list` of `bytearray`)
+        Width, height, color type and scanlines without
+        filter type bytes.
+
+    Raises
+    ------
+    AssertionError
+        If file is not a valid 8-bit, non-interlaced PNG
+        with unfiltered scanlines.
+    """
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    offset = 8
+    chunks = []
+    while offset < len(data):
+        length, type_ = struct.unpack('>I4s', data[offset:offset + 8])
+        chunk = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack('>I', data[offset + 8 + length:
+                                        offset + 12 + length])
+        assert crc == zlib.crc32(chunk, zlib.crc32(type_)) & 0xffffffff
+        chunks.append((type_, chunk))
+        offset += 12 + length
+    assert offset == len(data)
+    assert chunks[0][0] == b'IHDR'
+    assert chunks[-1] == (b'IEND', b'')
+    width, height, depth, color_type, compression, filter_, interlace = \
+        struct.unpack('>IIBBBBB', chunks[0][1])
+    assert (depth, compression, filter_, interlace) == (8, 0, 0, 0)
+    assert color_type in (2, 6)
+    assert all(type_ == b'IDAT' for type_, _ in chunks[1:-1])
+    raw = bytearray(zlib.decompress(
+        b''.join(chunk for _, chunk in chunks[1:-1])
+    ))
+    size = 1 + width * (4 if color_type == 6 else 3)
+    assert len(raw) == size * height
+    rows = [raw[y * size:(y + 1) * size] for y in range(height)]
+    assert all(row[0] == 0 for row in rows)
+    return width, height, color_type, [row[1:] for row in rows]
+
+
+class PngWriterTest(unittest.TestCase):
+
+    def get_rows(self, rows, channels):
+        return [bytearray((y * 31 + i * 7) % 256
+                          for i in range(WIDTH * channels))
+                for y in range(rows)]
+
+    def test_write_rows(self):
+        for alpha, channels, color_type in ((True, 4, 6), (False, 3, 2)):
+            rows = self.get_rows(HEIGHT, channels)
+            fp = io.BytesIO()
+            writer = PngWriter(fp, WIDTH, HEIGHT, alpha)
+            for top in range(0, HEIGHT, BAND_HEIGHT):
+                band = rows[top:top + BAND_HEIGHT]
+                writer.write_rows(
+                    b''.join(b'\x00' + bytes(row) for row in band),
+                    len(band)
+                )
+            writer.close()
+            self.assertEqual(read_png(fp.getvalue()),
+                             (WIDTH, HEIGHT, color_type, rows))
+
+    def test_row_count(self):
+        row = b'\x00' * (1 + WIDTH * 4)
+        writer = PngWriter(io.BytesIO(), WIDTH, 2)
+        writer.write_rows(row, 1)
+        self.assertRaises(ValueError, writer.close)
+        self.assertRaises(ValueError, writer.write_rows, row * 2, 2)
+        writer.write_rows(row, 1)
+        writer.close()
+
+
+class ExportPngBandsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'image.png')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.path, 'rb') as fp:
+            return read_png(fp.read())
+
+    def test_alpha(self):
+        self.assertTrue(export_png_bands(
+            render, self.path, band_height=BAND_HEIGHT,
+            size=(WIDTH, HEIGHT)
+        ))
+        self.assertEqual(self.read(), (WIDTH, HEIGHT, 6, [
+            bytearray(c for x in range(WIDTH) for c in get_pixel(x, y))
+            for y in range(HEIGHT)
+        ]))
+
+    def test_background(self):
+        self.assertTrue(export_png_bands(
+            render, self.path, background=(0.0, 0.0, 0.0),
+            band_height=BAND_HEIGHT, size=(WIDTH, HEIGHT)
+        ))
+        self.assertEqual(self.read(), (WIDTH, HEIGHT, 2, [
+            bytearray(c for x in range(WIDTH) for c in get_pixel(x, y)[:3])
+            for y in range(HEIGHT)
+        ]))
+
+    def test_progress(self):
+        calls = []
+
+        def progress(rows, height):
+            calls.append((rows, height))
+            return True
+
+        export_png_bands(render, self.path, band_height=BAND_HEIGHT,
+                         progress=progress, size=(WIDTH, HEIGHT))
+        self.assertEqual(calls, [(3, 10), (6, 10), (9, 10), (10, 10)])
+
+    def test_cancel(self):
+        self.assertFalse(export_png_bands(
+            render, self.path, band_height=BAND_HEIGHT,
+            progress=lambda rows, height: rows < 6, size=(WIDTH, HEIGHT)
+        ))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_open_error(self):
+        path = os.path.join(self.dir, 'missing', 'image.png')
+        with self.assertRaises(IOError) as context:
+            export_png_bands(render, path, size=(WIDTH, HEIGHT))
+        self.assertIsNone(getattr(context.exception, '__context__', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import unittest
+
+from pygtkdrawingwindow.deps import cairo
+from pygtkdrawingwindow.cache import AnimationFrames
+from pygtkdrawingwindow.image import ImageWindow
+
+
+class SeekFrameTest(unittest.TestCase):
+
+    def setUp(self):
+        times = sorted(set(range(0, 6000, 70)) | set([2010, 4020]))
+        delays = [end - start for start, end in zip(times, times[1:])]
+        delays.append(70)
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
+        self.widget = ImageWindow()
+        self.widget.has_animation = lambda: True
+        self.widget._frames = AnimationFrames(
+            None, [surface] * len(delays), delays, True
+        )
+
+    def tearDown(self):
+        self.widget.destroy()
+
+    def test_seek_frame(self):
+        for index in range(len(self.widget._frames)):
+            self.widget.seek_frame(index)
+            self.assertEqual(self.widget._frame_index, index)
+
+    def test_seek_frame_wraps(self):
+        count = len(self.widget._frames)
+        self.widget.seek_frame(count + 29)
+        self.assertEqual(self.widget._frame_index, 29)
+        self.widget.seek_frame(-1)
+        self.assertEqual(self.widget._frame_index, count - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from pygtkdrawingwindow.deps import ScrollDirection
+from pygtkdrawingwindow.base import DrawingWindow
+from pygtkdrawingwindow.record import (
+    EventRecorder, EventReplayer, SyntheticEvent
+)
+
+
+class FakeWidget(object):
+    """Widget that records handler calls."""
+
+    def __init__(self):
+        self.screen = object()
+        self.calls = []
+        self.size_request = (-1, -1)
+
+    def scroll_event(self, widget, event):
+        self.calls.append(('scroll', widget, dict(event.__dict__)))
+
+    def motion_notify_event(self, widget, event):
+        self.calls.append(('motion', widget, dict(event.__dict__)))
+
+    def leave_notify_event(self, widget, event):
+        self.calls.append(('leave', widget, dict(event.__dict__)))
+
+    def flush_pending(self):
+        self.calls.append(('flush',))
+
+    def get_toplevel(self):
+        return self
+
+    def get_size_request(self):
+        return self.size_request
+
+    def set_size_request(self, width, height):
+        self.size_request = (width, height)
+        self.calls.append(('size', width, height))
+
+
+def record_events():
+    """Get recorder with one event of each type.
+
+    Returns
+    -------
+    `EventRecorder`
+    """
+    recorder = EventRecorder()
+    recorder.add('size', width=800, height=600)
+    recorder.add('scroll', SyntheticEvent(
+        direction=ScrollDirection.DOWN, state=4, x=10.5, y=20.25,
+        delta_x=0.0, delta_y=1.5
+    ))
+    recorder.add('motion', SyntheticEvent(
+        x=1.234, y=5.0, x_root=101.234, y_root=105.0, state=256
+    ))
+    recorder.add('leave', SyntheticEvent(x=-1.0, y=3.0))
+    recorder.add('size', width=400, height=300)
+    return recorder
+
+
+class RecordTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_add(self):
+        events = record_events().events
+        self.assertEqual([event[1:] for event in events], [
+            ['size', 800, 600],
+            ['scroll', int(ScrollDirection.DOWN), 4, 10.5, 20.25, 0.0, 1.5],
+            ['motion', 1.23, 5.0, 101.23, 105.0, 256],
+            ['leave', -1.0, 3.0],
+            ['size', 400, 300]
+        ])
+        self.assertTrue(all(isinstance(event[0], int) for event in events))
+
+    def test_save_load(self):
+        recorder = record_events()
+        for name in ('events.jsonl', 'events.jsonl.gz'):
+            path = os.path.join(self.dir, name)
+            recorder.save(path)
+            replayer = EventReplayer.load(FakeWidget(), path)
+            self.assertEqual(replayer.events, recorder.events)
+
+    def test_version(self):
+        path = os.path.join(self.dir, 'events.jsonl')
+        with open(path, 'w') as fp:
+            fp.write(json.dumps({'version': 2}) + '\n')
+        self.assertRaises(ValueError, EventReplayer.load, FakeWidget(), path)
+
+    def test_replay(self):
+        recorder = record_events()
+        path = os.path.join(self.dir, 'events.jsonl.gz')
+        recorder.save(path)
+        widget = FakeWidget()
+        widget.size_request = (320, 240)
+        replayer = EventReplayer.load(widget, path)
+        replayer.replay()
+        self.assertEqual(replayer.index, 5)
+        self.assertEqual(widget.calls, [
+            ('size', 800, 600),
+            ('flush',),
+            ('scroll', widget, {'direction': int(ScrollDirection.DOWN),
+                                'state': 4, 'x': 10.5, 'y': 20.25,
+                                'delta_x': 0.0, 'delta_y': 1.5}),
+            ('flush',),
+            ('motion', widget.screen, {'x': 1.23, 'y': 5.0,
+                                       'x_root': 101.23, 'y_root': 105.0,
+                                       'state': 256}),
+            ('flush',),
+            ('leave', widget.screen, {'x': -1.0, 'y': 3.0}),
+            ('flush',),
+            ('size', 400, 300),
+            ('flush',),
+            ('size', 320, 240)
+        ])
+        self.assertEqual(widget.size_request, (320, 240))
+
+
+class RecorderWidgetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.widget = DrawingWindow()
+        self.recorder = EventRecorder()
+
+    def tearDown(self):
+        self.recorder.stop()
+        self.widget.destroy()
+
+    def test_start_stop(self):
+        self.recorder.start(self.widget)
+        self.assertIs(self.widget.get_recorder(), self.recorder)
+        self.assertEqual(len(self.recorder.events), 1)
+        self.assertEqual(self.recorder.events[0][1], 'size')
+        event = SyntheticEvent(x=10.0, y=20.0, x_root=110.0, y_root=120.0,
+                               state=0)
+        self.widget.motion_notify_event(self.widget.screen, event)
+        self.recorder.stop()
+        self.assertIsNone(self.widget.get_recorder())
+        self.widget.motion_notify_event(self.widget.screen, event)
+        self.assertEqual([event[1:] for event in self.recorder.events[1:]],
+                         [['motion', 10.0, 20.0, 110.0, 120.0, 0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from pygtkdrawingwindow.deps import cairo
+from pygtkdrawingwindow.stats import FrameStats
+from pygtkdrawingwindow.base import DrawingWindow
+
+
+class FrameStatsTest(unittest.TestCase):
+
+    def test_percentile(self):
+        stats = FrameStats()
+        self.assertIsNone(stats.get_percentile('render', 50))
+        for duration in (0.5, 0.1, 0.4, 0.2, 0.3):
+            stats.add('render', 0.0, duration)
+        self.assertEqual(stats.get_percentile('render', 0), 0.1)
+        self.assertEqual(stats.get_percentile('render', 40), 0.2)
+        self.assertEqual(stats.get_percentile('render', 50), 0.3)
+        self.assertEqual(stats.get_percentile('render', 95), 0.5)
+        self.assertEqual(stats.get_percentile('render', 100), 0.5)
+
+    def test_size(self):
+        stats = FrameStats(size=3)
+        for i in range(5):
+            stats.add('render', 0.0, i)
+            stats.add_frame(i, 0.0)
+        self.assertEqual(list(stats.samples['render']), [2, 3, 4])
+        self.assertEqual(list(stats.samples['frame']), [0.0, 0.0, 0.0])
+        self.assertEqual(list(stats.frames), [2, 3, 4])
+
+    def test_fps(self):
+        stats = FrameStats()
+        self.assertEqual(stats.get_fps(), 0.0)
+        stats.add_frame(1.0, 0.01)
+        self.assertEqual(stats.get_fps(), 0.0)
+        for i in range(1, 11):
+            stats.add_frame(1.0 + i * 0.02, 0.01)
+        self.assertAlmostEqual(stats.get_fps(), 50.0)
+
+    def test_summary(self):
+        stats = FrameStats()
+        stats.add_frame(1.0, 0.01)
+        stats.add_frame(1.1, 0.03)
+        stats.add('fit', 1.0, 0.002)
+        summary = stats.get_summary()
+        self.assertEqual(sorted(summary), ['fit', 'fps', 'frame'])
+        self.assertAlmostEqual(summary['fps'], 1 / 0.12)
+        frame = summary['frame']
+        self.assertEqual(frame['count'], 2)
+        self.assertAlmostEqual(frame['mean'], 0.02)
+        self.assertEqual(frame['p50'], 0.01)
+        self.assertEqual(frame['p95'], 0.03)
+        self.assertEqual(frame['p99'], 0.03)
+        self.assertEqual(frame['max'], 0.03)
+        self.assertEqual(summary['fit']['count'], 1)
+
+    def test_measure(self):
+        stats = FrameStats()
+        with stats.measure('layout'):
+            pass
+        with self.assertRaises(KeyError):
+            with stats.measure('fit'):
+                raise KeyError('fit')
+        self.assertEqual(len(stats.samples['layout']), 1)
+        self.assertEqual(len(stats.samples['fit']), 1)
+        self.assertGreaterEqual(stats.samples['layout'][0], 0.0)
+
+    def test_clear(self):
+        stats = FrameStats(trace=True)
+        stats.add_frame(1.0, 0.01)
+        stats.clear()
+        self.assertEqual(stats.samples, {})
+        self.assertEqual(len(stats.frames), 0)
+        self.assertEqual(stats.events, [])
+
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'trace.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_disabled(self):
+        stats = FrameStats()
+        stats.add('render', 0.0, 0.1)
+        self.assertIsNone(stats.events)
+        self.assertRaises(ValueError, stats.write_trace, self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_write_trace(self):
+        stats = FrameStats(trace=True, max_events=2)
+        start = stats._start
+        stats.add('render', start + 0.5, 0.25)
+        stats.add_frame(start + 1.0, 0.125)
+        stats.add('fit', start + 2.0, 0.1)
+        stats.write_trace(self.path)
+        with open(self.path) as fp:
+            trace = json.load(fp)
+        self.assertEqual(trace['displayTimeUnit'], 'ms')
+        events = trace['traceEvents']
+        self.assertEqual([event['name'] for event in events],
+                         ['render', 'frame'])
+        self.assertEqual(events[0]['ph'], 'X')
+        self.assertAlmostEqual(events[0]['ts'], 5e5)
+        self.assertAlmostEqual(events[0]['dur'], 2.5e5)
+        self.assertAlmostEqual(events[1]['ts'], 1e6)
+        self.assertEqual(events[1]['pid'], os.getpid())
+
+
+class DrawingWindowStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.widget = DrawingWindow()
+        self.stats = FrameStats()
+        self.calls = []
+
+    def tearDown(self):
+        self.widget.destroy()
+
+    def render(self, widget, ctx):
+        self.calls.append(ctx)
+
+    def emit(self):
+        ctx = cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1))
+        self.widget.emit('render', ctx)
+
+    def test_render_timing(self):
+        self.widget.connect('render', self.render)
+        self.emit()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.stats.samples, {})
+        self.widget.set_stats(self.stats)
+        self.emit()
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(len(self.stats.samples['render:render']), 1)
+
+    def test_measure_disabled(self):
+        with self.widget.measure('fit'):
+            pass
+        self.widget.set_stats(self.stats)
+        with self.widget.measure('fit'):
+            pass
+        self.assertEqual(len(self.stats.samples['fit']), 1)
+
+    def test_disconnect(self):
+        first = self.widget.connect('render', self.render)
+        second = self.widget.connect('render', self.render)
+        self.assertEqual(len(self.widget._timed_handlers), 1)
+        self.widget.disconnect(first)
+        self.assertEqual(len(self.widget._timed_handlers), 1)
+        self.widget.handler_disconnect(second)
+        self.assertEqual(len(self.widget._timed_handlers), 0)
+        self.emit()
+        self.assertEqual(self.calls, [])
+
+    def test_disconnect_by_func(self):
+        self.widget.connect('render', self.render)
+        self.widget.connect_after('render', self.render)
+        self.widget.disconnect_by_func(self.render)
+        self.assertEqual(self.widget._timed_handlers, {})
+        self.assertEqual(self.widget._timed_ids, {})
+        self.emit()
+        self.assertEqual(self.calls, [])
+        self.assertRaises(TypeError, self.widget.disconnect_by_func,
+                          self.render)
+
+
+if __name__ == '__main__':
+    unittest.main()
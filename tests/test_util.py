@@ -0,0 +1,89 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import unittest
+from math import pi
+
+from pygtkdrawingwindow.deps import cairo
+from pygtkdrawingwindow.util import (
+    transform_rect, get_matrix_scale, round_rect, pad_rect, intersect_rect,
+    subtract_rect, get_quarter_turns
+)
+
+
+def get_area(rects):
+    return sum((right - left) * (bottom - top)
+               for left, top, right, bottom in rects)
+
+
+class RectTest(unittest.TestCase):
+
+    def test_round_rect(self):
+        self.assertEqual(round_rect((0.5, -0.5, 9.1, 10.0)), (0, -1, 10, 10))
+
+    def test_pad_rect(self):
+        self.assertEqual(pad_rect((0, 2, 10, 12), 1.5),
+                         (-1.5, 0.5, 11.5, 13.5))
+        self.assertEqual(pad_rect((0, 2, 10, 12), 0), (0, 2, 10, 12))
+
+    def test_intersect_rect(self):
+        self.assertEqual(intersect_rect((0, 0, 10, 10), (5, -5, 15, 5)),
+                         (5, 0, 10, 5))
+        self.assertEqual(intersect_rect((0, 0, 10, 10), (2, 2, 4, 4)),
+                         (2, 2, 4, 4))
+        self.assertIsNone(intersect_rect((0, 0, 10, 10), (10, 0, 20, 10)))
+        self.assertIsNone(intersect_rect((0, 0, 10, 10), (20, 20, 30, 30)))
+
+    def test_subtract_rect(self):
+        self.assertEqual(subtract_rect((0, 0, 10, 10), (0, 2, 10, 12)),
+                         [(0, 0, 10, 2)])
+        self.assertEqual(subtract_rect((0, 0, 10, 10), (20, 20, 30, 30)),
+                         [(0, 0, 10, 10)])
+        self.assertEqual(subtract_rect((0, 0, 10, 10), (-1, -1, 11, 11)), [])
+
+    def test_subtract_rect_hole(self):
+        rect = (0, 0, 10, 10)
+        other = (2, 3, 5, 7)
+        parts = subtract_rect(rect, other)
+        self.assertEqual(len(parts), 4)
+        self.assertEqual(get_area(parts), 100 - 12)
+        for i, part in enumerate(parts):
+            self.assertEqual(intersect_rect(rect, part), part)
+            self.assertIsNone(intersect_rect(part, other))
+            for other_part in parts[i + 1:]:
+                self.assertIsNone(intersect_rect(part, other_part))
+
+
+class MatrixTest(unittest.TestCase):
+
+    def test_transform_rect(self):
+        matrix = cairo.Matrix()
+        matrix.translate(10, 20)
+        matrix.scale(2, 2)
+        self.assertEqual(transform_rect(matrix, 1, 2, 3, 4),
+                         (12.0, 24.0, 18.0, 32.0))
+        matrix.rotate(pi / 2)
+        for value, expected in zip(transform_rect(matrix, 1, 2, 3, 4),
+                                   (-2.0, 22.0, 6.0, 28.0)):
+            self.assertAlmostEqual(value, expected)
+
+    def test_get_matrix_scale(self):
+        matrix = cairo.Matrix()
+        matrix.scale(2, 8)
+        matrix.rotate(0.3)
+        self.assertAlmostEqual(get_matrix_scale(matrix), 4.0)
+
+    def test_get_quarter_turns(self):
+        for turns in range(4):
+            matrix = cairo.Matrix()
+            matrix.translate(5, 5)
+            matrix.scale(0.5, 0.5)
+            matrix.rotate(turns * pi / 2)
+            self.assertEqual(get_quarter_turns(matrix), turns)
+        self.assertIsNone(get_quarter_turns(cairo.Matrix(-1, 0, 0, 1, 0, 0)))
+        matrix = cairo.Matrix()
+        matrix.rotate(0.1)
+        self.assertIsNone(get_quarter_turns(matrix))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+from __future__ import division, print_function, absolute_import, with_statement
+
+import unittest
+from math import pi
+
+from pygtkdrawingwindow.deps import numpy
+from pygtkdrawingwindow.viewport import Viewport
+
+
+POINTS = [(0.0, 0.0), (200.0, 100.0), (12.5, 87.25), (-3.0, 150.0)]
+
+
+class ViewportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.viewport = Viewport(200, 100, zoom=2.0)
+        self.viewport.set_screen_size(800, 600)
+
+    def assertPointsAlmostEqual(self, first, second):
+        self.assertEqual(len(first), len(second))
+        for (x1, y1), (x2, y2) in zip(first, second):
+            self.assertAlmostEqual(x1, x2)
+            self.assertAlmostEqual(y1, y2)
+
+    def transform(self):
+        self.viewport.set_zoom(1.5)
+        self.viewport.set_angle(pi / 6)
+        self.viewport.set_screen_size(300, 200)
+        self.viewport.set_canvas_offset(40.0, 25.5)
+        self.viewport.set_root_offset(100.0, 70.0)
+
+    def test_image_to_canvas(self):
+        self.assertPointsAlmostEqual(
+            self.viewport.image_to_canvas([(0, 0), (200, 100)]),
+            [(200.0, 200.0), (600.0, 400.0)]
+        )
+        self.assertPointsAlmostEqual(
+            self.viewport.canvas_to_image([(400.0, 300.0)]),
+            [(100.0, 50.0)]
+        )
+
+    def test_offsets(self):
+        self.viewport.set_canvas_offset(10.0, 20.0)
+        self.viewport.set_root_offset(100.0, 200.0)
+        self.assertPointsAlmostEqual(
+            self.viewport.image_to_widget([(0, 0)]), [(190.0, 180.0)]
+        )
+        self.assertPointsAlmostEqual(
+            self.viewport.image_to_root([(0, 0)]), [(290.0, 380.0)]
+        )
+
+    def test_right_angle(self):
+        self.viewport.set_angle(pi / 2)
+        self.assertPointsAlmostEqual(
+            self.viewport.image_to_canvas([(0, 0), (200, 100)]),
+            [(500.0, 100.0), (300.0, 500.0)]
+        )
+
+    def test_list_round_trip(self):
+        self.transform()
+        viewport = self.viewport
+        for forward, backward in (
+                (viewport.image_to_canvas, viewport.canvas_to_image),
+                (viewport.image_to_widget, viewport.widget_to_image),
+                (viewport.image_to_root, viewport.root_to_image)):
+            points = forward(POINTS)
+            self.assertIsInstance(points, list)
+            self.assertPointsAlmostEqual(backward(points), POINTS)
+
+    def test_spaces(self):
+        self.transform()
+        viewport = self.viewport
+        canvas = viewport.image_to_canvas(POINTS)
+        widget = viewport.image_to_widget(POINTS)
+        root = viewport.image_to_root(POINTS)
+        self.assertPointsAlmostEqual(
+            widget, [(x - 40.0, y - 25.5) for x, y in canvas]
+        )
+        self.assertPointsAlmostEqual(
+            root, [(x + 100.0, y + 70.0) for x, y in widget]
+        )
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_array_round_trip(self):
+        self.transform()
+        viewport = self.viewport
+        points = numpy.array(POINTS)
+        for forward, backward in (
+                (viewport.image_to_canvas, viewport.canvas_to_image),
+                (viewport.image_to_widget, viewport.widget_to_image),
+                (viewport.image_to_root, viewport.root_to_image)):
+            result = forward(points)
+            self.assertIsInstance(result, numpy.ndarray)
+            self.assertEqual(result.shape, points.shape)
+            self.assertPointsAlmostEqual(result, forward(POINTS))
+            self.assertTrue(numpy.allclose(backward(result), points))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_array_shape(self):
+        self.transform()
+        points = numpy.array(POINTS).reshape(2, 2, 2)
+        result = self.viewport.image_to_root(points)
+        self.assertEqual(result.shape, (2, 2, 2))
+        self.assertTrue(numpy.allclose(
+            result.reshape(-1, 2), self.viewport.image_to_root(POINTS)
+        ))
+        self.assertTrue(numpy.allclose(
+            self.viewport.root_to_image(result), points
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()